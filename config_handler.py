@@ -25,13 +25,53 @@ SOFTWARE.
 """
 
 import os
+import bz2
+import mmap
+import stat
+import time
+import copy
 import zlib
+import lzma
+import asyncio
+import functools
+import contextlib
 import json
 import base64
+import binascii
+import codecs
+import ctypes
+import ctypes.util
+import select
+import struct
 import hashlib
+import hmac
+import threading
+import collections
+import concurrent.futures
 
 from Cryptodome import Random
 from Cryptodome.Cipher import AES
+from Cryptodome.Util import Padding
+
+# Optional compression algorithms
+try:
+    import zstandard
+
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame
+
+except ImportError:
+    lz4 = None
+
+# Advisory file locking (See FileLock)
+try:
+    import fcntl
+
+except ImportError:
+    fcntl = None
 
 VERSION = "0.0.2.1"  # Module version
 
@@ -47,18 +87,98 @@ class AES256(object):
 
     # This class is from my `Ciphers/aes.py` module.
 
-    def __init__(self, key, encoding="utf-8"):
+    # The supported key derivation functions and their default parameters
+    #   - sha256: A single SHA-256 hash of the password. (No salt)
+    #   - pbkdf2: PBKDF2-HMAC-SHA256.
+    #   - scrypt: scrypt, if hashlib was built with it.
+    kdf_defaults = {
+        "sha256": {},
+        "pbkdf2": {"iterations": 200000}
+    }
+    if hasattr(hashlib, "scrypt"):
+        kdf_defaults["scrypt"] = {"n": 16384, "r": 8, "p": 1}
+
+    # A process-wide cache of derived keys so that expensive KDFs only run once per password.
+    # The passwords are not stored; The cache is keyed by their SHA-256 digest.
+    key_cache_size = 32
+    _key_cache = collections.OrderedDict()
+    _key_cache_lock = threading.Lock()
+
+    # GCM mode parameters
+    gcm_nonce_size = 12
+    gcm_tag_size = 16
+    gcm_chunk_size = 1048576  # The number of bytes passed to the cipher at a time
+
+    def __init__(self, key, encoding="utf-8", kdf="sha256", salt=b'', kdf_params=None):
         """
         The initialization method of AES256() class.
 
         :param str key: The key/password of the message.
+        :param str encoding: The encoding of <key>.
+        :param str kdf: The key derivation function to use. (See self.kdf_defaults)
+        :param bytes salt: The salt of the key derivation function.
+        :param dict kdf_params: The parameters of the key derivation function.
         """
 
         self.VERSION = "0.0.1.2"
 
         self.bs = AES.block_size  # The block size
         self.encoding = encoding  # The encoding to be used when calling `encode()` and `decode()`.
-        self.key = hashlib.sha256(key.encode(self.encoding)).digest()  # The hashed key
+        self.key = self.derive_key(key, kdf, salt, kdf_params, encoding)  # The hashed key
+
+    @classmethod
+    def derive_key(cls, key, kdf="sha256", salt=b'', kdf_params=None, encoding="utf-8"):
+        """
+        Derive a 256-bit key from <key>, reusing the result of previous calls.
+
+        :param str key: The key/password.
+        :param str kdf: The key derivation function to use. (See cls.kdf_defaults)
+        :param bytes salt: The salt of the key derivation function.
+        :param dict kdf_params: The parameters of the key derivation function.
+        :param str encoding: The encoding of <key>.
+
+        :returns bytes: The derived key.
+        """
+
+        if kdf not in cls.kdf_defaults:
+            raise ValueError("Unsupported key derivation function")
+
+        params = dict(cls.kdf_defaults[kdf])
+        if kdf_params is not None:
+            params.update(kdf_params)
+
+        password = key.encode(encoding)
+        digest = hashlib.sha256(password).digest()
+        if kdf == "sha256":
+            # Cheaper to compute than to look up.
+            return digest
+
+        cache_key = (kdf, digest, bytes(salt), tuple(sorted(params.items())))
+        with cls._key_cache_lock:
+            if cache_key in cls._key_cache:
+                cls._key_cache.move_to_end(cache_key)
+                return cls._key_cache[cache_key]
+
+        if kdf == "pbkdf2":
+            derived = hashlib.pbkdf2_hmac("sha256", password, salt, params["iterations"], 32)
+
+        else:
+            derived = hashlib.scrypt(
+                password,
+                salt=salt,
+                n=params["n"],
+                r=params["r"],
+                p=params["p"],
+                maxmem=256 * params["n"] * params["r"],
+                dklen=32
+            )
+
+        with cls._key_cache_lock:
+            cls._key_cache[cache_key] = derived
+            while len(cls._key_cache) > cls.key_cache_size:
+                cls._key_cache.popitem(last=False)
+
+        return derived
 
     def encrypt(self, message):
         """
@@ -95,919 +215,3602 @@ class AES256(object):
 
         return plaintext
 
-    def _pad(self, s):
+    def encrypt_bytes(self, data):
         """
-        Add a padding to <s>.
+        Encrypt <data> using <self.key> as the key/password.
+        Unlike encrypt(), the plaintext and ciphertext are not Base64-encoded.
+
+        :param bytes data: The data to encrypt.
+
+        :returns bytes: The IV followed by the ciphertext.
         """
 
-        return s + (self.bs - len(s) % self.bs) * chr(self.bs - len(s) % self.bs)
+        iv = Random.new().read(AES.block_size)
+        cipher = AES.new(self.key, AES.MODE_CBC, iv)
 
-    @staticmethod
-    def _unpad(s):
+        return iv + cipher.encrypt(Padding.pad(data, self.bs))
+
+    def decrypt_bytes(self, data):
         """
-        Remove padding from <s>.
+        Decrypt <data> using <self.key> as the key/password.
+        Unlike decrypt(), the plaintext and ciphertext are not Base64-encoded.
+
+        :param bytes data: The IV followed by the ciphertext.
+
+        :returns bytearray: The plaintext version of the ciphertext.
         """
 
-        return s[:-ord(s[len(s)-1:])]
+        data = memoryview(data)
+        cipher = AES.new(self.key, AES.MODE_CBC, bytes(data[:AES.block_size]))
+        result = bytearray(max(len(data) - AES.block_size, 0))
+        cipher.decrypt(data[AES.block_size:], output=result)
 
-class Version1():
-    """
-    The class containing methods to use the version 1 configuration file.
-    """
+        # Only the last block is padded; Check it and strip the padding in place.
+        last_block = Padding.unpad(bytes(result[-self.bs:]), self.bs)
+        del result[len(result) - self.bs + len(last_block):]
+        return result
 
-    def __init__(self, config_path="data/config.dat", isbase64=False, encoding="utf-8"):
+    def encrypt_gcm(self, data):
         """
-        The initialization method for ConfigHandler() class.
+        Encrypt <data> with AES-256 in GCM mode, <self.gcm_chunk_size> bytes at a time.
+        The ciphertext is authenticated; See decrypt_gcm().
 
-        :param str config_path: The path of the configuration file to use.
-        :param bool isbase64: True if the configuration file is encoded via Base64.
-        :param str encoding: The encoding to be used.
+        :param bytes data: The data to encrypt.
+
+        :returns bytearray: The nonce, the ciphertext, and the authentication tag.
         """
 
-        self.VERSION = "0.0.1.1"  # Parser version
-        self.config_path = config_path
-        self.isbase64 = isbase64
-        self.encoding = encoding
+        nonce = Random.get_random_bytes(self.gcm_nonce_size)
+        cipher = AES.new(self.key, AES.MODE_GCM, nonce=nonce)
 
-    def _open_config_file(self):
-        """
-        Open the config file.
+        plaintext = memoryview(data)
+        size = len(plaintext)
+        result = bytearray(self.gcm_nonce_size + size + self.gcm_tag_size)
+        ciphertext = memoryview(result)[self.gcm_nonce_size:self.gcm_nonce_size + size]
 
-        :returns str: The configuration file data.
+        result[:self.gcm_nonce_size] = nonce
+        for offset in range(0, size, self.gcm_chunk_size):
+            end = min(offset + self.gcm_chunk_size, size)
+            cipher.encrypt(plaintext[offset:end], output=ciphertext[offset:end])
+
+        result[self.gcm_nonce_size + size:] = cipher.digest()
+        return result
+
+    def decrypt_gcm(self, data):
         """
+        Decrypt <data> with AES-256 in GCM mode, <self.gcm_chunk_size> bytes at a time.
+        Raises `ValueError` if <data> was modified or the key is wrong.
 
-        try:
-            with open(self.config_path, 'r') as fopen:
-                data = fopen.read()
+        :param bytes data: The nonce, the ciphertext, and the authentication tag.
 
-        except(FileNotFoundError, IOError, EOFError,
-                PermissionError, IsADirectoryError):
-            raise IOError("Error reading the configuration file!")
+        :returns bytearray: The plaintext version of the ciphertext.
+        """
 
-        else:
-            if self.isbase64 == True:
-                try:
-                    data = base64.b64decode(data)
+        data = memoryview(data)
+        if len(data) < self.gcm_nonce_size + self.gcm_tag_size:
+            raise ValueError("The ciphertext is truncated")
 
-                except(TypeError, ValueError, UnicodeDecodeError):
-                    raise IOError("The configuration file is corrupt or decrypted!")
+        cipher = AES.new(self.key, AES.MODE_GCM, nonce=bytes(data[:self.gcm_nonce_size]))
+        ciphertext = data[self.gcm_nonce_size:len(data) - self.gcm_tag_size]
+        size = len(ciphertext)
+        result = bytearray(size)
+        plaintext = memoryview(result)
+        for offset in range(0, size, self.gcm_chunk_size):
+            end = min(offset + self.gcm_chunk_size, size)
+            cipher.decrypt(ciphertext[offset:end], output=plaintext[offset:end])
 
-                else:
-                    try:
-                        return str(data.decode(self.encoding))
+        try:
+            cipher.verify(data[len(data) - self.gcm_tag_size:])
 
-                    except(TypeError, ValueError,UnicodeDecodeError):
-                        raise IOError("The configuration file is corrupt or decrypted!")
+        except ValueError:
+            raise ValueError("The ciphertext is corrupt or the key is wrong")
 
-            else:
-                return data
+        return result
 
-    def _save_config_file(self, config_data):
+    def _pad(self, s):
+        """
+        Add a padding to <s>.
         """
-        Save the config file.
 
-        :param str config_data: The whole content of the configuration file.
+        return s + (self.bs - len(s) % self.bs) * chr(self.bs - len(s) % self.bs)
 
-        :returns int: Error code
+    @staticmethod
+    def _unpad(s):
+        """
+        Remove padding from <s>.
         """
 
-        try:
-            with open(self.config_path, 'w') as fopen:
-                fopen.write('')
+        return s[:-ord(s[len(s)-1:])]
 
-        except(FileNotFoundError, IOError, EOFError,
-               PermissionError, IsADirectoryError):
-            raise IOError("Error writing to the configuration file!")
 
-        else:
-            try:
-                if self.isbase64 == True:
-                    with open(self.config_path, 'w') as fopen:
-                        fopen.write(base64.b64encode(config_data.encode(self.encoding)).decode(self.encoding))
+class AtomicWriter(object):
+    """
+    The class that contains methods for replacing files atomically.
 
-                else:
-                    with open(self.config_path, 'w') as fopen:
-                        fopen.write(config_data)
+    The data is written to a temporary file in the same directory as the
+    destination, which is then renamed over the destination. Readers will
+    either see the old or the new contents of the file, never a partial one.
+    """
 
-            except(FileNotFoundError, IOError, EOFError,
-                   PermissionError, IsADirectoryError):
-                raise IOError("Error writing to the configuration file!")
+    # The supported durability levels:
+    #   - None: Do not call fsync(); The file survives a crash of the process but not of the OS.
+    #   - file: fsync() the temporary file before renaming it.
+    #   - directory: fsync() the temporary file and the directory after renaming it.
+    durabilities = ("None", "file", "directory")
 
-            else:
-                return 0
+    def __init__(self, durability="None"):
+        """
+        The initialization method of AtomicWriter() class.
 
-    def get(self, data=None):
+        :param str durability: The durability level to use. (See self.durabilities)
         """
-        Get data from config file.
 
-        :param str data: The key/name of the value you are looking for.
+        if durability not in self.durabilities:
+            raise ValueError("Unsupported durability level")
 
-        :returns bool:
-        :returns int:
-        :returns float:
-        :returns str:
-        :returns void:
+        self.durability = durability
+
+    @staticmethod
+    def _create_temp_file(path):
         """
+        Create a new temporary file beside <path>.
 
-        contents = self._open_config_file()
+        :param str path: The path of the file to be replaced.
 
-        if data is None:
-            return None
+        :returns tuple: The file descriptor and the path of the temporary file.
+        """
 
-        else:
-            contents = contents.split('\n')
+        directory, filename = os.path.split(os.path.abspath(path))
+        while True:
+            temp_path = os.path.join(directory, ".{0}.{1}.tmp".format(filename, os.urandom(4).hex()))
+            try:
+                # The mode is masked by the umask, just like with open().
+                fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0), 0o666)
+
+            except FileExistsError:
+                continue
 
-            for content in contents:
-                if content.startswith('#'):
-                    continue
+            else:
+                break
 
-                elif content.startswith(data + '='):
-                    # This if-else statement below is *specially* for booleans.
-                    # ! DEV0001: Might introduce bugs in the future!
-                    if content.replace('\n', '').partition('=')[2].lower() == "true":
-                        return True
+        try:
+            # Keep the permissions of the file we are replacing.
+            os.chmod(temp_path, stat.S_IMODE(os.stat(path).st_mode))
 
-                    elif content.replace('\n', '').partition('=')[2].lower() == "false":
-                        return False
+        except FileNotFoundError:
+            pass
 
-                    elif content.replace('\n', '').partition('=')[2].isdigit():
-                        try:
-                            return int(content.replace('\n', '').partition('=')[2])
+        except OSError:
+            os.close(fd)
+            os.remove(temp_path)
+            raise
 
-                        except ValueError:
-                            return content.replace('\n', '').partition('=')[2]
+        return fd, temp_path
 
-                    elif content.replace('\n', '').partition('=')[2].replace('.', '').isdigit():
-                        try:
-                            return float(content.replace('\n', '').partition('=')[2])
+    @staticmethod
+    def _fsync_directory(directory):
+        """
+        Flush the directory entries of <directory> to the disk.
 
-                        except ValueError:
-                            return content.replace('\n', '').partition('=')[2]
+        :param str directory: The directory to flush.
 
-                    elif content.replace('\n', '').partition('=')[2] == "None":
-                        try:
-                            return None
+        :returns void:
+        """
 
-                        except ValueError:
-                            return content.replace('\n', '').partition('=')[2]
+        if os.name == "nt":
+            # Directories cannot be opened on Windows.
+            return None
 
-                    else:
-                        return content.replace('\n', '').partition('=')[2]
+        fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
 
-                else:
-                    continue
+        finally:
+            os.close(fd)
 
-    def set(self, variable=None, value=None):
+    @contextlib.contextmanager
+    def open(self, path, mode='w', encoding="utf-8"):
         """
-        Set a new value for `variable`.
+        Open a temporary file that replaces <path> when the `with` block exits.
+        <path> is left untouched if an exception is raised inside the block.
 
-        :param str variable: The variable name/key to modify/add.
-        :param str value: The desired value of <variable>.
+        :param str path: The path of the file to replace.
+        :param str mode: Either 'w' (text) or 'wb' (binary).
+        :param str encoding: The encoding to use in text mode.
 
-        :returns int, str: Error code and error description (if there is one.)
+        Usage:
+            with AtomicWriter().open("config.dat") as f:
+                f.write("data")
         """
 
-        if variable is None or value is None:
-            return 11
-
-        else:
-            try:
-                variable = str(variable)
-                value = str(value)
+        if mode not in ('w', "wb"):
+            raise ValueError("mode must be either 'w' or 'wb'")
 
-            except(TypeError, ValueError):
-                return 11
+        fd, temp_path = self._create_temp_file(path)
+        try:
+            if mode == "wb":
+                fopen = os.fdopen(fd, mode)
 
             else:
-                contents = self._open_config_file().split('\n')
-                new_config = []
-                for content in contents:
-                    if content.startswith('#'):
-                        new_config.append(content)
-
-                    elif content.startswith(variable + '='):
-                        new_config.append(variable + '=' + value)
+                fopen = os.fdopen(fd, mode, encoding=encoding)
 
-                    elif content == "":
-                        new_config.append('')
+            with fopen:
+                yield fopen
 
-                    else:
-                        new_config.append(content)
+                fopen.flush()
+                if self.durability != "None":
+                    os.fsync(fopen.fileno())
 
-                result = ""
-                for line in new_config:
-                    if line == "":
-                        result += ''
+            os.replace(temp_path, path)
 
-                    else:
-                        result += line + '\n'
+        except BaseException:
+            try:
+                os.remove(temp_path)
 
-                try:
-                    self._save_config_file(result)
+            except OSError:
+                pass
 
-                except Exception as error:
-                    return 1, str(error)
+            raise
 
-                else:
-                    return 0
+        if self.durability == "directory":
+            self._fsync_directory(os.path.dirname(os.path.abspath(path)))
 
-    def new(self):
+    def write(self, path, data, encoding="utf-8"):
         """
-        Create a new configuration file.
+        Atomically replace the contents of <path> with <data>.
 
-        :returns int, str: Error code and an error description, if there is one.
+        :param str path: The path of the file to replace.
+        :param str data: The new contents of the file.
+        :param bytes data: The new contents of the file.
+        :param bytearray data: The new contents of the file.
+        :param str encoding: The encoding to use if <data> is a string.
+
+        :returns void:
         """
 
-        if os.path.exists(self.config_path):
-            return 2651, "File already exists"
+        with self.open(path, 'w' if type(data) is str else "wb", encoding) as fopen:
+            fopen.write(data)
 
-        new_config = [
-            "# ConfigHandler configuration file",
-            "# Configuration File Version: 0.0.1.0"
-        ]
-        result = ""
-        for line in new_config:
-            if line == "":
-                result += ''
 
-            else:
-                result += line + '\n'
+class Compression(object):
+    """
+    The class that contains the supported compression algorithms.
+    """
 
-        try:
-            self._save_config_file(result)
+    # name: (container ID, compress(data, level), decompress(data), (minimum level, default level, maximum level))
+    algorithms = collections.OrderedDict()
 
-        except Exception as error:
-            return 1, str(error)
+    @classmethod
+    def register(cls, name, algorithm_id, compress, decompress, levels):
+        """
+        Add a new compression algorithm.
 
-        else:
-            return 0
+        :param str name: The name of the compression algorithm.
+        :param int algorithm_id: The ID of the algorithm in the `v3` container header. (0-255)
+        :param compress: A function that accepts the data and the compression level, and returns the compressed data.
+        :param decompress: A function that accepts the compressed data and returns the original data.
+        :param tuple levels: The minimum, default, and maximum compression levels. (-128 to 127)
 
-    def add(self, variable=None, value=None):
+        :returns void:
         """
-        Add a new variable and set value for it.
 
-        :param str variable: The variable name/key to modify/add.
-        :param str value: The desired value of <variable>.
+        for other_name in cls.algorithms:
+            if other_name != name and cls.algorithms[other_name][0] == algorithm_id:
+                raise ValueError("The compression algorithm ID is already used by `{0}`".format(other_name))
 
-        :returns int, str: Error code and the error description if there is one.
-        """
+        if not -128 <= levels[0] <= levels[1] <= levels[2] <= 127:
+            raise ValueError("Invalid compression levels")
 
-        if variable is None or value is None:
-            return 11
+        cls.algorithms[name] = (algorithm_id, compress, decompress, tuple(levels))
 
-        else:
-            try:
-                variable = str(variable)
-                value = str(value)
+    @classmethod
+    def name_of(cls, algorithm_id):
+        """
+        Get the name of the compression algorithm with the ID <algorithm_id>.
 
-            except(TypeError, ValueError):
-                return 11
+        :param int algorithm_id: The ID of the algorithm in the `v3` container header.
 
-            else:
-                contents = self._open_config_file().split('\n')
-                new_config = []
-                for content in contents:
-                    if content.startswith('#'):
-                        new_config.append(content)
+        :returns str: The name of the compression algorithm.
+        """
 
-                    elif content.startswith(variable + '='):
-                        return 15
+        for name in cls.algorithms:
+            if cls.algorithms[name][0] == algorithm_id:
+                return name
 
-                    elif content == "":
-                        new_config.append('')
+        raise ValueError("Invalid compression algorithm ID")
 
-                    else:
-                        new_config.append(content)
+    @classmethod
+    def validate_level(cls, name, level=None):
+        """
+        Check the compression level of <name>.
 
-                new_config.append(variable + '=' + value)
+        :param str name: The name of the compression algorithm.
+        :param int level: The compression level, or None to use the default level.
 
-                result = ""
-                for line in new_config:
-                    if line == "":
-                        result += ''
+        :returns int: The compression level.
+        """
 
-                    else:
-                        result += line + '\n'
+        if name not in cls.algorithms:
+            raise ValueError("Invalid compression algorithm name")
 
-                try:
-                    self._save_config_file(result)
+        minimum, default, maximum = cls.algorithms[name][3]
+        if level is None:
+            return default
 
-                except Exception as error:
-                    return 1, str(error)
+        if type(level) is not int or not minimum <= level <= maximum:
+            raise ValueError("The compression level of `{0}` must be from {1} to {2}".format(name, minimum, maximum))
 
-                else:
-                    return 0
+        return level
 
-class Version2():
-    """
-    The class containing methods to use the version 2 configuration file.
-    """
+    @classmethod
+    def compress(cls, name, data, level=None):
+        """
+        Compress <data> using <name>.
 
-    def __init__(self, configpath, epass=None):
+        :param str name: The name of the compression algorithm.
+        :param bytes data: The data to compress.
+        :param int level: The compression level, or None to use the default level.
+
+        :returns bytes: The compressed data.
         """
-        The initialization method of Version2() class.
 
-        :param str configpath: The path of the configuration file to use.
-        :param str epass: The encryption password (Optional)
+        return cls.algorithms[name][1](data, cls.validate_level(name, level))
+
+    @classmethod
+    def decompress(cls, name, data):
         """
+        Decompress <data> using <name>.
 
-        self.VERSION = "0.0.1.1"  # Parser version
+        :param str name: The name of the compression algorithm.
+        :param bytes data: The data to decompress.
 
-        self.configpath = configpath
-        self.__data = {
-            "name": None,
-            "author": None,
-            "version": None,
-            "compression": None,
-            "encryption": None,
-            "dictionary": None  # The encrypted form of the dictionary
-        }
-        self.__dictionary = None  # The decrypted form of the dictionary
-        self.__epass = epass
-        self.encoding = "utf-8"  # ? What if we include this inside config data?
+        :returns bytes: The decompressed data.
+        """
 
-        # A list of supported data types
-        self.datatypes = ("str", "int", "float", "bool", "arr", "bin")
-        self.array_datatypes = ("str", "int", "float", "bool", "bin")
-        self.datatypes_conversion = {
-            "str": (str,),
-            "int": (int,),
-            "float": (float,),
-            "bool": (bool,),
-            "arr": (list, tuple),
-            "bin": (bytes,)
-        }
-        self.array_datatypes_conversion = {
-            "str": (str,),
-            "int": (int,),
-            "float": (float,),
-            "bool": (bool,),
-            "bin": (bytes,)
-        }
+        if name not in cls.algorithms:
+            raise ValueError("Invalid compression algorithm name")
 
-        # Configuration file fields and their types
-        self.keynames = {
-            "name": (str,),
-            "author": (str,),
-            "version": (str,),
-            "compression": (str,),
-            "encryption": (str,),
-            "dictionary": (str,)
-        }
+        return cls.algorithms[name][2](data)
 
-        # A list of supported compression algorithms
-        self.compressions = ("None", "zlib")  # `huffman` soon to be supported
+    @classmethod
+    def benchmark(cls, data, repeat=3, algorithms=None):
+        """
+        Measure the compression ratio and speed of the compression algorithms on <data>.
 
-        # A list of supported encryption algorithms
-        self.encryptions = ("None", "aes256")
+        :param bytes data: The data to compress.
+        :param int repeat: The number of times each algorithm is timed. The fastest time is used.
+        :param list algorithms: [Optional] The names of the compression algorithms to measure. (Default: All)
 
-    def __b64encode(self, to_encode, return_bytes=False):
+        :returns list: A list of dictionaries with the name, level, size, ratio, compression and decompression time.
         """
-        Encode <to_encode> using Base64.
 
-        :param str to_encode: The string to encode.*
-        :param int to_encode: The integer to encode.*
-        :param float to_encode: The decimal to encode.*
-        :param bool to_encode: The boolean to encode.*
-        :param bytes to_encode: The bytes to encode.*
-        :param bool return_bytes: If True, this method will return the result in `bytes`.
+        results = []
+        for name in (cls.algorithms if algorithms is None else algorithms):
+            minimum, default, maximum = cls.algorithms[name][3]
+            for level in sorted(set((minimum, default, maximum))):
+                compress_time = decompress_time = None
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    compressed = cls.compress(name, data, level)
+                    elapsed = time.perf_counter() - start
+                    compress_time = elapsed if compress_time is None else min(compress_time, elapsed)
+
+                    start = time.perf_counter()
+                    cls.decompress(name, compressed)
+                    elapsed = time.perf_counter() - start
+                    decompress_time = elapsed if decompress_time is None else min(decompress_time, elapsed)
+
+                results.append({
+                    "compression": name,
+                    "level": level,
+                    "size": len(compressed),
+                    "ratio": len(compressed) / len(data) if len(data) else 1.0,
+                    "compress_time": compress_time,
+                    "decompress_time": decompress_time
+                })
+
+        return results
+
+    @classmethod
+    def recommend(cls, results, priority="balanced", tolerance=0.1):
+        """
+        Pick a compression algorithm from the results of benchmark().
 
-        *The supported data types (except str and bytes) are converted to str.
-        *str data types are converted to bytes.
+        :param list results: The results of benchmark().
+        :param str priority: What to optimize for.
+                             Available priorities:
+                                 - size: The smallest output.
+                                 - speed: The fastest compression and decompression.
+                                 - balanced: The fastest of the algorithms within <tolerance> of the smallest output.
+        :param float tolerance: The allowed size difference for the `balanced` priority. (0.1 is 10%)
 
-        :returns str: The string version of the <encoded> (data type `bytes`) variable.
-        :returns bytes: The bytes version of the <encoded> variable.
+        :returns dict: The chosen entry of <results>.
         """
 
-        if type(to_encode) in (str, int, float, bool):
-            to_encode = str(to_encode).encode(self.encoding)
+        def total_time(result):
+            return result["compress_time"] + result["decompress_time"]
 
-        elif type(to_encode) is bytes:
-            pass
+        if priority == "size":
+            return min(results, key=lambda result: (result["size"], total_time(result)))
 
-        else:
-            raise ValueError("Unsupported data type.")
+        elif priority == "speed":
+            return min(results, key=lambda result: (total_time(result), result["size"]))
 
-        encoded = base64.b64encode(to_encode)
-        if return_bytes:
-            return encoded
+        elif priority == "balanced":
+            smallest = min(result["size"] for result in results)
+            candidates = [result for result in results if result["size"] <= smallest * (1 + tolerance)]
+            return min(candidates, key=lambda result: (total_time(result), result["size"]))
 
         else:
-            return str(encoded.decode(self.encoding))
+            raise ValueError("Unsupported priority")
+
+
+Compression.register("None", 0, lambda data, level: data, lambda data: data, (0, 0, 0))
+Compression.register("zlib", 1, zlib.compress, zlib.decompress, (0, 6, 9))
+Compression.register("lzma", 2, lambda data, level: lzma.compress(data, preset=level), lzma.decompress, (0, 6, 9))
+Compression.register("bz2", 3, bz2.compress, bz2.decompress, (1, 9, 9))
+if zstandard is not None:
+    Compression.register(
+        "zstd", 4,
+        lambda data, level: zstandard.ZstdCompressor(level=level).compress(data),
+        lambda data: zstandard.ZstdDecompressor().decompress(data),
+        (1, 3, 22)
+    )
+
+if lz4 is not None:
+    Compression.register(
+        "lz4", 5,
+        lambda data, level: lz4.frame.compress(data, compression_level=level),
+        lz4.frame.decompress,
+        (0, 0, 16)
+    )
+
+
+class Instrumentation(object):
+    """
+    Collect the duration and byte counts of each stage of reading and writing configuration files.
 
-    def __b64decode(self, to_decode):
-        """
-        Decode <to_decode> using Base64.
+    Pass an instance as the `observer` of Version1() or Version2().
+    Any callable accepting `(stage, seconds, bytes_in, bytes_out)` can be used as an observer instead.
 
-        :param str to_decode: The string to decode.
-        :param bytes to_decode: The bytes to decode.
+    Usage:
+        instrumentation = Instrumentation()
+        config = Version2("config.dat", observer=instrumentation)
+        config.load()
+        print(instrumentation.stats())
+    """
 
-        :returns bytes: The decoded form of <to_decode> in `bytes` data type.
+    def __init__(self):
+        self.counters = {}  # `stage: [calls, seconds, bytes in, bytes out]`
+        self._lock = threading.Lock()
+
+    def __call__(self, stage, seconds, bytes_in, bytes_out):
         """
+        Record a single run of <stage>.
 
-        if type(to_decode) is str:
-            to_decode = to_decode.encode(self.encoding)
+        :param str stage: The name of the stage. (e.g. `readdict.decompress`)
+        :param float seconds: The duration of the stage.
+        :param int bytes_in: The size of the input of the stage.
+        :param int bytes_out: The size of the output of the stage.
 
-        elif type(to_decode) is bytes:
-            pass
+        :returns void:
+        """
 
-        else:
-            raise ValueError("Unsupported data type.")
+        with self._lock:
+            counter = self.counters.get(stage, None)
+            if counter is None:
+                counter = self.counters[stage] = [0, 0.0, 0, 0]
 
-        return base64.b64decode(to_decode)
+            counter[0] += 1
+            counter[1] += seconds
+            counter[2] += bytes_in
+            counter[3] += bytes_out
 
-    def __readconfig(self):
+    def stats(self, prefix="config_handler."):
         """
-        Read the configuration file.
+        Export the counters as a flat dictionary for metrics systems.
 
-        :returns void:
+        :param str prefix: The prefix of every key.
+
+        :returns dict: `<prefix><stage>.<calls|seconds|bytes_in|bytes_out>: value` pairs.
         """
 
-        with open(self.configpath, 'r') as f:
-            self.__data = json.loads(self.__b64decode(f.read()))
+        stats = {}
+        with self._lock:
+            for stage, counter in self.counters.items():
+                for field, value in zip(("calls", "seconds", "bytes_in", "bytes_out"), counter):
+                    stats["{0}{1}.{2}".format(prefix, stage, field)] = value
 
-    def __writeconfig(self):
+        return stats
+
+    def reset(self):
         """
-        Replace existing data from <self.configpath> with <self.__data>.
+        Clear the counters.
 
         :returns void:
         """
 
-        # Check if `self.__data` values are valid.
-        self._validate_data()
+        with self._lock:
+            self.counters = {}
 
-        # Write new data to `self.configpath`.
-        with open(self.configpath, 'w') as f:
-            f.write(self.__b64encode(json.dumps(self.__data, separators=(',', ':'))))
+    @staticmethod
+    def size(data):
+        """
+        Get the size of <data> if it is a string or a bytes-like object.
 
-    def _validate_data(self, configdata=None):
+        :returns int: The length of <data>, or 0.
         """
-        Validate configuration data (data type `dict`).
-        Raises `ValueError` if there is an invalid value in the data.
-        Raises `TypeError` if `configdata` is invalid.
 
-        :param dict configdata: The dictionary form of configuration data.
+        if isinstance(data, (bytes, bytearray, memoryview, mmap.mmap, str)):
+            return len(data)
 
-        :returns void:
+        return 0
+
+    @staticmethod
+    def measure(observer, stage, function, *args):
         """
+        Call `function(*args)`, reporting its duration to <observer> if it is not None.
+        The input size is taken from the first argument, and the output size from the return value.
 
-        if configdata is None:
-            configdata = self.__data
+        :param observer: The observer, or None to call <function> without measuring it.
+        :param str stage: The name of the stage.
+        :param function: The function to call.
 
-        else:
-            if type(configdata) is dict:
-                pass
+        :returns: The return value of <function>.
+        """
 
-            else:
-                raise TypeError("configdata must be a dictionary.")
+        if observer is None:
+            return function(*args)
 
-        for key in self.keynames:
-            if type(configdata[key]) not in self.keynames[key]:
-                raise ValueError("The key does not have a valid value data type.")
+        start = time.perf_counter()
+        result = function(*args)
+        elapsed = time.perf_counter() - start
+        observer(stage, elapsed, Instrumentation.size(args[0]) if args else 0, Instrumentation.size(result))
+        return result
 
-            else:
-                continue
 
-    def __readdict(self):
-        """
-        Read the dictionary and store it in <self.__dictionary>.
+class LockTimeoutError(IOError):
+    """
+    Raised when a FileLock cannot be acquired in time.
+    """
 
-        :returns void:
-        """
 
-        if type(self.__data["dictionary"]) is str:
-            dictionary = self.__data["dictionary"].encode(self.encoding)
+class ConfigModifiedError(IOError):
+    """
+    Raised by Version2.save() when the configuration file was modified by someone else after it was loaded.
+    """
 
-        elif type(self.__data["dictionary"]) is bytes:
-            dictionary = self.__data["dictionary"]
 
-        else:
-            raise TypeError("Invalid dictionary!")
+class FileLock(object):
+    """
+    An advisory lock shared between processes, using `fcntl.flock()`.
+    The lock is held on `<path>.lock` instead of <path>, since configuration files are replaced, not modified.
+    The lock file is left in place; Removing it could let two processes lock different files.
 
-        if dictionary == b'':
-            # A lazy guess if the dictionary is empty.
-            self.__dictionary = {}
-            return None
+    Threads of the same process share the lock; A thread holding the shared lock must not ask for the exclusive one.
+    With a <mutex>, it is acquired before the lock and released after it, so that code locking both
+    always locks them in the same order. (Version2(threadsafe=True) passes the lock that serializes its writers.)
 
-        # Decompression
-        dictionary = self.__b64decode(dictionary)
-        if self.__data["compression"] == "None":
-            decompressed = dictionary
+    Usage:
+        lock = FileLock("config.dat")
+        with lock.exclusive(timeout=5):
+            ...
 
-        elif self.__data["compression"] == "zlib":
-            decompressed = zlib.decompress(dictionary)
+        if lock.try_acquire():
+            try:
+                ...
 
-        else:
-            raise ValueError("Invalid compression algorithm name")
+            finally:
+                lock.release()
+    """
 
-        # Decryption
-        decompressed = self.__b64decode(decompressed)
-        if self.__data["encryption"] == "None":
-            decrypted = decompressed
+    poll_interval = 0.01  # The initial delay between attempts to acquire the lock with a timeout, in seconds.
 
-        elif self.__data["encryption"] == "aes256":
-            decrypted = self.__b64decode(AES256(self.__epass).decrypt(decompressed))
+    def __init__(self, path, timeout=None, mutex=None):
+        """
+        The initialization method of FileLock() class.
 
-        else:
-            raise ValueError("Invalid encryption algorithm name")
+        :param str path: The path of the file to lock.
+        :param float timeout: The default number of seconds to wait for the lock. (None waits forever)
+        :param mutex: [Optional] A reentrant lock (threading.RLock()) to hold with the lock.
+        """
+
+        if fcntl is None:
+            raise ValueError("File locking is not supported on this platform")
 
+        self.path = path + ".lock"
+        self.timeout = timeout
+        self.mutex = mutex
+        self._condition = threading.Condition(threading.Lock())
+        self._fd = None
+        self._exclusive = False
+        self._locking = False  # True while a thread waits for the other processes.
+        self._holders = {}  # `thread: depth` of the threads of this process holding the lock.
+
+    def acquire(self, exclusive=True, timeout=None):
         """
-        if type(decrypted) is bytes:
-            decrypted = decrypted.decode()
+        Acquire the lock, waiting for up to <timeout> seconds.
+        Raises LockTimeoutError if the lock is not acquired in time.
+
+        :param bool exclusive: True for an exclusive (write) lock, False for a shared (read) lock.
+        :param float timeout: The number of seconds to wait. (0 to not wait; None to use <self.timeout>)
+
+        :returns void:
         """
 
-        if decrypted == "":
-            # Another lazy check if plaintext is empty.
-            self.__dictionary = {}
-            return None
+        if timeout is None:
+            timeout = self.timeout
 
-        # <variable_name>|<datatype>|<value>
-        # <variable_name>|<datatype>|<array_datatype>|<values>
-        self.__dictionary = json.loads(decrypted)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        if self.mutex is None:
+            return self._acquire(exclusive, deadline)
 
-    def __writedict(self):
+        if not self.mutex.acquire(timeout=-1 if timeout is None else max(timeout, 0)):
+            raise LockTimeoutError("Timed out waiting for the lock on {0}".format(self.path))
+
+        try:
+            self._acquire(exclusive, deadline)
+
+        except BaseException:
+            self.mutex.release()
+            raise
+
+    def _acquire(self, exclusive, deadline):
         """
-        Replace existing data from self.__data["dictionary"] with <newdict>.
+        Acquire the lock without the mutex. (See acquire())
 
-        :param str newdict: The whole dictionary to write.
+        :param bool exclusive: See acquire().
+        :param float deadline: The time.monotonic() time to give up at. (None waits forever)
 
         :returns void:
         """
 
-        # Encrypt the result
-        if self.__data["encryption"] == "None":
-            eresult = self.__b64encode(json.dumps(self.__dictionary, separators=(',', ':')), True)
+        ident = threading.get_ident()
+        with self._condition:
+            if ident in self._holders:
+                if exclusive and not self._exclusive:
+                    raise ValueError("A shared lock cannot be upgraded to an exclusive lock")
 
-        elif self.__data["encryption"] == "aes256":
-            eresult = self.__b64encode(AES256(self.__epass).encrypt(self.__b64encode(json.dumps(self.__dictionary, separators=(',', ':')))), True)
+                self._holders[ident] += 1
+                return None
 
-        else:
-            raise ValueError("Invalid encryption algorithm name")
+            # Wait for the other threads of this process first.
+            while self._locking or (self._holders and (exclusive or self._exclusive)):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise LockTimeoutError("Timed out waiting for the lock on {0}".format(self.path))
 
-        # Compress the result
-        if self.__data["compression"] == "None":
-            cresult = eresult
+                self._condition.wait(remaining)
 
-        elif self.__data["compression"] == "zlib":
-            cresult = zlib.compress(eresult)
+            if not self._holders:
+                # Let the other threads time out while this one waits for the other processes.
+                self._locking = True
+                self._condition.release()
+                try:
+                    self._fd = self._lock_file(exclusive, deadline)
 
-        else:
-            raise ValueError("Invalid compression algorithm name")
+                finally:
+                    self._condition.acquire()
+                    self._locking = False
+                    self._condition.notify_all()
 
-        self.__data["dictionary"] = self.__b64encode(cresult)
+                self._exclusive = exclusive
 
-    def load(self, load_dict=True):
+            self._holders[ident] = 1
+
+    def try_acquire(self, exclusive=True):
         """
-        Get the current values of the configuration file.
-        This method must be called first to work with the configuration file.
+        Acquire the lock if it is available right now.
 
-        :param bool load_dict: If True, this method will decrypt and decode the dictionary and store it to `self.__dictionary`.
+        :param bool exclusive: True for an exclusive (write) lock, False for a shared (read) lock.
 
-        :returns void:
+        :returns bool: True if the lock was acquired.
         """
 
-        self.__readconfig()
-        if load_dict:
-            self.__readdict()
+        try:
+            self.acquire(exclusive, 0)
 
-    def info(self):
+        except LockTimeoutError:
+            return False
+
+        return True
+
+    def release(self):
         """
-        Return information about the configuration file.
+        Release the lock held by the current thread.
 
-        :returns dict:
+        :returns void:
         """
 
-        if self.__data is None:
-            raise ValueError("The configuration file is not yet loaded!")
+        self._release()
+        if self.mutex is not None:
+            self.mutex.release()
 
-        result = self.__data
-        try:
-            result.pop("dictionary")
+    def _release(self):
+        """
+        Release the lock without the mutex. (See release())
 
-        except KeyError:
-            pass
+        :returns void:
+        """
 
-        if type(result["version"]) is not list and result["version"] is not None:
-            newver = result["version"].split('.')
+        ident = threading.get_ident()
+        with self._condition:
+            depth = self._holders.get(ident, 0)
+            if depth == 0:
+                raise ValueError("The lock is not held by this thread")
 
-        else:
-            newver = result["version"]
+            if depth > 1:
+                self._holders[ident] = depth - 1
+                return None
 
-        # Convert result["version"] to a list of integers
-        newver2 = []
-        for _ in newver:
-            newver2.append(int(_))
+            del self._holders[ident]
+            if not self._holders:
+                fd, self._fd = self._fd, None
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
 
-        result["version"] = newver2
+                finally:
+                    os.close(fd)
 
-        if self.__dictionary is None:
-            result["loaded_dictionary"] = False
+                self._condition.notify_all()
 
-        else:
-            result["loaded_dictionary"] = True
+    @contextlib.contextmanager
+    def shared(self, timeout=None):
+        """
+        Hold the shared (read) lock inside a `with` block. (See acquire())
+        """
 
-        return result
+        self.acquire(False, timeout)
+        try:
+            yield self
+
+        finally:
+            self.release()
 
-    def get(self, key):
+    @contextlib.contextmanager
+    def exclusive(self, timeout=None):
+        """
+        Hold the exclusive (write) lock inside a `with` block. (See acquire())
         """
-        Get the value of <key>.
 
-        :param str key: The name/key of the value you are looking for.
+        self.acquire(True, timeout)
+        try:
+            yield self
 
-        :returns str: Returns type(str) if the <key>'s datatype is `str`.
-        :returns int: Returns type(int) if the <key>'s datatype is `int`.
-        :returns float: Returns type(float) if the <key>'s datatype is `float`.
-        :returns bool: Returns type(bool) if the <key>'s datatype is `bool`.
-        :returns list: Returns type(list) if the <key>'s datatype is `arr`.
-        :returns bytes: Returns type(bytes) if the <key>'s datatype is `bin`.
-        """
+        finally:
+            self.release()
 
-        if self.__dictionary is None or self.__data is None:
-            raise ValueError("The configuration file is not yet loaded!")
+    def _lock_file(self, exclusive, deadline):
+        """
+        Lock the lock file, polling until <deadline> if it is not None.
 
-        elif type(self.__dictionary) is dict:
-            value = self.__dictionary[key]
-            if value[0] == "str":
-                value = str(value[1])
+        :returns int: The file descriptor of the locked file.
+        """
 
-            elif value[0] == "int":
-                value = int(value[1])
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o666)
+        operation = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+        delay = self.poll_interval
+        try:
+            while True:
+                try:
+                    fcntl.flock(fd, operation if deadline is None else operation | fcntl.LOCK_NB)
+                    break
 
-            elif value[0] == "float":
-                value = float(value[1])
+                except BlockingIOError:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise LockTimeoutError("Timed out waiting for the lock on {0}".format(self.path))
 
-            elif value[0] == "bool":
-                if int(value[1]) == 0:
-                    value = False
+                    time.sleep(min(delay, remaining))
+                    delay = min(delay * 2, 0.1)
 
-                elif int(value[1]) == 1:
-                    value = True
+        except BaseException:
+            os.close(fd)
+            raise
 
-                else:
-                    raise ValueError("Unknown boolean state")
+        return fd
 
-            elif value[0] == "arr":
-                newvalue = value[2]
-                valuearrdatatype = value[1]
-                value = []
-                for _ in newvalue:
-                    if valuearrdatatype == "str":
-                        value.append(str(_))
 
-                    elif valuearrdatatype == "int":
-                        value.append(int(_))
+def _locks_file(exclusive):
+    """
+    Run the decorated method while holding the FileLock of a Version1() or Version2() object, if it has one.
 
-                    elif valuearrdatatype == "float":
-                        value.append(float(_))
+    :param bool exclusive: True to hold the exclusive (write) lock, False to hold the shared (read) lock.
+    """
 
-                    elif valuearrdatatype == "bool":
-                        if int(_) == 0:
-                            value.append(False)
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            lock = self.file_lock
+            if lock is None:
+                return method(self, *args, **kwargs)
 
-                        elif int(_) == 1:
-                            value.append(True)
+            lock.acquire(exclusive)
+            try:
+                return method(self, *args, **kwargs)
 
-                        else:
-                            raise ValueError("Unknown boolean state")
+            finally:
+                lock.release()
 
-                    elif valuearrdatatype == "bin":
-                        value.append(self.__b64decode(_))
+        return wrapper
 
-                    else:
-                        raise ValueError("Invalid data type")
+    return decorator
 
-            elif value[0] == "bin":
-                value = self.__b64decode(value[1])
 
-            else:
-                raise ValueError("Invalid data type")
+class Version1():
+    """
+    The class containing methods to use the version 1 configuration file.
+    """
 
-            return value
+    # Base64-encoded files are read in chunks of this many bytes (a multiple of 4, so that each chunk decodes
+    # on its own), and written in chunks of the same size. Characters outside the Base64 alphabet are ignored.
+    _base64_chunk_size = 65536
+    _base64_ignored = bytes(sorted(set(range(256)).difference(
+        b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/="
+    )))
 
-        else:
-            raise ValueError("Invalid dictionary")
+    def __init__(self, config_path="data/config.dat", isbase64=False, encoding="utf-8", durability="None", observer=None, lock=False, lock_timeout=None):
+        """
+        The initialization method for ConfigHandler() class.
 
-    def add(self, key, valuetype, value, array_datatype=None):
+        :param str config_path: The path of the configuration file to use.
+        :param bool isbase64: True if the configuration file is encoded via Base64.
+        :param str encoding: The encoding to be used.
+        :param str durability: The durability level of writes. (See AtomicWriter.durabilities)
+        :param observer: Called with the duration of each read/write stage. (See Instrumentation)
+        :param bool lock: If True, reads and writes hold a FileLock, so that processes sharing the file do not lose updates.
+        :param float lock_timeout: The number of seconds to wait for the lock. (None waits forever; 0 does not wait)
         """
-        Add a new variable.
 
-        :param str key: The variable name/key.
-        :param str valuetype: The data type of the variable.
-                              Available valuetypes:
-                                  - str
-                                  - int
-                                  - float
-                                  - bool
-                                  - arr (list)
-                                  - bin (binary)
+        self.VERSION = "0.0.1.1"  # Parser version
+        self.config_path = config_path
+        self.isbase64 = isbase64
+        self.encoding = encoding
+        self._writer = AtomicWriter(durability)
+        self.observer = observer
+        self.file_lock = FileLock(config_path, lock_timeout) if lock else None
 
-        :param str value: The value of <key>. (If <valuetype> is `str`)
-        :param int value: The value of <key>. (If <valuetype> is `int`)
-        :param float value: The value of <key>. (If <valuetype> is `float`)
-        :param bool value: The value of <key>. (If <valuetype> is `bool`)
-        :param tuple value: The value of <key>. (If <valuetype> is `arr`)
-        :param list value: The value of <key>. (If <valuetype> is `arr`)
-        :param bytes value: The value of <key>. (If <valuetype> is `bin`)
+        self._index = None  # The parsed form of the configuration file; `key: value` (See _build_index())
+        self._index_stat = None  # The (mtime, size, inode) of the file when <self._index> was built.
+        self._transaction = None  # The pending lines of the configuration file inside a transaction.
 
-        :param str array_datatype: [OPTIONAL; If your valuetype is `arr`, this is required] The data type of the array objects (`arr` not supported)
+    def _stat_config_file(self):
+        """
+        Get the signature of the config file used to check if the index is stale.
 
-        :returns void:
+        :returns tuple: The modification time, size, and inode of the config file.
         """
 
-        # <variable_name>|<datatype>|<value>
-        # <variable_name>|<datatype>|<array_datatype>|<values>
+        try:
+            stat = os.stat(self.config_path)
 
-        if type(key) is not str:
-            raise TypeError("key is not a string")
+        except(FileNotFoundError, IOError, PermissionError):
+            raise IOError("Error reading the configuration file!")
 
-        if self.__dictionary is None or self.__data is None:
-            raise ValueError("The configuration file is not yet loaded!")
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
 
-        if self.__dictionary.get(key, None) is None:
-            # Add to the dictionary
-            if valuetype in self.datatypes:
-                if valuetype == "arr":
-                    if array_datatype is None:
-                        raise ValueError("array_datatype is required to create an array!")
+    def _load_index(self):
+        """
+        Parse the config file into <self._index> if it changed since it was last parsed.
+
+        :returns dict: A dictionary of `key: value` pairs.
+        """
 
-                    keyvalue = [valuetype, array_datatype, []]
-                    # Check the list
-                    if type(value) in self.datatypes_conversion["arr"]:
-                        for _ in value:
-                            if keyvalue[1] == "str":
-                                keyvalue[2].append(str(_))
+        if self._transaction is not None:
+            # Inside a transaction, the pending lines are the source of truth.
+            if self._index is None:
+                self._index = self._build_index(self._transaction)
 
-                            elif keyvalue[1] == "int":
-                                keyvalue[2].append(int(_))
+            return self._index
 
-                            elif keyvalue[1] == "float":
-                                keyvalue[2].append(float(_))
+        signature = self._stat_config_file()
+        if self._index is not None and self._index_stat == signature:
+            return self._index
 
-                            elif keyvalue[1] == "bool":
-                                if _ == True:
-                                    keyvalue[2].append(1)
+        with self._open_source() as source:
+            self._index = self._build_index(self._iter_lines(source))
 
-                                elif _ == False:
-                                    keyvalue[2].append(0)
+        self._index_stat = signature
+        return self._index
 
-                                else:
-                                    raise ValueError("Unknown boolean state")
+    @classmethod
+    def _build_index(cls, lines):
+        """
+        Build an index from the lines of a configuration file.
+        The type of each value is inferred here, once per parse. (See _parse_value())
 
-                            elif keyvalue[1] == "bin":
-                                if type(_) in self.datatypes_conversion["bin"]:
-                                    keyvalue[2].append(self.__b64encode(_, True).decode(self.encoding))
+        :param list lines: The lines of the configuration file.
 
-                                else:
-                                    raise("array object is not in bytes data type")
+        :returns dict: A dictionary of `key: value` pairs.
+        """
 
-                            else:
-                                raise ValueError("Unsupported array datatype")
+        parse_value = cls._parse_value
+        index = {}
+        for content in lines:
+            if content.startswith('#'):
+                continue
 
-                        self.__dictionary[key] = keyvalue
+            key, separator, value = content.partition('=')
+            if separator and key not in index:
+                # Only the first occurrence of a key is used, just like before.
+                index[key] = parse_value(value)
 
-                    else:
-                        raise TypeError("value must be a tuple or list when creating an array.")
+        return index
 
-                else:
-                    if valuetype == "str":
-                        self.__dictionary[key] = [valuetype, str(value)]
+    @staticmethod
+    def _parse_value(value):
+        """
+        Convert a raw value of the configuration file to its Python type.
 
-                    elif valuetype == "int":
-                        self.__dictionary[key] = [valuetype, int(value)]
+        :param str value: The raw value.
 
-                    elif valuetype == "float":
-                        self.__dictionary[key] = [valuetype, float(value)]
+        :returns bool: If <value> is `true` or `false`. (Case-insensitive)
+        :returns int: If <value> only contains digits.
+        :returns float: If <value> only contains digits and dots.
+        :returns void: If <value> is `None`.
+        :returns str: Otherwise.
+        """
 
-                    elif valuetype == "bool":
-                        if value == True:
-                            self.__dictionary[key] = [valuetype, 1]
+        # This if-else statement below is *specially* for booleans.
+        # ! DEV0001: Might introduce bugs in the future!
+        lowered = value.lower()
+        if lowered == "true":
+            return True
 
-                        elif value == False:
-                            self.__dictionary[key] = [valuetype, 0]
+        elif lowered == "false":
+            return False
 
-                        else:
-                            raise ValueError("Unknown boolean state")
+        elif value.isdigit():
+            try:
+                return int(value)
 
-                    elif valuetype == "bin":
-                        if type(value) in self.datatypes_conversion["bin"]:
-                            self.__dictionary[key] = [valuetype, self.__b64encode(value, True).decode(self.encoding)]
+            except ValueError:
+                return value
 
-                        else:
-                            raise ValueError("value is not in bytes data type")
+        elif value.replace('.', '').isdigit():
+            try:
+                return float(value)
 
-                    else:
-                        raise ValueError("Unsupported data type")
+            except ValueError:
+                return value
 
-            else:
-                raise ValueError("Unsupported data type")
+        elif value == "None":
+            return None
 
         else:
-            ValueError("A value is already assigned to the key. Use update() instead.")
+            return value
 
-    def update(self, key, value):
+    @staticmethod
+    def _join_lines(lines):
         """
-        Update an existing variable.
+        Join the lines of a configuration file, dropping the empty ones.
 
-        :param str key: The variable name/key to update.
-        :param str value: The new value of <key>.
+        :param list lines: The lines of the configuration file.
 
-        :returns void:
+        :returns str: The whole content of the configuration file.
         """
 
-        # <variable_name>|<datatype>|<value>
-        # <variable_name>|<datatype>|<array_datatype>|<values>
+        return ''.join(line + '\n' for line in lines if line != "")
 
-        if self.__dictionary is None or self.__data is None:
-            raise ValueError("The configuration file is not yet loaded!")
+    def _read_lines(self):
+        """
+        Get the lines of the configuration file, or the pending lines if a transaction is active.
 
-        if self.__dictionary.get(key, None) is not None:
-            if self.__dictionary[key][0] == "arr" and type(value) not in self.datatypes_conversion[self.__dictionary[key][0]]:
-                raise TypeError("New value must be a list or a tuple")
+        :returns list: The lines of the configuration file.
+        """
 
-            elif self.__dictionary[key][0] == "arr" and type(value) in self.datatypes_conversion[self.__dictionary[key][0]]:
-                for _ in value:
-                    if type(_) not in self.datatypes_conversion[self.__dictionary[key][1]]:
-                        raise TypeError("New value has different datatype than the old value")
+        if self._transaction is not None:
+            return self._transaction
 
-            if type(value) not in self.datatypes_conversion[self.__dictionary[key][0]]:
-                raise TypeError("New value has different datatype than the old value")
+        return self._open_config_file().split('\n')
 
-            oldvalue = self.__dictionary[key]
-            valuetype = oldvalue[0]
-            # Add to the dictionary
-            if valuetype == "arr":
-                array_datatype = oldvalue[1]
-                keyvalue = [valuetype, array_datatype, []]
-                # Check the list
-                if type(value) in self.datatypes_conversion[valuetype]:
-                    for _ in value:
-                        if keyvalue[1] == "str":
-                            keyvalue[2].append(str(_))
+    def _write_lines(self, lines):
+        """
+        Save <lines> to the configuration file, or keep them pending if a transaction is active.
 
-                        elif keyvalue[1] == "int":
-                            keyvalue[2].append(int(_))
+        :param list lines: The new lines of the configuration file.
 
-                        elif keyvalue[1] == "float":
-                            keyvalue[2].append(float(_))
+        :returns void:
+        """
 
-                        elif keyvalue[1] == "bool":
-                            if _ == True:
-                                keyvalue[2].append(1)
+        if self._transaction is not None:
+            self._transaction = lines
+            self._index = None
+
+        else:
+            self._save_config_file(self._join_lines(lines))
 
-                            elif _ == False:
-                                keyvalue[2].append(0)
+    @contextlib.contextmanager
+    def transaction(self):
+        """
+        Apply every set() and add() call inside the `with` block with a single write.
+        The configuration file is left untouched if an exception is raised inside the block.
+        Nested transactions are merged with the outermost one.
+
+        Usage:
+            with config.transaction():
+                config.set("key1", "value1")
+                config.add("key2", 1234)
+        """
 
-                            else:
-                                raise ValueError("Unknown boolean state")
+        savepoint = self._transaction
+        if savepoint is not None:
+            # Nested transaction; only roll back the changes made inside this block.
+            try:
+                yield self
 
-                        elif keyvalue[1] == "bin":
-                            if type(_) in self.datatypes_conversion["bin"]:
-                                keyvalue[2].append(self.__b64encode(_, True).decode(self.encoding))
+            except BaseException:
+                self._transaction = savepoint
+                self._index = None
+                raise
 
-                            else:
-                                raise("array object is not in bytes data type")
+            return
 
-                        else:
-                            raise ValueError("Unsupported array datatype")
+        # Other processes must not change the file between reading and writing it.
+        if self.file_lock is not None:
+            self.file_lock.acquire(True)
 
-                    self.__dictionary[key] = keyvalue
+        try:
+            original = self._read_lines()
+            self._transaction = original
+            self._index = None
+            try:
+                yield self
 
-                else:
-                    raise TypeError("value must be a tuple or list when updating an array.")
+            except BaseException:
+                self._transaction = None
+                self._index = None
+                raise
 
             else:
-                if valuetype == "str":
-                    self.__dictionary[key] = [valuetype, str(value)]
+                lines = self._transaction
+                self._transaction = None
+                self._index = None
+                if lines is not original:  # Do not rewrite the file if nothing has changed.
+                    self._save_config_file(self._join_lines(lines))
 
-                elif valuetype == "int":
-                    self.__dictionary[key] = [valuetype, int(value)]
+        finally:
+            if self.file_lock is not None:
+                self.file_lock.release()
 
-                elif valuetype == "float":
-                    self.__dictionary[key] = [valuetype, float(value)]
+    def _open_config_file(self):
+        """
+        Open the config file.
 
-                elif valuetype == "bool":
-                    if value == True:
-                        self.__dictionary[key] = [valuetype, 1]
+        :returns str: The configuration file data.
+        """
 
-                    elif value == False:
-                        self.__dictionary[key] = [valuetype, 0]
+        if self.isbase64 == True:
+            with self._open_source() as source:
+                return ''.join(self._decode_chunks(source))
 
-                    else:
-                        raise ValueError("Unknown boolean state")
+        with self._open_source() as source:
+            try:
+                return Instrumentation.measure(self.observer, "open_config_file.read", source.read)
 
-                elif valuetype == "bin":
-                    if type(value) in self.datatypes_conversion["bin"]:
-                        self.__dictionary[key] = [valuetype, self.__b64encode(value, True).decode(self.encoding)]
+            except(IOError, EOFError):
+                raise IOError("Error reading the configuration file!")
 
-                    else:
-                        raise ValueError("value is not in bytes data type")
+    def _open_source(self):
+        """
+        Open the config file for reading. (In binary mode if it is encoded via Base64)
 
-                else:
-                    raise ValueError("Unsupported data type")
+        :returns file: The opened file.
+        """
 
-        else:
+        try:
+            if self.isbase64 == True:
+                return open(self.config_path, "rb")
+
+            return open(self.config_path, 'r', encoding=self.encoding)
+
+        except(FileNotFoundError, IOError, EOFError,
+                PermissionError, IsADirectoryError):
+            raise IOError("Error reading the configuration file!")
+
+    def _iter_lines(self, source):
+        """
+        Read the config file line by line, without holding the whole file in memory.
+
+        :param file source: The configuration file from _open_source().
+
+        :returns generator: The lines of the configuration file, without the newline characters.
+        """
+
+        if self.isbase64 == True:
+            return self._split_lines(self._decode_chunks(source))
+
+        return (line[:-1] if line.endswith('\n') else line for line in source)
+
+    def _decode_chunks(self, source):
+        """
+        Decode a Base64-encoded configuration file, <self._base64_chunk_size> bytes at a time.
+
+        :param file source: The configuration file, opened in binary mode.
+
+        :returns generator: The decoded text, in chunks.
+        """
+
+        measure = Instrumentation.measure
+        decoder = codecs.getincrementaldecoder(self.encoding)()
+        pending = b''  # The characters after the last complete group of 4.
+        try:
+            while True:
+                try:
+                    chunk = measure(self.observer, "open_config_file.read", source.read, self._base64_chunk_size)
+
+                except(IOError, EOFError):
+                    raise IOError("Error reading the configuration file!")
+
+                if not chunk:
+                    break
+
+                chunk = pending + chunk.translate(None, self._base64_ignored)
+                end = len(chunk) - len(chunk) % 4
+                pending = chunk[end:]
+                yield decoder.decode(measure(self.observer, "open_config_file.decode", binascii.a2b_base64, chunk[:end]))
+
+            if pending:
+                raise ValueError("Incorrect padding")
+
+            yield decoder.decode(b'', True)
+
+        except(TypeError, ValueError, UnicodeDecodeError):
+            raise IOError("The configuration file is corrupt or decrypted!")
+
+    def _encode_chunks(self, chunks):
+        """
+        Base64-encode the text of a configuration file, a chunk at a time.
+
+        :param iterable chunks: The text of the configuration file.
+
+        :returns generator: The Base64-encoded text, in chunks.
+        """
+
+        pending = b''  # The bytes after the last complete group of 3.
+        for chunk in chunks:
+            data = pending + chunk.encode(self.encoding)
+            end = len(data) - len(data) % 3
+            pending = data[end:]
+            if end:
+                yield Instrumentation.measure(self.observer, "save_config_file.encode", self._b64encode, data[:end])
+
+        yield Instrumentation.measure(self.observer, "save_config_file.encode", self._b64encode, pending)
+
+    @staticmethod
+    def _b64encode(data):
+        """
+        Base64-encode <data>.
+
+        :param bytes data: The data to encode.
+
+        :returns str: The encoded data.
+        """
+
+        return binascii.b2a_base64(data, newline=False).decode("ascii")
+
+    @staticmethod
+    def _split_lines(chunks):
+        """
+        Split text chunks into lines, like `''.join(chunks).split('\\n')` does.
+
+        :param iterable chunks: The text.
+
+        :returns generator: The lines.
+        """
+
+        pending = ''
+        for chunk in chunks:
+            lines = (pending + chunk).split('\n')
+            pending = lines.pop()
+            yield from lines
+
+        yield pending
+
+    def _join_chunks(self, lines):
+        """
+        Join non-empty lines into chunks of about <self._base64_chunk_size> characters.
+
+        :param iterable lines: The lines of the configuration file.
+
+        :returns generator: The text of the configuration file, in chunks.
+        """
+
+        chunk = []
+        size = 0
+        for content in lines:
+            if content != "":
+                chunk.append(content + '\n')
+                size += len(content) + 1
+                if size >= self._base64_chunk_size:
+                    yield ''.join(chunk)
+                    chunk = []
+                    size = 0
+
+        yield ''.join(chunk)
+
+    def _save_config_file(self, config_data):
+        """
+        Save the config file.
+
+        :param str config_data: The whole content of the configuration file.
+
+        :returns int: Error code
+        """
+
+        if self.isbase64 == True:
+            # Encode the file a chunk at a time, instead of holding its encoded copies in memory.
+            size = self._base64_chunk_size
+            return self._write_chunks(config_data[offset:offset + size] for offset in range(0, len(config_data), size))
+
+        try:
+            Instrumentation.measure(
+                self.observer, "save_config_file.write",
+                lambda data: self._writer.write(self.config_path, data, self.encoding),
+                config_data
+            )
+
+        except(FileNotFoundError, IOError, EOFError,
+               PermissionError, IsADirectoryError):
+            raise IOError("Error writing to the configuration file!")
+
+        else:
+            # Our own writes must not be served from a stale index.
+            self._index = None
+            return 0
+
+    @_locks_file(False)
+    def get(self, data=None):
+        """
+        Get data from config file.
+
+        :param str data: The key/name of the value you are looking for.
+
+        :returns bool:
+        :returns int:
+        :returns float:
+        :returns str:
+        :returns void:
+        """
+
+        index = self._load_index()
+
+        if data is None:
+            return None
+
+        else:
+            return index.get(data, None)
+
+    @_locks_file(False)
+    def to_dict(self):
+        """
+        Get every variable of the config file at once.
+
+        :returns dict: The `variable: value` pairs, with the same types as get().
+        """
+
+        return dict(self._load_index())
+
+    @_locks_file(True)
+    def set(self, variable=None, value=None):
+        """
+        Set a new value for `variable`.
+
+        :param str variable: The variable name/key to modify/add.
+        :param str value: The desired value of <variable>.
+
+        :returns int, str: Error code and error description (if there is one.)
+        """
+
+        if variable is None or value is None:
+            return 11
+
+        else:
+            try:
+                variable = str(variable)
+                value = str(value)
+
+            except(TypeError, ValueError):
+                return 11
+
+            else:
+                return self._rewrite_lines(self._set_lines, variable, value)
+
+    @_locks_file(True)
+    def new(self):
+        """
+        Create a new configuration file.
+
+        :returns int, str: Error code and an error description, if there is one.
+        """
+
+        if os.path.exists(self.config_path):
+            return 2651, "File already exists"
+
+        new_config = [
+            "# ConfigHandler configuration file",
+            "# Configuration File Version: 0.0.1.0"
+        ]
+
+        try:
+            self._save_config_file(self._join_lines(new_config))
+
+        except Exception as error:
+            return 1, str(error)
+
+        else:
+            return 0
+
+    @_locks_file(True)
+    def add(self, variable=None, value=None):
+        """
+        Add a new variable and set value for it.
+
+        :param str variable: The variable name/key to modify/add.
+        :param str value: The desired value of <variable>.
+
+        :returns int, str: Error code and the error description if there is one.
+        """
+
+        if variable is None or value is None:
+            return 11
+
+        else:
+            try:
+                variable = str(variable)
+                value = str(value)
+
+            except(TypeError, ValueError):
+                return 11
+
+            else:
+                return self._rewrite_lines(self._add_lines, variable, value)
+
+    @staticmethod
+    def _set_lines(lines, variable, value):
+        """
+        Replace the value of <variable> in <lines>. (See set())
+
+        :param iterable lines: The lines of the configuration file.
+        :param str variable: The variable name/key to modify.
+        :param str value: The desired value of <variable>.
+
+        :returns generator: The new lines of the configuration file.
+        """
+
+        prefix = variable + '='
+        for content in lines:
+            if content.startswith('#'):
+                yield content
+
+            elif content.startswith(prefix):
+                yield prefix + value
+
+            else:
+                yield content
+
+    @staticmethod
+    def _add_lines(lines, variable, value):
+        """
+        Append <variable> to <lines>. (See add())
+        Raises `KeyError` if <variable> already exists.
+
+        :param iterable lines: The lines of the configuration file.
+        :param str variable: The variable name/key to add.
+        :param str value: The desired value of <variable>.
+
+        :returns generator: The new lines of the configuration file.
+        """
+
+        prefix = variable + '='
+        for content in lines:
+            if not content.startswith('#') and content.startswith(prefix):
+                raise KeyError(variable)
+
+            yield content
+
+        yield prefix + value
+
+    def _rewrite_lines(self, rewrite, *args):
+        """
+        Replace the lines of the configuration file with `rewrite(lines, *args)`.
+        Plain configuration files are rewritten line by line, so that they are never held in memory at once.
+
+        :param rewrite: _set_lines() or _add_lines().
+
+        :returns int, str: Error code and the error description if there is one.
+        """
+
+        # Windows cannot replace a file that is still open.
+        if self._transaction is not None or os.name == "nt":
+            contents = self._read_lines()
+            try:
+                self._write_lines(list(rewrite(contents, *args)))
+
+            except KeyError:
+                return 15  # The variable already exists. (See _add_lines())
+
+            except Exception as error:
+                return 1, str(error)
+
+            else:
+                return 0
+
+        # Like _read_lines(), errors reading the file are raised; Only the errors writing it are returned.
+        source = self._open_source()
+        read_errors = []
+
+        def lines():
+            try:
+                for line in self._iter_lines(source):
+                    yield line
+
+            except Exception as error:
+                read_errors.append(error)
+                raise
+
+        try:
+            with source:
+                self._write_chunks(self._join_chunks(rewrite(lines(), *args)))
+
+        except KeyError:
+            return 15
+
+        except Exception as error:
+            if read_errors:
+                raise read_errors[0]
+
+            return 1, str(error)
+
+        else:
+            return 0
+
+    def _write_chunks(self, chunks):
+        """
+        Atomically replace the configuration file with <chunks>, writing them as they are generated.
+        The text is Base64-encoded on the way if <self.isbase64> is True.
+
+        :param iterable chunks: The text of the configuration file. (See _join_chunks())
+
+        :returns int: Error code
+        """
+
+        if self.isbase64 == True:
+            chunks = self._encode_chunks(chunks)
+
+        try:
+            with self._writer.open(self.config_path, 'w', self.encoding) as target:
+                for chunk in chunks:
+                    Instrumentation.measure(self.observer, "save_config_file.write", target.write, chunk)
+
+        except(FileNotFoundError, IOError, EOFError,
+               PermissionError, IsADirectoryError):
+            raise IOError("Error writing to the configuration file!")
+
+        finally:
+            # Our own writes must not be served from a stale index.
+            self._index = None
+
+        return 0
+
+    def set_many(self, variables):
+        """
+        Set new values for several variables with a single write.
+        Nothing is changed if one of the variables cannot be set.
+
+        :param dict variables: The `variable: value` pairs to set.
+
+        :returns int, str: Error code and error description (if there is one.)
+        """
+
+        return self._apply_many(self.set, variables)
+
+    def add_many(self, variables):
+        """
+        Add several new variables with a single write.
+        Nothing is added if one of the variables cannot be added.
+
+        :param dict variables: The `variable: value` pairs to add.
+
+        :returns int, str: Error code and the error description if there is one.
+        """
+
+        return self._apply_many(self.add, variables)
+
+    def _apply_many(self, method, variables):
+        """
+        Call <method> for every variable in <variables> inside a transaction.
+
+        :param method: Either self.set or self.add.
+        :param dict variables: The `variable: value` pairs to pass to <method>.
+
+        :returns int, str: Error code and the error description if there is one.
+        """
+
+        try:
+            with self.transaction():
+                savepoint = self._transaction
+                for variable, value in variables.items():
+                    result = method(variable, value)
+                    if result != 0:
+                        # Undo the changes made by this batch.
+                        self._transaction = savepoint
+                        self._index = None
+                        return result
+
+        except Exception as error:
+            return 1, str(error)
+
+        else:
+            return 0
+
+class Datatypes(object):
+    """
+    The class that contains the data types supported by the Version2() dictionary.
+
+    Each data type has a codec:
+        - types: The Python types accepted by update().
+        - encode(value): Convert a Python value to its JSON-compatible dictionary form.
+        - decode(stored): Convert the dictionary form back to a Python value.
+        - validate(stored): Raise `ValueError` if the dictionary form is invalid. (Used by import_dict())
+
+    Usage:
+        Datatypes.register(
+            "decimal",
+            (decimal.Decimal,),
+            str,
+            decimal.Decimal,
+            Datatypes.type_validator(str)
+        )
+    """
+
+    # name: (types, encode, decode, validate, allowed in arrays)
+    codecs = collections.OrderedDict()
+
+    # The Python types accepted as arrays (`arr`)
+    array_types = (list, tuple)
+
+    @classmethod
+    def register(cls, name, types, encode, decode, validate, array=True):
+        """
+        Add a new data type, or replace an existing one.
+
+        :param str name: The name of the data type.
+        :param tuple types: The Python types of the values.
+        :param encode: A function that converts a value to its dictionary form.
+        :param decode: A function that converts the dictionary form back to a value.
+        :param validate: A function that raises `ValueError` if the dictionary form is invalid.
+        :param bool array: If True, the data type can be used in arrays.
+
+        :returns void:
+        """
+
+        if name == "arr":
+            raise ValueError("`arr` is reserved for arrays")
+
+        cls.codecs[name] = (tuple(types), encode, decode, validate, array)
+
+    @staticmethod
+    def type_validator(*types):
+        """
+        Create a validate() function that checks the type of the dictionary form.
+
+        :param type types: The allowed types of the dictionary form.
+
+        :returns function: The validate() function.
+        """
+
+        def validate(value):
+            if type(value) not in types:
+                raise ValueError("The value does not match its datatype")
+
+        return validate
+
+    @staticmethod
+    def _encode_bool(value):
+        if value == True:
+            return 1
+
+        elif value == False:
+            return 0
+
+        else:
+            raise ValueError("Unknown boolean state")
+
+    @staticmethod
+    def _decode_bool(value):
+        if int(value) == 0:
+            return False
+
+        elif int(value) == 1:
+            return True
+
+        else:
+            raise ValueError("Unknown boolean state")
+
+    @staticmethod
+    def _validate_bool(value):
+        if value not in (0, 1):
+            raise ValueError("Unknown boolean state")
+
+    @staticmethod
+    def _encode_bin(value):
+        if type(value) is not bytes:
+            raise ValueError("value is not in bytes data type")
+
+        return base64.b64encode(value).decode("ascii")
+
+    @staticmethod
+    def _decode_bin(value):
+        return base64.b64decode(value)
+
+    @staticmethod
+    def _validate_bin(value):
+        if type(value) is not str or base64.b64encode(base64.b64decode(value)).decode("ascii") != value:
+            raise ValueError("Invalid binary data")
+
+
+Datatypes.register("str", (str,), str, str, Datatypes.type_validator(str))
+Datatypes.register("int", (int,), int, int, Datatypes.type_validator(int))
+Datatypes.register("float", (float,), float, float, Datatypes.type_validator(float))
+Datatypes.register("bool", (bool,), Datatypes._encode_bool, Datatypes._decode_bool, Datatypes._validate_bool)
+Datatypes.register("bin", (bytes,), Datatypes._encode_bin, Datatypes._decode_bin, Datatypes._validate_bin)
+
+
+class RWLock(object):
+    """
+    A readers-writer lock.
+    Any number of threads can hold the read lock at once, while the write lock is exclusive.
+    Waiting writers go before new readers, so that a steady stream of readers cannot starve them.
+
+    Both locks are reentrant, and the thread holding the write lock can also acquire the read lock.
+    A thread holding only the read lock must not acquire the write lock.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0  # The number of threads holding the read lock.
+        self._writer = None  # The thread holding the write lock.
+        self._writer_depth = 0
+        self._waiting_writers = 0
+        self._local = threading.local()  # The read lock depth of each thread, and whether it is in <self._readers>.
+
+    def acquire_read(self):
+        """
+        Acquire the read lock, waiting while a writer holds or waits for the write lock.
+
+        :returns void:
+        """
+
+        depth = getattr(self._local, "depth", 0)
+        if depth or self._writer == threading.get_ident():
+            # Already holding a lock; Waiting for the writers would deadlock.
+            if not depth:
+                self._local.counted = False
+
+            self._local.depth = depth + 1
+            return None
+
+        with self._condition:
+            while self._writer is not None or self._waiting_writers:
+                self._condition.wait()
+
+            self._readers += 1
+
+        self._local.counted = True
+        self._local.depth = 1
+
+    def release_read(self):
+        """
+        Release the read lock.
+
+        :returns void:
+        """
+
+        depth = self._local.depth - 1
+        self._local.depth = depth
+        if depth or not self._local.counted:
+            # The thread may have released the write lock since; Only the reads that were counted are uncounted.
+            return None
+
+        with self._condition:
+            self._readers -= 1
+            if self._readers == 0:
+                self._condition.notify_all()
+
+    def acquire_write(self):
+        """
+        Acquire the write lock, waiting until no other thread holds either lock.
+
+        :returns void:
+        """
+
+        ident = threading.get_ident()
+        with self._condition:
+            if self._writer == ident:
+                self._writer_depth += 1
+                return None
+
+            self._waiting_writers += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._condition.wait()
+
+            finally:
+                self._waiting_writers -= 1
+
+            self._writer = ident
+            self._writer_depth = 1
+
+    def release_write(self):
+        """
+        Release the write lock.
+
+        :returns void:
+        """
+
+        with self._condition:
+            self._writer_depth -= 1
+            if self._writer_depth == 0:
+                self._writer = None
+                self._condition.notify_all()
+
+
+def _shared(method):
+    """
+    Run <method> while holding the read lock of a thread-safe Version2() object.
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        lock = self._lock
+        if lock is None:
+            return method(self, *args, **kwargs)
+
+        lock.acquire_read()
+        try:
+            return method(self, *args, **kwargs)
+
+        finally:
+            lock.release_read()
+
+    return wrapper
+
+
+def _exclusive(method):
+    """
+    Run <method> while holding the write lock of a thread-safe Version2() object.
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        lock = self._lock
+        if lock is None:
+            return method(self, *args, **kwargs)
+
+        with self._write_lock:
+            lock.acquire_write()
+            try:
+                return method(self, *args, **kwargs)
+
+            finally:
+                lock.release_write()
+
+    return wrapper
+
+
+def _serialized(method):
+    """
+    Run <method> while no other thread of a thread-safe Version2() object is changing it.
+    Unlike _exclusive(), readers are not blocked; <method> must not change what they read.
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self._lock is None:
+            return method(self, *args, **kwargs)
+
+        with self._write_lock:
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+class Version2():
+    """
+    The class containing methods to use the version 2 configuration file.
+    """
+
+    # The binary container (`v3`) starts with a fixed-size header:
+    # <magic> <container version> <flags> <compression id> <encryption id> <compression level> <metadata length> <dictionary length>
+    # (The headers of container version 1 do not have the compression level.)
+    # The header is followed by the metadata (JSON) and the compressed/encrypted dictionary.
+    # The magic's first byte is not in the Base64 alphabet, so it cannot be mistaken for a `v2` file.
+    _container_magic = b"\x89CHC"
+    _container_version = 2
+    _container_headers = {
+        1: struct.Struct("<4sBBBBIQ"),
+        2: struct.Struct("<4sBBBBbIQ")
+    }
+
+    # In the `v3-indexed` container, the dictionary is:
+    # <key table length> <key table> <value blocks>
+    # The key table and each value are compressed and encrypted separately,
+    # so that a single value can be read without decoding the rest of the dictionary.
+    # The key table is a JSON object of `key: [block offset, block length]` pairs.
+    _container_flag_indexed = 0x01
+    _index_header = struct.Struct("<Q")
+
+    # With the `journal` flag, the dictionary is followed by the journal:
+    # <record length> <record> <record length> <record> ...
+    # Each record is a compressed and encrypted JSON array;
+    # `["set", key, value]` or `["remove", key]`. They are replayed over the dictionary by load().
+    _container_flag_journal = 0x02
+    _journal_header = struct.Struct("<I")
+
+    # In the `v3-chunked` container, the dictionary is:
+    # <chunk count> <chunk length> <chunk length> ... <chunk> <chunk> ...
+    # The serialized dictionary is split into chunks of <chunk_size> bytes,
+    # which are compressed and encrypted separately, so that they can be processed in parallel.
+    _container_flag_chunked = 0x04
+    _chunk_header = struct.Struct("<Q")
+
+    def __init__(self, configpath, epass=None, durability="None", observer=None, journal=False, threadsafe=False, lock=False, lock_timeout=None, executor=None, blob_threshold=None):
+        """
+        The initialization method of Version2() class.
+
+        :param str configpath: The path of the configuration file to use.
+        :param str epass: The encryption password (Optional)
+        :param str durability: The durability level of writes. (See AtomicWriter.durabilities)
+        :param observer: Called with the duration of each read/write stage. (See Instrumentation)
+        :param bool journal: If True, save() appends the changes to the journal of `v3` files. (See save())
+        :param bool threadsafe: If True, the object can be shared between threads.
+                                Readers run concurrently, and are not blocked by load() or save().
+        :param bool lock: If True, reads and writes hold a FileLock, and save() refuses to overwrite
+                          a file that was modified by another process after it was loaded.
+        :param float lock_timeout: The number of seconds to wait for the lock. (None waits forever; 0 does not wait)
+        :param executor: The `concurrent.futures.Executor` that aload() and asave() run in.
+                         (None uses the default executor of the event loop)
+        :param int blob_threshold: If set, `bin` values larger than this many bytes are stored as blobs,
+                                   outside of the dictionary. (See <self.blobpath>)
+        """
+
+        self.VERSION = "0.0.1.1"  # Parser version
+
+        self.configpath = configpath
+        self.__data = {
+            "name": None,
+            "author": None,
+            "version": None,
+            "compression": None,
+            "encryption": None,
+            "dictionary": None  # The encrypted form of the dictionary
+        }
+        self.__dictionary = None  # The decrypted form of the dictionary
+        self.__cache = {}  # The decoded values of the dictionary; `key: (stored value, decoded value)`
+        self.__index = None  # The key table of a `v3-indexed` file; `key: (file offset, length)`
+        self.__file_stat = None  # The (mtime, size, inode) of the file when it was last read or written.
+        self.__file_digest = None  # The hash of the file when it was last read; Only kept after reload() is used.
+        self.__journal = {}  # The journal of the file; `key: value`, or `key: None` if it was removed.
+        self.__journal_end = 0  # The file offset of the end of the journal.
+        self.__journal_size = 0  # The size of the journal in bytes.
+        self.__snapshot_size = 0  # The size of the dictionary the journal is replayed over.
+        self.__journal_settings = None  # The metadata of the file the journal was started with.
+        self.__file_settings = None  # The container and metadata of the file when it was last read or written.
+        self.__changes = None  # The keys changed since the last load() or save(); None if the file must be rewritten.
+        self.__epass = epass
+        self.__cipher = None  # The AES256() object of <self.__epass>, created when first needed.
+        self.__writer = AtomicWriter(durability)
+        self.observer = observer
+        self.encoding = "utf-8"  # ? What if we include this inside config data?
+
+        # get() and the other readers hold <self._lock> for reading, and methods that change the
+        # configuration hold it for writing. <self._write_lock> serializes the writers,
+        # so that save() does not block the readers.
+        self._lock = RWLock() if threadsafe else None
+        self._write_lock = threading.RLock() if threadsafe else None
+        self.file_lock = FileLock(configpath, lock_timeout, self._write_lock) if lock else None
+
+        # aload() and asave() run in <self.executor>, one at a time.
+        # Concurrent aload() calls share the load in progress; `(path, load_dict): asyncio.Task`
+        self.executor = executor
+        self.__async_lock = (None, None)  # The event loop and asyncio.Lock() of aload() and asave()
+        self.__pending_loads = {}
+
+        # `bin` values larger than <self.blob_threshold> bytes are compressed and encrypted once, and stored in
+        # <self.blobpath>, named after the hash of their contents. The dictionary only refers to them
+        # (`{"blob": name}`), and get() reads them when they are needed.
+        # Blobs that are already stored are not written again by save().
+        self.blob_threshold = blob_threshold
+        self.blobpath = configpath + ".blobs"
+        self.__pending_blobs = {}  # The blobs that save() has to store; `name: data`
+
+        # The journal is compacted by save() when it is larger than <self.journal_compact_size> bytes,
+        # or <self.journal_compact_ratio> times the size of the dictionary.
+        self.journal = journal
+        self.journal_compact_size = 1048576
+        self.journal_compact_ratio = 1.0
+
+        # The supported data types are in `Datatypes.codecs`.
+        # (See the `datatypes` and `datatypes_conversion` properties.)
+
+        # Configuration file fields and their types
+        self.keynames = {
+            "name": (str,),
+            "author": (str,),
+            "version": (str,),
+            "compression": (str,),
+            "encryption": (str,),
+            "dictionary": (str, bytes, bytearray)
+        }
+
+        # A list of supported compression algorithms (See Compression.algorithms)
+        self.compressions = tuple(Compression.algorithms)  # `huffman` soon to be supported
+
+        # A list of supported encryption algorithms
+        #   - aes256: AES-256 in CBC mode.
+        #   - aes256-gcm: AES-256 in GCM mode; Modified or corrupted dictionaries are detected before parsing.
+        self.encryptions = ("None", "aes256", "aes256-gcm")
+
+        # A list of supported key derivation functions for the encryption password
+        self.kdfs = tuple(AES256.kdf_defaults)
+
+        # A list of supported configuration file containers
+        #   - v2: Base64-encoded JSON; The dictionary is Base64-encoded between each step.
+        #   - v3: Binary header followed by the raw compressed and encrypted dictionary.
+        #   - v3-indexed: Like `v3`, but each value is compressed and encrypted separately.
+        #                 After `load(load_dict=False)`, get() only reads and decodes the requested values.
+        #   - v3-chunked: Like `v3`, but the dictionary is compressed and encrypted in chunks of <self.chunk_size>
+        #                 bytes, on <self.chunk_workers> threads. (None uses a thread per CPU)
+        self.containers = ("v2", "v3", "v3-indexed", "v3-chunked")
+        self.container = "v2"  # Detected by load(), or set by new().
+        self.chunk_size = 4194304
+        self.chunk_workers = None
+
+        # The IDs of the encryption algorithms in the `v3` container header
+        self.encryption_ids = {"None": 0, "aes256": 1, "aes256-gcm": 2}
+
+    @property
+    def datatypes(self):
+        """
+        A tuple of supported data types.
+        """
+
+        return tuple(Datatypes.codecs) + ("arr",)
+
+    @property
+    def array_datatypes(self):
+        """
+        A tuple of data types supported in arrays.
+        """
+
+        return tuple(name for name in Datatypes.codecs if Datatypes.codecs[name][4])
+
+    @property
+    def datatypes_conversion(self):
+        """
+        The Python types of each supported data type.
+        """
+
+        result = {name: Datatypes.codecs[name][0] for name in Datatypes.codecs}
+        result["arr"] = Datatypes.array_types
+        return result
+
+    @property
+    def array_datatypes_conversion(self):
+        """
+        The Python types of each data type supported in arrays.
+        """
+
+        return {name: Datatypes.codecs[name][0] for name in self.array_datatypes}
+
+    def __b64encode(self, to_encode, return_bytes=False):
+        """
+        Encode <to_encode> using Base64.
+
+        :param str to_encode: The string to encode.*
+        :param int to_encode: The integer to encode.*
+        :param float to_encode: The decimal to encode.*
+        :param bool to_encode: The boolean to encode.*
+        :param bytes to_encode: The bytes to encode.*
+        :param bytearray to_encode: The bytes to encode.*
+        :param bool return_bytes: If True, this method will return the result in `bytes`.
+
+        *The supported data types (except str and bytes) are converted to str.
+        *str data types are converted to bytes.
+
+        :returns str: The string version of the <encoded> (data type `bytes`) variable.
+        :returns bytes: The bytes version of the <encoded> variable.
+        """
+
+        if type(to_encode) in (str, int, float, bool):
+            to_encode = str(to_encode).encode(self.encoding)
+
+        elif type(to_encode) in (bytes, bytearray):
+            pass
+
+        else:
+            raise ValueError("Unsupported data type.")
+
+        encoded = base64.b64encode(to_encode)
+        if return_bytes:
+            return encoded
+
+        else:
+            return str(encoded.decode(self.encoding))
+
+    def __b64decode(self, to_decode):
+        """
+        Decode <to_decode> using Base64.
+
+        :param str to_decode: The string to decode.
+        :param bytes to_decode: The bytes (or a bytes-like object) to decode.
+
+        :returns bytes: The decoded form of <to_decode> in `bytes` data type.
+        """
+
+        if type(to_decode) is str:
+            to_decode = to_decode.encode(self.encoding)
+
+        elif isinstance(to_decode, (bytes, bytearray, memoryview, mmap.mmap)):
+            pass  # Decode bytes-like objects in place, without copying them first.
+
+        else:
+            raise ValueError("Unsupported data type.")
+
+        return base64.b64decode(to_decode)
+
+    def __jsontext(self, data):
+        """
+        Decode a JSON document written with <self.encoding> into a string.
+        Rebinding the result lets the bytes be freed before the document is parsed.
+
+        :param bytes data: The JSON document.
+
+        :returns str: The JSON document as a string.
+        """
+
+        if isinstance(data, str):
+            return data
+
+        return data.decode(self.encoding, "surrogatepass")
+
+    @staticmethod
+    def __serialize(data):
+        """
+        Serialize <data> into compact JSON.
+
+        :param dict data: The data to serialize.
+
+        :returns str: The JSON form of <data>.
+        """
+
+        return json.dumps(data, separators=(',', ':'))
+
+    def __readconfig(self):
+        """
+        Read the configuration file.
+
+        :returns void:
+        """
+
+        observer = self.observer
+        with self.__mapconfig() as (data, filestat):
+            # The key derivation parameters may have changed.
+            self.__cipher = None
+            self.__index = None
+            self.__journal = {}
+            self.__journal_size = 0
+            self.__file_stat = (filestat.st_mtime_ns, filestat.st_size, filestat.st_ino)
+            self.__changes = {}
+            if self.__file_digest is not None:
+                self.__file_digest = hashlib.blake2b(data).digest()
+
+            # Detect the configuration file container.
+            if data[:len(self._container_magic)] == self._container_magic:
+                self.__data = Instrumentation.measure(observer, "readconfig.unpack", self.__unpackcontainer, data)
+                if self.__index is not None:
+                    # The values are read from the file when needed; An earlier dictionary would be stale.
+                    self.__dictionary = None
+
+            else:
+                decoded = Instrumentation.measure(observer, "readconfig.decode", self.__b64decode, data)
+                decoded = Instrumentation.measure(observer, "readconfig.decode", self.__jsontext, decoded)
+                self.__data = Instrumentation.measure(observer, "readconfig.deserialize", json.loads, decoded)
+                self.container = "v2"
+
+            self.__file_settings = self.__journalsettings()
+
+    @contextlib.contextmanager
+    def __mapconfig(self):
+        """
+        Map the configuration file into memory, so that it is decoded without reading it into a copy first.
+        Files that cannot be mapped (e.g. empty files) are read instead.
+
+        Usage:
+            with self.__mapconfig() as (data, filestat):
+                ...
+
+        :returns tuple: The read-only contents of the configuration file (`mmap`, or `bytes` if it cannot be mapped),
+                        and the `os.stat_result` of the file.
+        """
+
+        with open(self.configpath, "rb") as f:
+            filestat = os.fstat(f.fileno())
+            try:
+                mapped = Instrumentation.measure(
+                    self.observer, "readconfig.read",
+                    functools.partial(mmap.mmap, f.fileno(), 0, access=mmap.ACCESS_READ)
+                )
+
+            except(ValueError, OSError):
+                mapped = None
+
+            if mapped is None:
+                yield Instrumentation.measure(self.observer, "readconfig.read", f.read), filestat
+                return
+
+            # Slices of the mapping are copies, so nothing refers to it after the `with` block.
+            with mapped:
+                yield mapped, filestat
+
+    def __writeconfig(self):
+        """
+        Replace existing data from <self.configpath> with <self.__data>.
+
+        :returns void:
+        """
+
+        # Check if `self.__data` values are valid.
+        self._validate_data()
+
+        observer = self.observer
+        if self.container in ("v3", "v3-indexed", "v3-chunked"):
+            data = Instrumentation.measure(observer, "writeconfig.pack", self.__packcontainer)
+
+        elif self.container == "v2":
+            serialized = Instrumentation.measure(observer, "writeconfig.serialize", self.__serialize, self.__data)
+            data = Instrumentation.measure(observer, "writeconfig.encode", self.__b64encode, serialized)
+
+        else:
+            raise ValueError("Unsupported container format")
+
+        # Atomically replace `self.configpath` with the new data.
+        Instrumentation.measure(
+            observer, "writeconfig.write",
+            lambda data: self.__writer.write(self.configpath, data, self.encoding),
+            data
+        )
+
+    def __getcipher(self):
+        """
+        Get the AES256() object for <self.__epass>, deriving the key only once per instance.
+
+        :returns AES256: The cipher object.
+        """
+
+        if self.__cipher is None:
+            kdf = self.__data.get("kdf", None)
+            if kdf is None:
+                self.__cipher = AES256(self.__epass, self.encoding)
+
+            else:
+                self.__cipher = AES256(
+                    self.__epass,
+                    self.encoding,
+                    kdf["name"],
+                    self.__b64decode(kdf["salt"]),
+                    kdf["params"]
+                )
+
+        return self.__cipher
+
+    def __unpackcontainer(self, data):
+        """
+        Parse a `v3` configuration file.
+
+        The key table of a `v3-indexed` file is stored in <self.__index>,
+        and its dictionary is left empty; The values are read by __readentries().
+        The journal is stored in <self.__journal>, and the container in <self.container>.
+
+        :param bytes data: The contents of the configuration file.
+
+        :returns dict: The configuration data, with the dictionary in `bytes`.
+        """
+
+        if len(data) <= len(self._container_magic):
+            raise ValueError("The configuration file is truncated")
+
+        version = data[len(self._container_magic)]
+        if version not in self._container_headers:
+            raise ValueError("Unsupported container version")
+
+        header = self._container_headers[version]
+        if len(data) < header.size:
+            raise ValueError("The configuration file is truncated")
+
+        if version == 1:
+            magic, version, flags, compression, encryption, metadata_length, dictionary_length = header.unpack_from(data)
+            level = None
+
+        else:
+            magic, version, flags, compression, encryption, level, metadata_length, dictionary_length = header.unpack_from(data)
+
+        if flags & ~(self._container_flag_indexed | self._container_flag_journal | self._container_flag_chunked):
+            raise ValueError("Unsupported container flags")
+
+        if flags & self._container_flag_indexed and flags & self._container_flag_chunked:
+            raise ValueError("Unsupported container flags")
+
+        offset = header.size + metadata_length
+        if len(data) < offset + dictionary_length:
+            raise ValueError("The configuration file is truncated")
+
+        configdata = json.loads(data[header.size:offset].decode(self.encoding))
+        configdata["compression"] = Compression.name_of(compression)
+        configdata["compression_level"] = Compression.validate_level(configdata["compression"], level)
+
+        for name, algorithm_id in self.encryption_ids.items():
+            if algorithm_id == encryption:
+                configdata["encryption"] = name
+                break
+
+        else:
+            raise ValueError("Invalid encryption algorithm ID")
+
+        # The key table and the journal are encoded with the settings of this file, so they are used from here on.
+        self.__data = configdata
+        if flags & self._container_flag_indexed:
+            configdata["dictionary"] = b''
+            self.__index = self.__unpackindex(data, offset, dictionary_length)
+            self.container = "v3-indexed"
+
+        else:
+            configdata["dictionary"] = data[offset:offset + dictionary_length]
+            self.container = "v3-chunked" if flags & self._container_flag_chunked else "v3"
+
+        self.__snapshot_size = dictionary_length
+        self.__journal_end = offset + dictionary_length
+        if flags & self._container_flag_journal:
+            self.__journal = self.__unpackjournal(data, offset + dictionary_length)
+            self.__journal_settings = self.__journalsettings()
+
+        else:
+            self.__journal_settings = None  # Records appended to this file would not be read.
+
+        return configdata
+
+    def __unpackindex(self, data, offset, length):
+        """
+        Read the key table of a `v3-indexed` file.
+
+        :param bytes data: The contents of the configuration file.
+        :param int offset: The offset of the dictionary in <data>.
+        :param int length: The length of the dictionary.
+
+        :returns dict: The `key: (file offset, length)` pairs of the value blocks.
+        """
+
+        if length < self._index_header.size:
+            raise ValueError("The configuration file is truncated")
+
+        table_length = self._index_header.unpack_from(data, offset)[0]
+        table_offset = offset + self._index_header.size
+        blocks_offset = table_offset + table_length
+        if blocks_offset > offset + length:
+            raise ValueError("The configuration file is truncated")
+
+        table = json.loads(self.__decodeblock(data[table_offset:blocks_offset]))
+        index = {}
+        for key, (block_offset, block_length) in table.items():
+            if block_offset < 0 or block_length < 0:
+                raise ValueError("Invalid key table")  # The block would overlap the key table.
+
+            if block_offset + block_length > length - self._index_header.size - table_length:
+                raise ValueError("The configuration file is truncated")
+
+            index[key] = (blocks_offset + block_offset, block_length)
+
+        return index
+
+    def __unpackjournal(self, data, offset):
+        """
+        Read the journal of a `v3` file.
+        An incomplete record at the end (from an interrupted save()) is ignored, and overwritten by the next save().
+
+        :param bytes data: The contents of the configuration file.
+        :param int offset: The offset of the journal in <data>.
+
+        :returns dict: The changes to the dictionary; `key: value`, or `key: None` if it was removed.
+        """
+
+        journal = {}
+        position = offset
+        while position + self._journal_header.size <= len(data):
+            length = self._journal_header.unpack_from(data, position)[0]
+            start = position + self._journal_header.size
+            if start + length > len(data):
+                break
+
+            record = json.loads(self.__decodeblock(data[start:start + length]))
+            if record[0] == "set" and len(record) == 3:
+                journal[record[1]] = record[2]
+
+            elif record[0] == "remove" and len(record) == 2:
+                journal[record[1]] = None
+
+            else:
+                raise ValueError("Invalid journal record")
+
+            position = start + length
+
+        self.__journal_end = position
+        self.__journal_size = position - offset
+        return journal
+
+    def __journalsettings(self):
+        """
+        Get the settings that the journal records are encoded with.
+        The journal can only be appended to while they are unchanged, and save() has nothing to write
+        if they are the same as the file's. (See <self.dirty>)
+
+        :returns tuple: The container and the metadata of the file.
+        """
+
+        metadata = {key: value for key, value in self.__data.items() if key != "dictionary"}
+        return (self.container, self.__serialize(metadata))
+
+    def __packcontainer(self):
+        """
+        Build a `v3` configuration file from <self.__data>.
+
+        :returns bytes: The contents of the configuration file.
+        """
+
+        if type(self.__data["dictionary"]) not in (bytes, bytearray):
+            raise TypeError("Invalid dictionary!")
+
+        metadata = {}
+        for key in self.__data:
+            if key not in ("compression", "compression_level", "encryption", "dictionary"):
+                metadata[key] = self.__data[key]
+
+        metadata = json.dumps(metadata, separators=(',', ':')).encode(self.encoding)
+        header = self._container_headers[self._container_version].pack(
+            self._container_magic,
+            self._container_version,
+            (self._container_flag_indexed if self.container == "v3-indexed" else 0)
+            | (self._container_flag_chunked if self.container == "v3-chunked" else 0)
+            | (self._container_flag_journal if self.journal else 0),  # Flags
+            Compression.algorithms[self.__data["compression"]][0],
+            self.encryption_ids[self.__data["encryption"]],
+            Compression.validate_level(self.__data["compression"], self.__data.get("compression_level", None)),
+            len(metadata),
+            len(self.__data["dictionary"])
+        )
+
+        return b''.join((header, metadata, self.__data["dictionary"]))
+
+    def _validate_data(self, configdata=None):
+        """
+        Validate configuration data (data type `dict`).
+        Raises `ValueError` if there is an invalid value in the data.
+        Raises `TypeError` if `configdata` is invalid.
+
+        :param dict configdata: The dictionary form of configuration data.
+
+        :returns void:
+        """
+
+        if configdata is None:
+            configdata = self.__data
+
+        else:
+            if type(configdata) is dict:
+                pass
+
+            else:
+                raise TypeError("configdata must be a dictionary.")
+
+        for key in self.keynames:
+            if type(configdata[key]) not in self.keynames[key]:
+                raise ValueError("The key does not have a valid value data type.")
+
+            else:
+                continue
+
+    def __readdict(self):
+        """
+        Read the dictionary and store it in <self.__dictionary>.
+
+        :returns void:
+        """
+
+        if self.container in ("v3", "v3-indexed", "v3-chunked"):
+            self.__readrawdict()
+
+            # Replay the journal over the dictionary.
+            for key, value in self.__journal.items():
+                if value is None:
+                    self.__dictionary.pop(key, None)
+
+                else:
+                    self.__dictionary[key] = value
+
+            return None
+
+        if type(self.__data["dictionary"]) is str:
+            dictionary = self.__data["dictionary"].encode(self.encoding)
+
+        elif type(self.__data["dictionary"]) is bytes:
+            dictionary = self.__data["dictionary"]
+
+        else:
+            raise TypeError("Invalid dictionary!")
+
+        if dictionary == b'':
+            # A lazy guess if the dictionary is empty.
+            self.__dictionary = {}
+            return None
+
+        # save() rebuilds the raw dictionary, so it does not have to stay in memory while it is decoded.
+        # It is only marked as decoded (emptied) once decoding succeeds; Until then, None is not a valid dictionary.
+        empty = type(self.__data["dictionary"])()
+        self.__data["dictionary"] = None
+
+        observer = self.observer
+        measure = Instrumentation.measure
+
+        # Each stage replaces <data>, so that only one intermediate copy of the dictionary is alive at a time.
+        # Decompression
+        data = measure(observer, "readdict.decode", self.__b64decode, dictionary)
+        del dictionary
+        data = measure(observer, "readdict.decompress", functools.partial(Compression.decompress, self.__data["compression"]), data)
+
+        # Decryption
+        if self.__data["encryption"] == "aes256-gcm":
+            # The GCM ciphertext is not wrapped in Base64.
+            data = measure(observer, "readdict.decrypt", self.__getcipher().decrypt_gcm, data)
+
+        elif self.__data["encryption"] == "aes256":
+            data = measure(observer, "readdict.decode", self.__b64decode, data)
+            data = measure(observer, "readdict.decrypt", self.__getcipher().decrypt, data)
+            data = measure(observer, "readdict.decode", self.__b64decode, data)
+
+        elif self.__data["encryption"] == "None":
+            data = measure(observer, "readdict.decode", self.__b64decode, data)
+
+        else:
+            raise ValueError("Invalid encryption algorithm name")
+
+        """
+        if type(data) is bytes:
+            data = data.decode()
+        """
+
+        if data == "":
+            # Another lazy check if plaintext is empty.
+            self.__dictionary = {}
+            self.__data["dictionary"] = empty
+            return None
+
+        # <variable_name>|<datatype>|<value>
+        # <variable_name>|<datatype>|<array_datatype>|<values>
+        data = measure(observer, "readdict.decode", self.__jsontext, data)
+        self.__dictionary = measure(observer, "readdict.deserialize", json.loads, data)
+        self.__data["dictionary"] = empty
+
+    def __readrawdict(self):
+        """
+        Read the dictionary of a `v3` configuration file and store it in <self.__dictionary>.
+
+        :returns void:
+        """
+
+        if self.__index is not None:
+            self.__dictionary = self.__readentries(list(self.__index))
+            return None
+
+        dictionary = self.__data["dictionary"]
+        if type(dictionary) is not bytes:
+            raise TypeError("Invalid dictionary!")
+
+        if dictionary == b'':
+            self.__dictionary = {}
+            return None
+
+        # See __readdict(); A failed decode (e.g. with a wrong password) must not look like an empty dictionary.
+        self.__data["dictionary"] = None
+
+        if self.container == "v3-chunked":
+            data = self.__unpackchunks(dictionary)
+
+        else:
+            data = self.__decodeblock(dictionary)
+
+        del dictionary
+
+        data = Instrumentation.measure(self.observer, "readdict.decode", self.__jsontext, data)
+        self.__dictionary = Instrumentation.measure(self.observer, "readdict.deserialize", json.loads, data)
+        self.__data["dictionary"] = b''
+
+    def __readentries(self, keys):
+        """
+        Read the values of <keys> from a `v3-indexed` configuration file.
+        Raises `KeyError` if a key does not exist.
+
+        The file lock is not needed; The blocks are never modified once written, and a replaced file is detected.
+        (get() holds the read lock, which must not be held while waiting for the file lock. See FileLock)
+
+        :param list keys: The keys to read.
+
+        :returns dict: The `key: stored value` pairs.
+        """
+
+        locations = [(key, self.__index[key]) for key in keys]
+        with open(self.configpath, "rb") as f:
+            filestat = os.fstat(f.fileno())
+            if (filestat.st_mtime_ns, filestat.st_size, filestat.st_ino) != self.__file_stat:
+                raise IOError("The configuration file was modified after it was loaded")
+
+            # Read the blocks in the order they are stored in.
+            locations.sort(key=lambda location: location[1][0])
+            entries = {}
+            for key, (offset, length) in locations:
+                f.seek(offset)
+                block = f.read(length)
+                if len(block) != length:
+                    raise ValueError("The configuration file is truncated")
+
+                entries[key] = json.loads(self.__decodeblock(block))
+
+        return entries
+
+    def __decodeblock(self, data, compression=None):
+        """
+        Decrypt and decompress a block of a `v3` configuration file.
+
+        :param bytes data: The compressed and encrypted block.
+        :param str compression: The compression algorithm of the block. (None uses the one of the file)
+
+        :returns bytes: The plaintext of the block.
+        """
+
+        observer = self.observer
+        measure = Instrumentation.measure
+
+        # Decryption
+        if self.__data["encryption"] == "None":
+            pass
+
+        elif self.__data["encryption"] == "aes256":
+            data = measure(observer, "readdict.decrypt", self.__getcipher().decrypt_bytes, data)
+
+        elif self.__data["encryption"] == "aes256-gcm":
+            data = measure(observer, "readdict.decrypt", self.__getcipher().decrypt_gcm, data)
+
+        else:
+            raise ValueError("Invalid encryption algorithm name")
+
+        # Decompression
+        if compression is None:
+            compression = self.__data["compression"]
+
+        return measure(observer, "readdict.decompress", functools.partial(Compression.decompress, compression), data)
+
+    def __encodeblock(self, data):
+        """
+        Compress and encrypt a block of a `v3` configuration file.
+
+        :param bytes data: The plaintext of the block.
+
+        :returns bytes: The compressed and encrypted block.
+        """
+
+        observer = self.observer
+        measure = Instrumentation.measure
+
+        # Compress the block first; Ciphertexts do not compress.
+        data = measure(
+            observer, "writedict.compress",
+            functools.partial(Compression.compress, self.__data["compression"], level=self.__data.get("compression_level", None)),
+            data
+        )
+
+        # Encrypt the result
+        if self.__data["encryption"] == "None":
+            return data
+
+        elif self.__data["encryption"] == "aes256":
+            return measure(observer, "writedict.encrypt", self.__getcipher().encrypt_bytes, data)
+
+        elif self.__data["encryption"] == "aes256-gcm":
+            return measure(observer, "writedict.encrypt", self.__getcipher().encrypt_gcm, data)
+
+        else:
+            raise ValueError("Invalid encryption algorithm name")
+
+    def __writerawdict(self):
+        """
+        Compress and encrypt <self.__dictionary> into self.__data["dictionary"] for a `v3` configuration file.
+
+        :returns void:
+        """
+
+        if self.container == "v3-indexed":
+            self.__data["dictionary"] = self.__packindex()
+            return None
+
+        serialized = Instrumentation.measure(self.observer, "writedict.serialize", self.__serialize, self.__dictionary)
+        if self.container == "v3-chunked":
+            self.__data["dictionary"] = self.__packchunks(serialized.encode(self.encoding))
+
+        else:
+            self.__data["dictionary"] = self.__encodeblock(serialized.encode(self.encoding))
+
+    def __packindex(self):
+        """
+        Build the dictionary of a `v3-indexed` configuration file from <self.__dictionary>.
+
+        :returns bytes: The key table followed by the value blocks.
+        """
+
+        table = {}
+        blocks = bytearray()
+        for key, value in self.__dictionary.items():
+            block = self.__encodeblock(self.__serialize(value).encode(self.encoding))
+            table[key] = (len(blocks), len(block))
+            blocks += block
+
+        table = self.__encodeblock(self.__serialize(table).encode(self.encoding))
+        return b''.join((self._index_header.pack(len(table)), table, blocks))
+
+    def __packchunks(self, data):
+        """
+        Build the dictionary of a `v3-chunked` configuration file.
+
+        :param bytes data: The serialized dictionary.
+
+        :returns bytes: The chunk table followed by the compressed and encrypted chunks.
+        """
+
+        chunk_size = self.chunk_size
+        if chunk_size < 1:
+            raise ValueError("The chunk size must be positive")
+
+        chunks = [data[offset:offset + chunk_size] for offset in range(0, len(data), chunk_size)]
+        del data
+        chunks = self.__mapblocks(self.__encodeblock, chunks)
+
+        table = [self._chunk_header.pack(len(chunks))]
+        table.extend(self._chunk_header.pack(len(chunk)) for chunk in chunks)
+        return b''.join(table + chunks)
+
+    def __unpackchunks(self, data):
+        """
+        Decrypt and decompress the dictionary of a `v3-chunked` configuration file.
+
+        :param bytes data: The chunk table followed by the compressed and encrypted chunks.
+
+        :returns bytes: The serialized dictionary.
+        """
+
+        size = self._chunk_header.size
+        if len(data) < size:
+            raise ValueError("The configuration file is truncated")
+
+        count = self._chunk_header.unpack_from(data)[0]
+        offset = size * (count + 1)
+        if offset > len(data):
+            raise ValueError("The configuration file is truncated")
+
+        view = memoryview(data)
+        chunks = []
+        for position in range(size, offset, size):
+            length = self._chunk_header.unpack_from(data, position)[0]
+            chunks.append(view[offset:offset + length])
+            offset += length
+
+        if offset != len(data):
+            raise ValueError("The configuration file is truncated")
+
+        return b''.join(self.__mapblocks(self.__decodeblock, chunks))
+
+    def __mapblocks(self, function, blocks):
+        """
+        Call <function> with each of <blocks>, on <self.chunk_workers> threads.
+        (zlib, lzma, bz2, and the ciphers release the GIL, so the blocks are processed in parallel.)
+
+        :param function: __encodeblock() or __decodeblock().
+        :param list blocks: The blocks to process.
+
+        :returns list: The results, in the order of <blocks>.
+        """
+
+        if len(blocks) < 2 or self.chunk_workers == 1:
+            return [function(block) for block in blocks]
+
+        if self.__data["encryption"] != "None":
+            self.__getcipher()  # Derive the key once, before the threads need it.
+
+        with concurrent.futures.ThreadPoolExecutor(self.chunk_workers or os.cpu_count()) as executor:
+            return list(executor.map(function, blocks))
+
+    def __writedict(self):
+        """
+        Replace existing data from self.__data["dictionary"] with <newdict>.
+
+        :param str newdict: The whole dictionary to write.
+
+        :returns void:
+        """
+
+        if self.container in ("v3", "v3-indexed", "v3-chunked"):
+            return self.__writerawdict()
+
+        observer = self.observer
+        measure = Instrumentation.measure
+
+        serialized = measure(observer, "writedict.serialize", self.__serialize, self.__dictionary)
+
+        # Encrypt the result
+        if self.__data["encryption"] == "None":
+            eresult = measure(observer, "writedict.encode", self.__b64encode, serialized, True)
+
+        elif self.__data["encryption"] == "aes256":
+            plaintext = measure(observer, "writedict.encode", self.__b64encode, serialized)
+            ciphertext = measure(observer, "writedict.encrypt", self.__getcipher().encrypt, plaintext)
+            eresult = measure(observer, "writedict.encode", self.__b64encode, ciphertext, True)
+
+        elif self.__data["encryption"] == "aes256-gcm":
+            eresult = measure(observer, "writedict.encrypt", self.__getcipher().encrypt_gcm, serialized.encode(self.encoding))
+
+        else:
+            raise ValueError("Invalid encryption algorithm name")
+
+        # Compress the result
+        cresult = measure(
+            observer, "writedict.compress",
+            functools.partial(Compression.compress, self.__data["compression"], level=self.__data.get("compression_level", None)),
+            eresult
+        )
+
+        self.__data["dictionary"] = measure(observer, "writedict.encode", self.__b64encode, cresult)
+
+    def load(self, load_dict=True):
+        """
+        Get the current values of the configuration file.
+        This method must be called first to work with the configuration file.
+
+        :param bool load_dict: If True, this method will decrypt and decode the dictionary and store it to `self.__dictionary`.
+                               If False, get() reads the values of a `v3-indexed` file when they are needed.
+
+        :returns void:
+        """
+
+        if self._lock is None:
+            return self.__load(load_dict)
+
+        with self._write_lock:
+            # Load into a copy, so that readers use the current state until the new one replaces it at once.
+            staging = copy.copy(self)
+            staging.__load(load_dict)
+
+            self._lock.acquire_write()
+            try:
+                self.__dict__.update(staging.__dict__)
+
+            finally:
+                self._lock.release_write()
+
+    @_locks_file(False)
+    def __load(self, load_dict):
+        """
+        Read the configuration file. (See load())
+
+        :param bool load_dict: See load().
+
+        :returns void:
+        """
+
+        self.__readconfig()
+        self.__cache = {}
+        if load_dict:
+            self.__readdict()
+
+    async def aload(self, load_dict=True):
+        """
+        Like load(), but reading and decoding the configuration file run in <self.executor>,
+        so that the event loop is not blocked.
+
+        If the configuration file is already being loaded by aload(), this waits for that load instead.
+        The object keeps its current state until the load is done.
+
+        :param bool load_dict: See load().
+
+        :returns void:
+        """
+
+        key = (self.configpath, load_dict)
+        pending = self.__pending_loads.get(key, None)
+        if pending is None:
+            pending = asyncio.ensure_future(self.__aload(load_dict))
+            self.__pending_loads[key] = pending
+            pending.add_done_callback(lambda _: self.__pending_loads.pop(key, None))
+
+        # Cancelling one caller must not cancel the load for the others.
+        await asyncio.shield(pending)
+
+    async def __aload(self, load_dict):
+        """
+        Load the configuration file in <self.executor>. (See aload())
+
+        :param bool load_dict: See load().
+
+        :returns void:
+        """
+
+        loop = asyncio.get_running_loop()
+        async with self.__getasynclock():
+            if self._lock is not None:
+                # load() already replaces the state at once.
+                return await loop.run_in_executor(self.executor, self.load, load_dict)
+
+            # Load into a copy, so that the event loop does not see a half-loaded object.
+            staging = copy.copy(self)
+            await loop.run_in_executor(self.executor, staging.__load, load_dict)
+            self.__dict__.update(staging.__dict__)
+
+    def __getasynclock(self):
+        """
+        Get the asyncio.Lock() of aload() and asave() for the running event loop.
+
+        :returns asyncio.Lock:
+        """
+
+        loop = asyncio.get_running_loop()
+        if self.__async_lock[0] is not loop:
+            # An asyncio.Lock() cannot be used by another event loop.
+            self.__async_lock = (loop, asyncio.Lock())
+
+        return self.__async_lock[1]
+
+    @_serialized
+    def reload(self):
+        """
+        Load the configuration file again if it was modified after this object last read or wrote it.
+        Unlike load(), nothing is decoded if the file is unchanged. After the first call,
+        the hash of the file is also kept, so that files rewritten with the same contents are not decoded either.
+
+        The file is loaded the same way it was last loaded. (See `load(load_dict=False)`)
+        Since the values of a lazily loaded file are only read when they are needed, only the values read by get()
+        since it was loaded are compared; Other keys are only reported when they are added or removed,
+        and their old value is None.
+
+        Raises ValueError if the file was modified while this object has unsaved changes. (See <self.dirty>)
+
+        :returns dict: The keys whose values changed; `key: (old value, new value)`.
+                       The old value of added keys and the new value of removed keys are None.
+        """
+
+        try:
+            filestat = os.stat(self.configpath)
+
+        except FileNotFoundError:
+            return {}  # Keep the current values until the file is replaced.
+
+        if (filestat.st_mtime_ns, filestat.st_size, filestat.st_ino) == self.__file_stat:
+            return {}
+
+        if self.__file_digest:
+            with self.__mapconfig() as (data, filestat):
+                if hashlib.blake2b(data).digest() == self.__file_digest:
+                    with self.__publishing():
+                        self.__file_stat = (filestat.st_mtime_ns, filestat.st_size, filestat.st_ino)
+
+                    return {}
+
+        elif self.__file_digest is None:
+            self.__file_digest = b''  # From now on, __readconfig() keeps the hash of the file.
+
+        if self.__file_stat is not None and self.dirty:
+            raise ValueError("The configuration file was modified, and this object has unsaved changes")
+
+        # Like load(), the file is loaded into a copy, so that readers use the current state until it is replaced.
+        staging = copy.copy(self)
+        if self.__file_stat is not None and self.__dictionary is None:
+            staging.__load(False)
+            changes = self.__difflazy(staging)
+
+        else:
+            staging.__load(True)
+            changes = self.__diff(staging)
+
+        with self.__publishing():
+            self.__dict__.update(staging.__dict__)
+
+        return changes
+
+    @staticmethod
+    def __reloadvalue(config, stored):
+        """
+        Decode a stored value of <config> for reload().
+
+        :returns object: The value, with arrays as lists. (None if <stored> is None)
+        """
+
+        if stored is None:
+            return None
+
+        value = config.__decodevalue(stored)
+        return list(value) if type(value) is tuple else value
+
+    def __diff(self, staging):
+        """
+        Compare the dictionary with the one loaded into <staging>. (See reload())
+
+        :param Version2 staging: The object the configuration file was loaded into.
+
+        :returns dict: The keys whose values changed.
+        """
+
+        old = self.__dictionary or {}
+        new = staging.__dictionary
+        changes = {}
+        for key in list(new) + [key for key in old if key not in new]:
+            if old.get(key, None) != new.get(key, None):
+                changes[key] = (
+                    self.__reloadvalue(self, old.get(key, None)),
+                    self.__reloadvalue(staging, new.get(key, None))
+                )
+
+        return changes
+
+    def __difflazy(self, staging):
+        """
+        Compare the values that are known with the ones of the lazily loaded <staging>. (See reload())
+        The new values are cached in <staging>, so that they are still known after the next reload().
+
+        :param Version2 staging: The object the configuration file was loaded into, without the dictionary.
+
+        :returns dict: The keys whose values changed.
+        """
+
+        if self.__index is None or staging.__index is None:
+            return {}
+
+        def keys(config):
+            result = set(config.__index)
+            for key, stored in config.__journal.items():
+                if stored is None:
+                    result.discard(key)
+
+                else:
+                    result.add(key)
+
+            return result
+
+        oldkeys = keys(self)
+        newkeys = keys(staging)
+        oldcache = dict(self.__cache)  # get() may add to the cache meanwhile.
+        known = {key: cached[0] for key, cached in oldcache.items()}
+        known.update((key, stored) for key, stored in self.__journal.items() if stored is not None)
+
+        # Read the new values of the known and added keys at once.
+        compared = [key for key in newkeys if key in known or key not in oldkeys]
+        current = staging.__readentries([key for key in compared if key not in staging.__journal])
+        current.update((key, staging.__journal[key]) for key in compared if key in staging.__journal)
+
+        changes = {}
+        for key in sorted(compared):
+            old = known.get(key, None)
+            new = current[key]
+            cached = oldcache.get(key, None)
+            if cached is None or cached[0] != new:
+                cached = (new, staging.__decodevalue(new))
+
+            staging.__cache[key] = cached
+            if old != new:
+                value = cached[1]
+                changes[key] = (self.__reloadvalue(self, old), list(value) if type(value) is tuple else value)
+
+        for key in oldkeys - newkeys:
+            changes[key] = (self.__reloadvalue(self, known.get(key, None)), None)
+
+        return changes
+
+    @_shared
+    def info(self):
+        """
+        Return information about the configuration file.
+
+        :returns dict:
+        """
+
+        if self.__data is None:
+            raise ValueError("The configuration file is not yet loaded!")
+
+        result = {key: value for key, value in self.__data.items() if key != "dictionary"}
+
+        if type(result["version"]) is not list and result["version"] is not None:
+            newver = result["version"].split('.')
+
+        else:
+            newver = result["version"]
+
+        # Convert result["version"] to a list of integers
+        newver2 = []
+        for _ in newver:
+            newver2.append(int(_))
+
+        result["version"] = newver2
+
+        if self.__dictionary is None:
+            result["loaded_dictionary"] = False
+
+        else:
+            result["loaded_dictionary"] = True
+
+        result["container"] = self.container
+
+        return result
+
+    @_shared
+    def get(self, key, view=False):
+        """
+        Get the value of <key>.
+        The decoded values are cached until <key> is updated or removed.
+
+        :param str key: The name/key of the value you are looking for.
+        :param bool view: If True, arrays are returned as tuples and binaries as read-only memoryviews,
+                          which avoids copying the cached value.
+
+        :returns str: Returns type(str) if the <key>'s datatype is `str`.
+        :returns int: Returns type(int) if the <key>'s datatype is `int`.
+        :returns float: Returns type(float) if the <key>'s datatype is `float`.
+        :returns bool: Returns type(bool) if the <key>'s datatype is `bool`.
+        :returns list: Returns type(list) if the <key>'s datatype is `arr`.
+        :returns tuple: Returns type(tuple) if the <key>'s datatype is `arr` and <view> is True.
+        :returns bytes: Returns type(bytes) if the <key>'s datatype is `bin`.
+        :returns memoryview: Returns type(memoryview) if the <key>'s datatype is `bin` and <view> is True.
+        """
+
+        if self.__dictionary is None and self.__index is not None and self.__data is not None:
+            # Only the requested value is read from a `v3-indexed` file. (See `load(load_dict=False)`)
+            cached = self.__cache.get(key, None)
+            if cached is not None:
+                value = cached[1]
+
+            else:
+                stored = self.__journal[key] if key in self.__journal else self.__readentries((key,))[key]
+                if stored is None:
+                    raise KeyError(key)  # Removed in the journal
+
+                value = self.__decodevalue(stored)
+                self.__cache[key] = (stored, value)
+
+        elif self.__dictionary is None or self.__data is None:
+            raise ValueError("The configuration file is not yet loaded!")
+
+        elif type(self.__dictionary) is dict:
+            stored = self.__dictionary[key]
+            cached = self.__cache.get(key, None)
+            if cached is not None and cached[0] is stored:
+                value = cached[1]
+
+            else:
+                value = self.__decodevalue(stored)
+                self.__cache[key] = (stored, value)
+
+        else:
+            raise ValueError("Invalid dictionary")
+
+        if type(value) is tuple:
+            return value if view else list(value)
+
+        elif view and type(value) is bytes:
+            return memoryview(value)
+
+        return value
+
+    def __decodevalue(self, value):
+        """
+        Convert a value of the dictionary to its Python form.
+
+        :param list value: The datatype and the value from the dictionary.
+
+        :returns object: The decoded value. (Arrays are returned as tuples.)
+        """
+
+        if value[0] == "arr":
+            codec = Datatypes.codecs.get(value[1], None)
+            if codec is None:
+                raise ValueError("Invalid data type")
+
+            decode = codec[2]
+            if value[1] != "bin":
+                return tuple([decode(_) for _ in value[2]])
+
+            return tuple([self.__readblob(_["blob"]) if type(_) is dict else decode(_) for _ in value[2]])
+
+        codec = Datatypes.codecs.get(value[0], None)
+        if codec is None:
+            raise ValueError("Invalid data type")
+
+        if value[0] == "bin" and type(value[1]) is dict:
+            return self.__readblob(value[1]["blob"])
+
+        return codec[2](value[1])
+
+    @_exclusive
+    def add(self, key, valuetype, value, array_datatype=None):
+        """
+        Add a new variable.
+
+        :param str key: The variable name/key.
+        :param str valuetype: The data type of the variable.
+                              Available valuetypes:
+                                  - str
+                                  - int
+                                  - float
+                                  - bool
+                                  - arr (list)
+                                  - bin (binary)
+
+        :param str value: The value of <key>. (If <valuetype> is `str`)
+        :param int value: The value of <key>. (If <valuetype> is `int`)
+        :param float value: The value of <key>. (If <valuetype> is `float`)
+        :param bool value: The value of <key>. (If <valuetype> is `bool`)
+        :param tuple value: The value of <key>. (If <valuetype> is `arr`)
+        :param list value: The value of <key>. (If <valuetype> is `arr`)
+        :param bytes value: The value of <key>. (If <valuetype> is `bin`)
+
+        :param str array_datatype: [OPTIONAL; If your valuetype is `arr`, this is required] The data type of the array objects (`arr` not supported)
+
+        :returns void:
+        """
+
+        # <variable_name>|<datatype>|<value>
+        # <variable_name>|<datatype>|<array_datatype>|<values>
+
+        if type(key) is not str:
+            raise TypeError("key is not a string")
+
+        if self.__dictionary is None or self.__data is None:
+            raise ValueError("The configuration file is not yet loaded!")
+
+        if self.__dictionary.get(key, None) is None:
+            # Add to the dictionary
+            blobs = {}
+            self.__dictionary[key] = self.__encodevalue(valuetype, value, blobs, array_datatype)
+            self.__pending_blobs.update(blobs)
+            self.__changed((key,))
+
+        else:
+            ValueError("A value is already assigned to the key. Use update() instead.")
+
+    @_exclusive
+    def update(self, key, value):
+        """
+        Update an existing variable.
+
+        :param str key: The variable name/key to update.
+        :param str value: The new value of <key>.
+
+        :returns void:
+        """
+
+        # <variable_name>|<datatype>|<value>
+        # <variable_name>|<datatype>|<array_datatype>|<values>
+
+        if self.__dictionary is None or self.__data is None:
+            raise ValueError("The configuration file is not yet loaded!")
+
+        oldvalue = self.__dictionary.get(key, None)
+        if oldvalue is not None:
+            blobs = {}
+            newvalue = self.__encodeupdate(oldvalue, value, blobs)
+            if newvalue != oldvalue:
+                self.__dictionary[key] = newvalue
+                self.__pending_blobs.update(blobs)
+                self.__cache.pop(key, None)
+                self.__changed((key,))
+
+        else:
             ValueError("Key wasn't found in the dictionary")
 
+    def __encodevalue(self, valuetype, value, blobs, array_datatype=None):
+        """
+        Convert <value> to its dictionary form.
+
+        :param str valuetype: The data type of the variable.
+        :param object value: The value to convert.
+        :param dict blobs: Where the new blobs are staged. (See __encodebin())
+        :param str array_datatype: The data type of the array objects, if <valuetype> is `arr`.
+
+        :returns list: The dictionary form of <value>.
+        """
+
+        if valuetype == "arr":
+            if array_datatype is None:
+                raise ValueError("array_datatype is required to create an array!")
+
+            if type(value) not in Datatypes.array_types:
+                raise TypeError("value must be a tuple or list when creating an array.")
+
+            codec = Datatypes.codecs.get(array_datatype, None)
+            if codec is None or not codec[4]:
+                raise ValueError("Unsupported array datatype")
+
+            # The encoder is resolved once for the whole array.
+            if array_datatype == "bin" and self.blob_threshold is not None:
+                return [valuetype, array_datatype, [self.__encodebin(_, blobs) for _ in value]]
+
+            encode = codec[1]
+            return [valuetype, array_datatype, [encode(_) for _ in value]]
+
+        codec = Datatypes.codecs.get(valuetype, None)
+        if codec is None:
+            raise ValueError("Unsupported data type")
+
+        if valuetype == "bin" and self.blob_threshold is not None:
+            return [valuetype, self.__encodebin(value, blobs)]
+
+        return [valuetype, codec[1](value)]
+
+    def __encodebin(self, value, blobs):
+        """
+        Convert a `bin` value to its dictionary form, or to a blob if it is larger than <self.blob_threshold> bytes.
+        New blobs are staged in <blobs>; The caller moves them to <self.__pending_blobs> once the values are
+        in the dictionary, so that a failed call leaves nothing to save().
+
+        :param bytes value: The value to convert.
+        :param dict blobs: Where the new blobs are staged; `name: data`
+
+        :returns str: The Base64 form of <value>.
+        :returns dict: The reference to the blob; `{"blob": name}`.
+        """
+
+        if type(value) is not bytes or len(value) <= self.blob_threshold:
+            return Datatypes.codecs["bin"][1](value)
+
+        name = self.__blobname(value)
+        if not os.path.exists(os.path.join(self.blobpath, name)):
+            blobs[name] = value  # Stored blobs are not written again. (See <self.dirty>)
+
+        return {"blob": name}
+
+    def __encodeupdate(self, oldvalue, value, blobs):
+        """
+        Convert <value> to its dictionary form, making sure it has the same data type as <oldvalue>.
+
+        :param list oldvalue: The current dictionary form of the variable.
+        :param object value: The new value of the variable.
+        :param dict blobs: See __encodevalue().
+
+        :returns list: The dictionary form of <value>.
+        """
+
+        valuetype = oldvalue[0]
+        if valuetype == "arr":
+            if type(value) not in Datatypes.array_types:
+                raise TypeError("New value must be a list or a tuple")
+
+            codec = Datatypes.codecs.get(oldvalue[1], None)
+            if codec is None:
+                raise ValueError("Unsupported array datatype")
+
+            types = codec[0]
+            for _ in value:
+                if type(_) not in types:
+                    raise TypeError("New value has different datatype than the old value")
+
+            return self.__encodevalue(valuetype, value, blobs, oldvalue[1])
+
+        codec = Datatypes.codecs.get(valuetype, None)
+        if codec is None:
+            raise ValueError("Unsupported data type")
+
+        if type(value) not in codec[0]:
+            raise TypeError("New value has different datatype than the old value")
+
+        return self.__encodevalue(valuetype, value, blobs)
+
+    def __validatevalue(self, value):
+        """
+        Check the dictionary form of a variable.
+        Raises `ValueError` if it is invalid.
+
+        :param list value: The dictionary form of the variable.
+
+        :returns void:
+        """
+
+        if value[0] == "arr":
+            codec = Datatypes.codecs.get(value[1], None)
+            if codec is None or not codec[4]:
+                raise ValueError("Array datatype is not supported (see self.array_datatypes)")
+
+            validate = codec[3]
+            for _ in value[2]:
+                if type(_) is dict and value[1] == "bin":
+                    self.__validateblob(_)
+
+                else:
+                    validate(_)
+
+        else:
+            codec = Datatypes.codecs.get(value[0], None)
+            if codec is None:
+                raise ValueError("Unsupported datatype")
+
+            if type(value[1]) is dict and value[0] == "bin":
+                self.__validateblob(value[1])
+
+            else:
+                codec[3](value[1])
+
+    @staticmethod
+    def __validateblob(reference):
+        """
+        Check a reference to a blob.
+        Raises `ValueError` if it is invalid.
+
+        :param dict reference: The reference; `{"blob": name}`.
+
+        :returns void:
+        """
+
+        name = reference.get("blob", None)
+        if len(reference) != 1 or type(name) is not str or len(name) != 64 or name.strip("0123456789abcdef"):
+            raise ValueError("Invalid blob reference")
+
+    def __blobname(self, data):
+        """
+        Get the name of the blob of <data>; Its SHA-256 hash, or HMAC if the configuration file is encrypted.
+        (So that the names do not reveal the contents of encrypted blobs.)
+
+        :param bytes data: The contents of the blob.
+
+        :returns str: The name of the blob.
+        """
+
+        if self.__data["encryption"] == "None":
+            return hashlib.sha256(data).hexdigest()
+
+        key = hashlib.sha256(b"blob:" + self.__getcipher().key).digest()
+        return hmac.new(key, data, hashlib.sha256).hexdigest()
+
+    def __readblob(self, name):
+        """
+        Read a blob. (See <self.blobpath>)
+
+        :param str name: The name of the blob.
+
+        :returns bytes: The contents of the blob.
+        """
+
+        data = self.__pending_blobs.get(name, None)
+        if data is not None:
+            return data
+
+        try:
+            with open(os.path.join(self.blobpath, name), "rb") as f:
+                data = Instrumentation.measure(self.observer, "readblob.read", f.read)
+
+        except(FileNotFoundError, IsADirectoryError):
+            raise IOError("The blob `{0}` is missing".format(name))
+
+        # <compression id> <encryption id> <compressed and encrypted contents>
+        if len(data) < 2 or data[1] != self.encryption_ids[self.__data["encryption"]]:
+            raise ValueError("The blob `{0}` is corrupt".format(name))
+
+        try:
+            data = bytes(self.__decodeblock(memoryview(data)[2:], Compression.name_of(data[0])))
+
+        except Exception:
+            # The compression modules raise their own exception types.
+            raise ValueError("The blob `{0}` is corrupt".format(name))
+
+        if not hmac.compare_digest(self.__blobname(data), name):
+            raise ValueError("The blob `{0}` is corrupt".format(name))
+
+        return data
+
+    def __writeblobs(self):
+        """
+        Store the new blobs. Blobs that are already stored are left untouched.
+
+        :returns void:
+        """
+
+        if not self.__pending_blobs:
+            return None
+
+        os.makedirs(self.blobpath, exist_ok=True)
+        header = bytes((Compression.algorithms[self.__data["compression"]][0], self.encryption_ids[self.__data["encryption"]]))
+        for name, data in self.__pending_blobs.items():
+            path = os.path.join(self.blobpath, name)
+            if not os.path.exists(path):
+                data = header + self.__encodeblock(data)
+                Instrumentation.measure(self.observer, "writeblob.write", lambda data: self.__writer.write(path, data), data)
+
+        self.__pending_blobs = {}
+
+    def __inlineblobs(self, value):
+        """
+        Replace the references to blobs in the dictionary form of a variable with the contents of the blobs.
+
+        :param list value: The dictionary form of the variable.
+
+        :returns list: The dictionary form, without blobs.
+        """
+
+        encode = Datatypes.codecs["bin"][1]
+        if value[0] == "bin" and type(value[1]) is dict:
+            return ["bin", encode(self.__readblob(value[1]["blob"]))]
+
+        elif value[0] == "arr" and value[1] == "bin" and any(type(_) is dict for _ in value[2]):
+            return ["arr", "bin", [encode(self.__readblob(_["blob"])) if type(_) is dict else _ for _ in value[2]]]
+
+        return value
+
+    def __storeblobs(self, value, blobs):
+        """
+        Move the large `bin` values of the dictionary form of a variable to blobs. (See __encodebin())
+
+        :param list value: The dictionary form of the variable.
+        :param dict blobs: See __encodevalue().
+
+        :returns list: The dictionary form, with references to the blobs.
+        """
+
+        decode = Datatypes.codecs["bin"][2]
+        if value[0] == "bin" and type(value[1]) is str:
+            return ["bin", self.__encodebin(decode(value[1]), blobs)]
+
+        elif value[0] == "arr" and value[1] == "bin":
+            return ["arr", "bin", [self.__encodebin(decode(_), blobs) if type(_) is str else _ for _ in value[2]]]
+
+        return value
+
+    @_exclusive
+    @_locks_file(True)
+    def remove_unused_blobs(self):
+        """
+        Delete the stored blobs that are not used by the dictionary anymore.
+        Other objects using the same configuration file must be loaded again afterwards.
+
+        The dictionary must be the one in the file; ValueError is raised if it has unsaved changes,
+        and ConfigModifiedError if the file was modified after it was loaded.
+
+        :returns int: The number of deleted blobs.
+        """
+
+        if self.__dictionary is None:
+            raise ValueError("Dictionary is not yet loaded!")
+
+        if self.dirty:
+            # The file may still use the blobs of the values that were changed.
+            raise ValueError("The configuration has unsaved changes")
+
+        self.__checkmodified()
+
+        used = set()
+        for value in self.__dictionary.values():
+            if value[0] == "bin" and type(value[1]) is dict:
+                used.add(value[1]["blob"])
+
+            elif value[0] == "arr" and value[1] == "bin":
+                used.update(_["blob"] for _ in value[2] if type(_) is dict)
+
+        try:
+            names = os.listdir(self.blobpath)
+
+        except FileNotFoundError:
+            return 0
+
+        removed = 0
+        for name in names:
+            if name not in used and len(name) == 64:
+                os.remove(os.path.join(self.blobpath, name))
+                removed += 1
+
+        return removed
+
+    @_shared
+    def get_many(self, keys, view=False):
+        """
+        Get the values of several keys.
+
+        :param list keys: The names/keys of the values you are looking for.
+        :param bool view: See get().
+
+        :returns dict: The `key: value` pairs.
+        """
+
+        if self.__dictionary is None and self.__index is not None:
+            # Read the missing values of a `v3-indexed` file at once.
+            missing = [key for key in keys if key not in self.__cache and key not in self.__journal]
+            if missing:
+                for key, stored in self.__readentries(missing).items():
+                    self.__cache[key] = (stored, self.__decodevalue(stored))
+
+        get = self.get
+        return {key: get(key, view) for key in keys}
+
+    @_exclusive
+    def add_many(self, variables):
+        """
+        Add several new variables.
+        Nothing is added if one of the variables is invalid.
+
+        :param dict variables: The `key: (valuetype, value)` or `key: (valuetype, value, array_datatype)` pairs to add.
+                               (See add())
+
+        :returns void:
+        """
+
+        if self.__dictionary is None or self.__data is None:
+            raise ValueError("The configuration file is not yet loaded!")
+
+        # Convert everything first so that the dictionary is left untouched on error.
+        staged = {}
+        blobs = {}
+        for key, variable in variables.items():
+            if type(key) is not str:
+                raise TypeError("key is not a string")
+
+            if self.__dictionary.get(key, None) is not None:
+                raise ValueError("A value is already assigned to the key. Use update() instead.")
+
+            if len(variable) == 3:
+                staged[key] = self.__encodevalue(variable[0], variable[1], blobs, variable[2])
+
+            elif len(variable) == 2:
+                staged[key] = self.__encodevalue(variable[0], variable[1], blobs)
+
+            else:
+                raise ValueError("Variables must be `(valuetype, value)` or `(valuetype, value, array_datatype)`")
+
+        self.__dictionary.update(staged)
+        self.__pending_blobs.update(blobs)
+        self.__changed(staged)
+
+    @_exclusive
+    def update_many(self, variables):
+        """
+        Update several existing variables.
+        Nothing is updated if one of the variables is invalid.
+
+        :param dict variables: The `key: new value` pairs to update.
+
+        :returns void:
+        """
+
+        if self.__dictionary is None or self.__data is None:
+            raise ValueError("The configuration file is not yet loaded!")
+
+        # Convert everything first so that the dictionary is left untouched on error.
+        staged = {}
+        blobs = {}
+        for key, value in variables.items():
+            oldvalue = self.__dictionary.get(key, None)
+            if oldvalue is None:
+                raise ValueError("Key wasn't found in the dictionary")
+
+            newvalue = self.__encodeupdate(oldvalue, value, blobs)
+            if newvalue != oldvalue:
+                staged[key] = newvalue
+
+        self.__dictionary.update(staged)
+        self.__pending_blobs.update(blobs)
+        for key in staged:
+            self.__cache.pop(key, None)
+
+        self.__changed(staged)
+
+    @_exclusive
     def remove(self, key):
         """
         Remove an existing variable.
@@ -1018,8 +3821,25 @@ class Version2():
         """
 
         self.__dictionary.pop(key)
+        self.__cache.pop(key, None)
+        self.__changed((key,))
+
+    def __changed(self, keys):
+        """
+        Remember that <keys> have to be written by the next save().
+
+        :param list keys: The added, updated, or removed keys.
+
+        :returns void:
+        """
 
-    def new(self, name, author=None, compression="None", encryption="None"):
+        if self.__changes is not None:
+            for key in keys:
+                self.__changes[key] = None
+
+    @_exclusive
+    @_locks_file(True)
+    def new(self, name, author=None, compression="None", encryption="None", container="v2", kdf="sha256", kdf_params=None, compression_level=None):
         """
         Create a new configuration file.
 
@@ -1027,6 +3847,10 @@ class Version2():
         :param str author: [Optional] The name of the configuration file's author.
         :param str compression: The compression algorithm name (See self.compressions)
         :param str encryption: The encryption algorithm name (See self.encryptions)
+        :param str container: The configuration file container (See self.containers)
+        :param str kdf: The key derivation function of the encryption password (See self.kdfs)
+        :param dict kdf_params: [Optional] The parameters of the key derivation function (See AES256.kdf_defaults)
+        :param int compression_level: [Optional] The compression level (See Compression.algorithms)
         """
 
         if not os.path.exists(self.configpath):
@@ -1045,11 +3869,7 @@ class Version2():
             self.__data["version"] = self.VERSION
 
             # Set the compression
-            if compression in self.compressions:
-                self.__data["compression"] = compression
-
-            else:
-                raise ValueError("Unsupported compression algorithm name")
+            self.set_compression(compression, compression_level)
 
             # Set the encryption
             if encryption in self.encryptions:
@@ -1060,6 +3880,33 @@ class Version2():
             else:
                 raise ValueError("Unsupported encryption algorithm name")
 
+            # Set the key derivation function
+            # The salt is generated once per configuration file and stored with it.
+            self.__cipher = None
+            if kdf == "sha256":
+                self.__data.pop("kdf", None)
+
+            elif kdf in self.kdfs:
+                params = dict(AES256.kdf_defaults[kdf])
+                if kdf_params is not None:
+                    params.update(kdf_params)
+
+                self.__data["kdf"] = {
+                    "name": kdf,
+                    "salt": self.__b64encode(Random.get_random_bytes(16)),
+                    "params": params
+                }
+
+            else:
+                raise ValueError("Unsupported key derivation function")
+
+            # Set the container
+            if container in self.containers:
+                self.container = container
+
+            else:
+                raise ValueError("Unsupported container format")
+
             # Set the dictionary
             self.import_dict({})
 
@@ -1069,6 +3916,42 @@ class Version2():
         else:
             raise FileExistsError("The configuration file is already present")
 
+    @_exclusive
+    def set_compression(self, compression, level=None):
+        """
+        Change the compression algorithm of the dictionary.
+        The change is applied on the next save().
+
+        :param str compression: The compression algorithm name (See self.compressions)
+        :param int level: [Optional] The compression level (See Compression.algorithms)
+
+        :returns void:
+        """
+
+        if compression not in self.compressions:
+            raise ValueError("Unsupported compression algorithm name")
+
+        self.__data["compression_level"] = Compression.validate_level(compression, level)
+        self.__data["compression"] = compression
+
+    @_shared
+    def recommend_compression(self, priority="balanced", repeat=3):
+        """
+        Benchmark the compression algorithms against the current dictionary and pick one.
+
+        :param str priority: What to optimize for (See Compression.recommend())
+        :param int repeat: The number of times each algorithm is timed.
+
+        :returns dict: The compression algorithm name, level, size, ratio, compression and decompression time.
+        """
+
+        if self.__dictionary is None:
+            raise ValueError("The configuration file is not yet loaded!")
+
+        serialized = json.dumps(self.__dictionary, separators=(',', ':')).encode(self.encoding)
+        return Compression.recommend(Compression.benchmark(serialized, repeat), priority)
+
+    @_shared
     def export_config(self):
         """
         Export the contents of the configuration file.
@@ -1079,11 +3962,12 @@ class Version2():
         if self.__data is None or self.__dictionary is None:
             raise ValueError("Dictionary is not yet loaded!")
 
-        to_export = self.__data
-        to_export["dictionary"] = self.__dictionary
+        to_export = dict(self.__data)
+        to_export["dictionary"] = {key: self.__inlineblobs(value) for key, value in self.__dictionary.items()}
 
         return to_export
 
+    @_exclusive
     def import_dict(self, dictionary):
         """
         Overwrite the contents of the dictionary.
@@ -1097,71 +3981,451 @@ class Version2():
         # <variable_name>|<datatype>|<array_datatype>|<values>
 
         for key in dictionary:
-            # Check if object's datatype is supported
-            if dictionary[key][0] in self.datatypes:
-                # Check if object is an array
-                if dictionary[key][0] == "arr":
-                    # Check if array's datatype is supported
-                    if dictionary[key][1] in self.array_datatypes:
-                        # Check objects in array individually
-                        for value in dictionary[key][2]:
-                            if dictionary[key][1] == "bool":
-                                if value in (0, 1):
-                                    pass
-
-                                else:
-                                    raise ValueError("Unknown Boolean State")
-
-                            elif dictionary[key][1] == "bin":
-                                if self.__b64encode(self.__b64decode(value)) == value:
-                                    pass
-
-                                else:
-                                    raise ValueError("Invalid binary data")
-
-                            else:
-                                if type(value) in self.array_datatypes_conversion[dictionary[key][1]]:
-                                    pass
-
-                                else:
-                                    raise ValueError("An array object's datatype does not match the array's datatype")
-
-                    else:
-                        raise ValueError("Array datatype is not supported (see self.array_datatypes")
+            self.__validatevalue(dictionary[key])
 
-                else:
-                    if dictionary[key][0] == "bool":
-                        if dictionary[key][1] in (0, 1):
-                            pass
+        blobs = {}
+        if self.blob_threshold is not None:
+            # Move the large `bin` values to blobs, like add() does.
+            dictionary = {key: self.__storeblobs(value, blobs) for key, value in dictionary.items()}
+
+        if dictionary != self.__dictionary:
+            # The whole dictionary is rewritten; Comparing it is cheaper than finding the changed keys.
+            self.__changes = None
+
+        self.__dictionary = dictionary
+        self.__pending_blobs.update(blobs)
+        self.__cache = {}
 
-                        else:
-                            raise ValueError("Unknown boolean state")
+    @_serialized
+    @_locks_file(True)
+    def save(self, force=False):
+        """
+        Save the current data to <self.configpath>.
+        Nothing is written if nothing has changed since the last load() or save(), unless the file was deleted.
+        (See <self.dirty>; Use compact() to rewrite the file anyway.)
+        If <self.journal> is True and the file is a `v3` file, only the changes since the last load() or save()
+        are appended to the journal of the file, until the journal has to be compacted. (See compact())
 
-                    elif dictionary[key][0] == "bin":
-                        if self.__b64encode(self.__b64decode(dictionary[key][1])) == dictionary[key][1]:
-                            pass
+        :param bool force: If True, overwrite the file even if another process modified it after it was loaded.
+                           (Otherwise, ConfigModifiedError is raised)
 
-                        else:
-                            raise ValueError("Invalid binary data")
+        :returns void:
+        """
 
-                    else:
-                        if type(dictionary[key][1]) in self.datatypes_conversion[dictionary[key][0]]:
-                            pass
+        if not self.dirty and os.path.exists(self.configpath):
+            # Even if someone else modified the file, there is nothing of this object's to write.
+            return None
 
-                        else:
-                            raise ValueError("New dictionary has unsupported data type")
+        if not force:
+            self.__checkmodified()
 
-            else:
-                raise ValueError("Unsupported datatype")
+        # The blobs are stored first, so that the file never refers to missing blobs.
+        self.__writeblobs()
+        records = self.__journalrecords()
+        if records is None or not self.__appendjournal(records):
+            self.compact(force=True)
 
-        self.__dictionary = dictionary
+    @property
+    def dirty(self):
+        """
+        True if the configuration was changed since the last load() or save(), and save() has to write it.
+        Setting a variable to its current value does not count as a change.
+        """
+
+        return (
+            self.__changes != {}
+            or bool(self.__pending_blobs)
+            or self.__file_settings != self.__journalsettings()
+        )
 
-    def save(self):
+    async def asave(self, force=False):
         """
-        Save the current data to <self.configpath>.
+        Like save(), but encoding and writing the configuration file run in <self.executor>,
+        so that the event loop is not blocked.
+
+        Unless the object is thread-safe, it must not be changed until asave() returns.
+
+        :param bool force: See save().
+
+        :returns void:
+        """
+
+        async with self.__getasynclock():
+            await asyncio.get_running_loop().run_in_executor(self.executor, functools.partial(self.save, force))
+
+    @_serialized
+    @_locks_file(True)
+    def compact(self, force=False):
+        """
+        Rewrite the whole configuration file, folding the journal into the dictionary.
+
+        :param bool force: See save().
 
         :returns void:
         """
 
+        if not force:
+            self.__checkmodified()
+
+        self.__writeblobs()
         self.__writedict()
         self.__writeconfig()
+
+        filestat = os.stat(self.configpath)
+        settings = self.__journalsettings()
+        with self.__publishing():
+            self.__file_stat = (filestat.st_mtime_ns, filestat.st_size, filestat.st_ino)
+            if self.__file_digest:
+                self.__file_digest = b''  # Not the hash of the loaded file anymore.
+
+            self.__index = None
+            self.__journal = {}
+            self.__journal_end = filestat.st_size
+            self.__journal_size = 0
+            self.__snapshot_size = len(self.__data["dictionary"])
+            self.__journal_settings = settings if self.journal else None
+            self.__file_settings = settings
+            self.__changes = {}
+
+    @contextlib.contextmanager
+    def __publishing(self):
+        """
+        Hold the write lock of a thread-safe object inside a `with` block,
+        so that readers see the state from before or after the block, and never a part of both.
+        (Writers that are only _serialized() use it to replace the state they read.)
+        """
+
+        if self._lock is None:
+            yield
+            return None
+
+        self._lock.acquire_write()
+        try:
+            yield
+
+        finally:
+            self._lock.release_write()
+
+    def __checkmodified(self):
+        """
+        Raise ConfigModifiedError if the configuration file was modified after this object last read or wrote it.
+
+        :returns void:
+        """
+
+        if self.__file_stat is None:
+            return None
+
+        try:
+            filestat = os.stat(self.configpath)
+
+        except FileNotFoundError:
+            return None
+
+        if (filestat.st_mtime_ns, filestat.st_size, filestat.st_ino) != self.__file_stat:
+            raise ConfigModifiedError("The configuration file was modified after it was loaded")
+
+    def __journalrecords(self):
+        """
+        Encode the changes since the last load() or save() as journal records.
+
+        :returns bytes: The records, or None if the whole file has to be rewritten.
+        """
+
+        if not self.journal or self.container not in ("v3", "v3-indexed", "v3-chunked") or self.__changes is None:
+            return None
+
+        if self.__journal_settings != self.__journalsettings():
+            return None  # The records would not match the rest of the file.
+
+        records = bytearray()
+        for key in self.__changes:
+            if key in self.__dictionary:
+                record = ["set", key, self.__dictionary[key]]
+
+            else:
+                record = ["remove", key]
+
+            record = self.__encodeblock(Instrumentation.measure(self.observer, "writejournal.serialize", self.__serialize, record).encode(self.encoding))
+            records += self._journal_header.pack(len(record))
+            records += record
+
+        size = self.__journal_size + len(records)
+        if size > self.journal_compact_size or size > self.journal_compact_ratio * self.__snapshot_size:
+            return None
+
+        return records
+
+    def __appendjournal(self, records):
+        """
+        Append <records> to the journal of the configuration file.
+
+        :param bytes records: The records from __journalrecords().
+
+        :returns bool: False if the file was modified by someone else, and has to be rewritten.
+        """
+
+        if not records:
+            return True  # Nothing has changed.
+
+        try:
+            f = open(self.configpath, "r+b")
+
+        except(FileNotFoundError, IsADirectoryError):
+            return False
+
+        with f:
+            filestat = os.fstat(f.fileno())
+            if (filestat.st_mtime_ns, filestat.st_size, filestat.st_ino) != self.__file_stat:
+                return False
+
+            # Overwrite an incomplete record left by an interrupted save().
+            f.seek(self.__journal_end)
+            Instrumentation.measure(self.observer, "writejournal.write", f.write, records)
+            f.truncate()
+            f.flush()
+            if self.__writer.durability != "None":
+                os.fsync(f.fileno())
+
+            filestat = os.fstat(f.fileno())
+
+        with self.__publishing():
+            self.__file_stat = (filestat.st_mtime_ns, filestat.st_size, filestat.st_ino)
+            if self.__file_digest:
+                self.__file_digest = b''
+
+            self.__journal_end += len(records)
+            self.__journal_size += len(records)
+            self.__changes = {}
+
+        return True
+
+
+class Watcher(object):
+    """
+    Reload the configuration file of a Version2() object when it changes, and call the callbacks of the changed keys.
+    The directory of the file is watched with inotify where it is available;
+    Otherwise, the file is checked every <interval> seconds.
+
+    start() reloads the file from another thread, so the object must be thread-safe. (`Version2(threadsafe=True)`)
+
+    Usage:
+        watcher = Watcher(config)
+        watcher.watch(callback, "key")  # callback(key, old value, new value)
+        watcher.start()
+        ...
+        watcher.stop()
+    """
+
+    # The inotify(7) events that can change or replace the file;
+    # IN_MODIFY, IN_CLOSE_WRITE, IN_MOVED_TO, and IN_CREATE.
+    _inotify_mask = 0x002 | 0x008 | 0x080 | 0x100
+    _inotify_overflow = 0x4000  # IN_Q_OVERFLOW
+    _inotify_event = struct.Struct("iIII")  # The watch descriptor, mask, cookie, and name length of an event
+
+    def __init__(self, config, interval=1.0, inotify=True, on_error=None):
+        """
+        The initialization method of Watcher() class.
+
+        :param Version2 config: The configuration to reload. (See Version2.reload())
+        :param float interval: The number of seconds between checks.
+                               (With inotify, the file is also checked as soon as it changes.)
+        :param bool inotify: If False, the file is always polled.
+        :param on_error: Called with the exception if the file cannot be reloaded, or a callback fails.
+                         The watcher keeps running either way, and the other callbacks are still called.
+        """
+
+        self.config = config
+        self.interval = interval
+        self.inotify = inotify
+        self.on_error = on_error
+        self.callbacks = []  # `(key, callback)` pairs; The key is None for the callbacks of every key.
+        self.__thread = None
+        self.__inotify_fd = None
+        self.__wakeup = None  # The pipe that wakes the thread up when it is stopped.
+        self.__stop = threading.Event()
+
+    def watch(self, callback, key=None):
+        """
+        Call <callback> when the value of <key> changes.
+
+        :param callback: Called with the key, the old value, and the new value. (See Version2.reload())
+        :param str key: The key to watch. (None watches every key)
+
+        :returns void:
+        """
+
+        self.callbacks.append((key, callback))
+        if key is not None:
+            # Lazily loaded files only compare the values that were read. (See Version2.reload())
+            try:
+                self.config.get(key)
+
+            except(KeyError, ValueError, IOError):
+                pass  # Not added, or not loaded yet
+
+
+    def check(self):
+        """
+        Reload the configuration file if it changed, and call the callbacks of the changed keys.
+
+        Every callback is called, even if another one fails. The exceptions are passed to <self.on_error>;
+        Without it, the first exception is raised after the callbacks are called.
+
+        :returns dict: The changes. (See Version2.reload())
+        """
+
+        changes = self.config.reload()
+        failure = None
+        for key, (old, new) in changes.items():
+            for watched, callback in list(self.callbacks):
+                if watched is None or watched == key:
+                    try:
+                        callback(key, old, new)
+
+                    except Exception as error:
+                        if self.on_error is not None:
+                            self.on_error(error)
+
+                        elif failure is None:
+                            failure = error
+
+        if failure is not None:
+            raise failure
+
+        return changes
+
+    def start(self):
+        """
+        Start watching the configuration file in a daemon thread.
+
+        :returns void:
+        """
+
+        if self.__thread is not None:
+            raise ValueError("The watcher is already running")
+
+        if self.config._lock is None:
+            raise ValueError("The configuration must be thread-safe to be watched from another thread")
+
+        self.__stop.clear()
+        self.__inotify_fd = self.__addwatch() if self.inotify else None
+        if self.__inotify_fd is not None:
+            self.__wakeup = os.pipe()
+
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        """
+        Stop watching the configuration file.
+
+        :returns void:
+        """
+
+        if self.__thread is None:
+            return None
+
+        self.__stop.set()
+        if self.__wakeup is not None:
+            os.write(self.__wakeup[1], b'\0')
+
+        self.__thread.join()
+        self.__thread = None
+        for fd in (self.__inotify_fd,) + (self.__wakeup or ()):
+            if fd is not None:
+                os.close(fd)
+
+        self.__inotify_fd = None
+        self.__wakeup = None
+
+    @property
+    def running(self):
+        """
+        True if the watcher was started, and not stopped yet.
+        """
+
+        return self.__thread is not None
+
+    def __addwatch(self):
+        """
+        Watch the directory of the configuration file with inotify.
+        (The file itself is replaced by every save(), so it cannot be watched.)
+
+        :returns int: The inotify file descriptor, or None if inotify is not available.
+        """
+
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            inotify_init1 = libc.inotify_init1
+            inotify_add_watch = libc.inotify_add_watch
+
+        except(OSError, AttributeError, TypeError):
+            return None
+
+        fd = inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            return None
+
+        directory = os.path.dirname(os.path.abspath(self.config.configpath))
+        if inotify_add_watch(fd, os.fsencode(directory), self._inotify_mask) < 0:
+            os.close(fd)
+            return None
+
+        return fd
+
+    def __readevents(self, fd, name):
+        """
+        Read the pending inotify events.
+
+        :param int fd: The inotify file descriptor.
+        :param bytes name: The file name of the configuration file.
+
+        :returns bool: True if the configuration file might have changed.
+        """
+
+        try:
+            data = os.read(fd, 65536)
+
+        except BlockingIOError:
+            return False
+
+        changed = False
+        offset = 0
+        while offset + self._inotify_event.size <= len(data):
+            wd, mask, cookie, length = self._inotify_event.unpack_from(data, offset)
+            offset += self._inotify_event.size
+            if mask & self._inotify_overflow or data[offset:offset + length].rstrip(b'\0') == name:
+                changed = True
+
+            offset += length
+
+        return changed
+
+    def __run(self):
+        """
+        Check the configuration file until the watcher is stopped.
+
+        :returns void:
+        """
+
+        fd = self.__inotify_fd
+        name = os.fsencode(os.path.basename(self.config.configpath))
+        while not self.__stop.is_set():
+            if fd is None:
+                self.__stop.wait(self.interval)
+
+            else:
+                ready = select.select([fd, self.__wakeup[0]], [], [], self.interval)[0]
+                if fd in ready and not self.__readevents(fd, name):
+                    continue  # Another file in the directory changed.
+
+            if self.__stop.is_set():
+                break
+
+            try:
+                self.check()
+
+            except Exception as error:
+                if self.on_error is not None:
+                    self.on_error(error)
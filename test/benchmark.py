@@ -0,0 +1,352 @@
+"""
+Benchmark suite for ConfigHandler.
+
+Measures Version1.get/set/add and Version2.load/get/add/update/save on
+generated configuration files of various sizes, under every compression,
+encryption, and container combination, then optionally compares the
+results against a previously saved baseline.
+
+Usage:
+    python test/benchmark.py --sizes 10,1000,100000 --output results.json
+    python test/benchmark.py --baseline results.json --threshold 0.2
+"""
+
+import argparse
+import csv
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config_handler  # noqa: E402
+
+PASSWORD = "benchmarkP@ssword123"
+MAX_SIZE = 1000000
+
+
+def best_of(function, repeat):
+    """
+    Call <function> <repeat> times.
+
+    :returns float: The fastest run, in seconds.
+    """
+
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best
+
+
+def generate_variables(size, payload_size):
+    """
+    Generate <size> variables, cycling through every data type, plus one large `bin` payload.
+
+    :returns dict: The variables in the format accepted by Version2.add_many().
+    """
+
+    rng = random.Random(size)
+    generators = (
+        lambda: ("str", "value-{0}".format(rng.random())),
+        lambda: ("int", rng.randint(-2 ** 31, 2 ** 31)),
+        lambda: ("float", rng.random() * 1000),
+        lambda: ("bool", rng.random() < 0.5),
+        lambda: ("arr", [rng.randint(0, 1000) for _ in range(8)], "int"),
+        lambda: ("bin", os.urandom(32))
+    )
+    variables = {}
+    for index in range(size):
+        variables["key{0}".format(index)] = generators[index % len(generators)]()
+
+    if payload_size:
+        variables["payload"] = ("bin", os.urandom(payload_size))
+
+    return variables
+
+
+def new_value(variable):
+    """
+    Get a different value with the same data type as <variable>, for update().
+    """
+
+    valuetype = variable[0]
+    if valuetype == "str":
+        return variable[1] + "-updated"
+
+    elif valuetype in ("int", "float"):
+        return variable[1] + 1
+
+    elif valuetype == "bool":
+        return not variable[1]
+
+    elif valuetype == "arr":
+        return list(reversed(variable[1]))
+
+    else:
+        return variable[1][::-1]
+
+
+def benchmark_version1(directory, size, repeat, sample):
+    """
+    Benchmark Version1.get(), set(), and add().
+
+    :returns list: The results.
+    """
+
+    path = os.path.join(directory, "v1-{0}.dat".format(size))
+    config = config_handler.Version1(path)
+    config.new()
+
+    # Generate the file directly; add() is what we are measuring.
+    with open(path, 'a') as f:
+        f.write(''.join("key{0}={0}\n".format(index) for index in range(size)))
+
+    keys = ["key{0}".format(index) for index in random.Random(size).sample(range(size), min(size, sample))]
+    counter = [0]
+
+    def get():
+        for key in keys:
+            config.get(key)
+
+    def set_():
+        config.set(keys[0], counter[0])
+        counter[0] += 1
+
+    def add():
+        config.add("added{0}".format(counter[0]), counter[0])
+        counter[0] += 1
+
+    results = [
+        {"benchmark": "version1.get", "size": size, "operations": len(keys), "seconds": best_of(get, repeat)},
+        {"benchmark": "version1.set", "size": size, "operations": 1, "seconds": best_of(set_, repeat)},
+        {"benchmark": "version1.add", "size": size, "operations": 1, "seconds": best_of(add, repeat)}
+    ]
+    os.remove(path)
+    return results
+
+
+def benchmark_version2(directory, size, payload_size, compression, encryption, container, repeat, sample):
+    """
+    Benchmark Version2.load(), get(), add(), update(), and save().
+
+    :returns list: The results.
+    """
+
+    path = os.path.join(directory, "v2-{0}-{1}-{2}-{3}.dat".format(size, compression, encryption, container))
+    variables = generate_variables(size, payload_size)
+    config = config_handler.Version2(path, PASSWORD)
+    config.new("Benchmark", "benchmark.py", compression, encryption, container)
+    config.load()
+    config.add_many(variables)
+    config.save()
+
+    keys = random.Random(size).sample(sorted(variables), min(len(variables), sample))
+    counter = [0]
+    updated = [False]
+
+    def load():
+        config_handler.Version2(path, PASSWORD).load()
+
+    def get():
+        # A new instance every time, so that the decoded values are not cached.
+        loaded = config_handler.Version2(path, PASSWORD)
+        loaded.load()
+        start = time.perf_counter()
+        for key in keys:
+            loaded.get(key)
+
+        return time.perf_counter() - start
+
+    def add():
+        config.add_many({"added{0}-{1}".format(counter[0], key): variables[key] for key in keys})
+        counter[0] += 1
+
+    def update():
+        # Alternate between the new and the original values, so that every run changes them.
+        updated[0] = not updated[0]
+        config.update_many({key: new_value(variables[key]) if updated[0] else variables[key][1] for key in keys})
+
+    def save():
+        # save() does nothing if nothing has changed since the last save(), so one value is toggled.
+        variable = variables[keys[0]]
+        config.update(keys[0], new_value(variable) if config.get(keys[0]) == variable[1] else variable[1])
+        config.save()
+
+    extra = {"compression": compression, "encryption": encryption, "container": container}
+    results = [
+        {"benchmark": "version2.load", "size": size, "operations": 1, "seconds": best_of(load, repeat)},
+        {"benchmark": "version2.get", "size": size, "operations": len(keys), "seconds": min(get() for _ in range(repeat))},
+        {"benchmark": "version2.add", "size": size, "operations": len(keys), "seconds": best_of(add, repeat)},
+        {"benchmark": "version2.update", "size": size, "operations": len(keys), "seconds": best_of(update, repeat)},
+        {"benchmark": "version2.save", "size": size, "operations": 1, "seconds": best_of(save, repeat)}
+    ]
+    for result in results:
+        result.update(extra)
+        result["file_size"] = os.path.getsize(path)
+
+    os.remove(path)
+    return results
+
+
+def result_id(result):
+    """
+    Get the identifier used to match <result> with the baseline.
+    """
+
+    return "{0}[size={1},compression={2},encryption={3},container={4}]".format(
+        result["benchmark"],
+        result["size"],
+        result.get("compression", ""),
+        result.get("encryption", ""),
+        result.get("container", "")
+    )
+
+
+def compare(results, baseline, threshold):
+    """
+    Compare <results> against <baseline>.
+
+    :returns list: The results that are more than <threshold> slower than the baseline.
+    """
+
+    baseline = {result_id(result): result for result in baseline}
+    regressions = []
+    for result in results:
+        old = baseline.get(result_id(result), None)
+        if old is None or old["seconds"] <= 0:
+            continue
+
+        result["baseline_seconds"] = old["seconds"]
+        result["change"] = result["seconds"] / old["seconds"] - 1
+        if result["change"] > threshold:
+            regressions.append(result)
+
+    return regressions
+
+
+def write_results(results, path, output_format):
+    """
+    Write <results> to <path> (or stdout if <path> is `-`) as JSON or CSV.
+    """
+
+    stream = sys.stdout if path == '-' else open(path, 'w', newline='')
+    try:
+        if output_format == "json":
+            json.dump({"version": config_handler.VERSION, "results": results}, stream, indent=2)
+            stream.write('\n')
+
+        else:
+            fields = []
+            for result in results:
+                for field in result:
+                    if field not in fields:
+                        fields.append(field)
+
+            writer = csv.DictWriter(stream, fields)
+            writer.writeheader()
+            writer.writerows(results)
+
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+
+
+def read_results(path):
+    """
+    Read results written by write_results().
+    """
+
+    with open(path, 'r', newline='') as f:
+        if path.endswith(".csv"):
+            results = []
+            for row in csv.DictReader(f):
+                row["size"] = int(row["size"])
+                row["seconds"] = float(row["seconds"])
+                results.append(row)
+
+            return results
+
+        return json.load(f)["results"]
+
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark ConfigHandler.")
+    parser.add_argument("--sizes", default="10,100,1000", help="Comma-separated number of keys per configuration file. (Up to {0})".format(MAX_SIZE))
+    parser.add_argument("--payload-size", type=int, default=1048576, help="The size of the large `bin` payload in bytes. (0 to disable)")
+    parser.add_argument("--compressions", default=None, help="Comma-separated compression algorithms. (Default: All)")
+    parser.add_argument("--encryptions", default=None, help="Comma-separated encryption algorithms. (Default: All)")
+    parser.add_argument("--containers", default="v2,v3", help="Comma-separated Version2 containers.")
+    parser.add_argument("--repeat", type=int, default=3, help="The number of runs per benchmark. The fastest run is reported.")
+    parser.add_argument("--sample", type=int, default=100, help="The number of keys used by get/add/update per run.")
+    parser.add_argument("--skip-version1", action="store_true", help="Do not benchmark Version1.")
+    parser.add_argument("--skip-version2", action="store_true", help="Do not benchmark Version2.")
+    parser.add_argument("--output", default='-', help="Where to write the results. (Default: stdout)")
+    parser.add_argument("--format", choices=("json", "csv"), default=None, help="The output format. (Default: From the output file extension, or JSON)")
+    parser.add_argument("--baseline", default=None, help="The results of a previous run to compare against.")
+    parser.add_argument("--threshold", type=float, default=0.2, help="The allowed slowdown before a benchmark is reported as a regression. (0.2 is 20%%)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    arguments = parse_arguments(argv)
+    sizes = [int(size) for size in arguments.sizes.split(',')]
+    if any(size < 1 or size > MAX_SIZE for size in sizes):
+        raise SystemExit("Sizes must be from 1 to {0}".format(MAX_SIZE))
+
+    probe = config_handler.Version2(os.devnull)
+    compressions = probe.compressions if arguments.compressions is None else arguments.compressions.split(',')
+    encryptions = probe.encryptions if arguments.encryptions is None else arguments.encryptions.split(',')
+    containers = arguments.containers.split(',')
+
+    directory = tempfile.mkdtemp(prefix="confighandler-benchmark-")
+    results = []
+    try:
+        for size in sizes:
+            if not arguments.skip_version1:
+                print("[i] Version1: {0} keys".format(size), file=sys.stderr)
+                results.extend(benchmark_version1(directory, size, arguments.repeat, arguments.sample))
+
+            if not arguments.skip_version2:
+                for compression in compressions:
+                    for encryption in encryptions:
+                        for container in containers:
+                            print("[i] Version2: {0} keys, {1}, {2}, {3}".format(size, compression, encryption, container), file=sys.stderr)
+                            results.extend(benchmark_version2(
+                                directory, size, arguments.payload_size,
+                                compression, encryption, container,
+                                arguments.repeat, arguments.sample
+                            ))
+
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    regressions = []
+    if arguments.baseline is not None:
+        regressions = compare(results, read_results(arguments.baseline), arguments.threshold)
+
+    output_format = arguments.format
+    if output_format is None:
+        output_format = "csv" if arguments.output.endswith(".csv") else "json"
+
+    write_results(results, arguments.output, output_format)
+
+    for regression in regressions:
+        print("[!] Regression: {0}: {1:.6f}s -> {2:.6f}s ({3:+.1%})".format(
+            result_id(regression),
+            regression["baseline_seconds"],
+            regression["seconds"],
+            regression["change"]
+        ), file=sys.stderr)
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,17 @@
+import asyncio
+import base64
+import concurrent.futures
 import cProfile
+import decimal
+import multiprocessing
 import os
 import shutil
 import sys
 import time
+import threading
 import random
 import timeit
+import tracemalloc
 import unittest
 
 ## The lazy way to do it...
@@ -17,6 +24,33 @@ except(ImportError):
     os.remove("test/config_handler.py")
 
 
+def increment_version1(path, count):
+    config = config_handler.Version1(path, False, lock=True)
+    for _ in range(count):
+        with config.transaction():
+            config.set("counter", config.get("counter") + 1)
+
+
+def increment_version2(path, password, count):
+    config = config_handler.Version2(path, password, lock=True)
+    for _ in range(count):
+        with config.file_lock.exclusive():
+            config.load()
+            config.update("counter", config.get("counter") + 1)
+            config.save()
+
+
+def run_processes(target, *args):
+    processes = [multiprocessing.get_context("fork").Process(target=target, args=args) for _ in range(4)]
+    for process in processes:
+        process.start()
+
+    for process in processes:
+        process.join()
+
+    return [process.exitcode for process in processes]
+
+
 class TestVersion1(unittest.TestCase):
     def test1_create_config(self):
         if config_handler.Version1("test/v1-testconfig.dat", False).new() != 0:
@@ -122,6 +156,235 @@ class TestVersion1(unittest.TestCase):
         self.assertEqual(config_handler.Version1("test/v1-testconfig-base64.conf", True).get("aBool1"), False)
         self.assertEqual(config_handler.Version1("test/v1-testconfig-base64.conf", True).get("aBool2"), True)
 
+    def test3_index_invalidation(self):
+        config = config_handler.Version1("test/v1-testconfig-index.dat", False)
+        if config.new() != 0: raise Exception("File already exists")
+        if config.add("anInt1", 684) != 0: raise Exception("Failed to set variable")
+
+        self.assertEqual(config.get("anInt1"), 684)
+        index = config._index
+        self.assertEqual(config.get("anInt1"), 684)
+        self.assertIs(config._index, index)  # The index must be reused if the file did not change.
+
+        # Edit the file behind the instance's back.
+        with open("test/v1-testconfig-index.dat", 'a') as f:
+            f.write("aString1=Edited externally\n")
+
+        self.assertEqual(config.get("aString1"), "Edited externally")
+        self.assertEqual(config.get("anInt1"), 684)
+
+    def test3_to_dict(self):
+        config = config_handler.Version1("test/v1-testconfig-dict.dat", False)
+        if config.new() != 0: raise Exception("File already exists")
+        with open("test/v1-testconfig-dict.dat", 'a') as f:
+            f.write("anInt1=684\naString1=Hello=World\n# aComment=1\naBool2=TRUE\naFloat2=184.84\naNone=None\naVersion=1.2.3\naBool2=false\n")
+
+        variables = config.to_dict()
+        self.assertEqual(variables, {
+            "anInt1": 684,
+            "aString1": "Hello=World",
+            "aBool2": True,
+            "aFloat2": 184.84,
+            "aNone": None,
+            "aVersion": "1.2.3"
+        })
+        self.assertEqual({key: config.get(key) for key in variables}, variables)
+
+        variables["anInt1"] = 0
+        self.assertEqual(config.get("anInt1"), 684)
+
+        # Files are read with the same encoding they are written with.
+        config = config_handler.Version1("test/v1-testconfig-encoding.dat", False, "latin-1")
+        if config.new() != 0: raise Exception("File already exists")
+        config.add("aString", "Caf\u00e9")
+        config.set("aString", "Cr\u00e8me br\u00fbl\u00e9e")
+        self.assertEqual(config.get("aString"), "Cr\u00e8me br\u00fbl\u00e9e")
+        with open("test/v1-testconfig-encoding.dat", "rb") as f:
+            self.assertIn("Cr\u00e8me".encode("latin-1"), f.read())
+
+    def test3_streaming_rewrite(self):
+        path = "test/v1-testconfig-stream.dat"
+        config = config_handler.Version1(path, False)
+        if config.new() != 0: raise Exception("File already exists")
+        with open(path, 'a') as f:
+            f.write("# A comment=1\n\naDuplicate=1\n")
+            for index in range(100000):
+                f.write("key{0}=value{0}\n".format(index))
+
+            f.write("aDuplicate=2\n")
+
+        size = os.path.getsize(path)
+        tracemalloc.start()
+        try:
+            self.assertEqual(config.set("key50000", "changed"), 0)
+            self.assertEqual(config.set("aDuplicate", 3), 0)
+            self.assertEqual(config.add("aNewKey", 1234), 0)
+            self.assertEqual(config.add("key1", 1234), 15)
+            peak = tracemalloc.get_traced_memory()[1]
+
+        finally:
+            tracemalloc.stop()
+
+        # The file is rewritten line by line, instead of being read into memory.
+        self.assertLess(peak, size / 4)
+        with open(path, 'r') as f:
+            lines = f.read().split('\n')
+
+        self.assertEqual(lines[2:4], ["# A comment=1", "aDuplicate=3"])
+        self.assertEqual(lines[-4:], ["key99999=value99999", "aDuplicate=3", "aNewKey=1234", ""])
+        self.assertEqual(config.get("key50000"), "changed")
+        self.assertEqual(config.get("key50001"), "value50001")
+        self.assertEqual(len(config.to_dict()), 100002)
+
+    def test3_streaming_base64(self):
+        path = "test/v1-testconfig-stream64.conf"
+        config = config_handler.Version1(path, True)
+        if config.new() != 0: raise Exception("File already exists")
+        content = "# ConfigHandler configuration file\n# Configuration File Version: 0.0.1.0\n"
+        content += ''.join("key{0}=value{0}\n".format(index) for index in range(200000))
+        with open(path, 'w') as f:
+            f.write(base64.b64encode(content.encode("utf-8")).decode("ascii"))
+
+        size = os.path.getsize(path)
+        tracemalloc.start()
+        try:
+            self.assertEqual(config.set("key50000", "changed"), 0)
+            self.assertEqual(config.add("aNewKey", 1234), 0)
+            peak = tracemalloc.get_traced_memory()[1]
+
+        finally:
+            tracemalloc.stop()
+
+        # The file is decoded and encoded in chunks, instead of being read into memory.
+        self.assertLess(peak, size / 4)
+        content = content.replace("key50000=value50000", "key50000=changed") + "aNewKey=1234\n"
+        with open(path, 'r') as f:
+            self.assertEqual(f.read(), base64.b64encode(content.encode("utf-8")).decode("ascii"))
+
+        self.assertEqual(config.get("key50000"), "changed")
+        self.assertEqual(config.get("aNewKey"), 1234)
+
+        # Chunks can split multi-byte characters and Base64 groups, and line breaks in the file are ignored.
+        config._base64_chunk_size = 7
+        self.assertEqual(config._save_config_file("aString1=Grüße, 世界!\nanInt1=684\n"), 0)
+        self.assertEqual(config.to_dict(), {"aString1": "Grüße, 世界!", "anInt1": 684})
+        with open(path, 'w') as f:
+            f.write(base64.encodebytes("aString1=Grüße, 世界!\n".encode("utf-8") * 10).decode("ascii"))
+
+        self.assertEqual(config.get("aString1"), "Grüße, 世界!")
+        with open(path, 'w') as f:
+            f.write("Not Base64!")
+
+        self.assertRaises(IOError, config.get, "aString1")
+
+        # Like get(), set() and add() raise the errors reading the file instead of returning them.
+        self.assertRaises(IOError, config.set, "aString1", "changed")
+        self.assertRaises(IOError, config.add, "aNewKey", 1)
+        with open(path, 'r') as f:
+            self.assertEqual(f.read(), "Not Base64!")
+
+    def test3_transactions(self):
+        config = config_handler.Version1("test/v1-testconfig-index.dat", False)
+        writes = []
+        save_config_file = config._save_config_file
+        config._save_config_file = lambda data: writes.append(data) or save_config_file(data)
+
+        with config.transaction():
+            if config.set("anInt1", 31854) != 0: raise Exception("Failed to set variable")
+            if config.add("aFloat1", 3.14) != 0: raise Exception("Failed to set variable")
+            if config.add("aBool1", True) != 0: raise Exception("Failed to set variable")
+            self.assertEqual(config.get("anInt1"), 31854)  # Pending changes are visible inside the transaction.
+
+        self.assertEqual(len(writes), 1)
+        self.assertEqual(config.get("anInt1"), 31854)
+        self.assertEqual(config.get("aFloat1"), 3.14)
+        self.assertEqual(config.get("aBool1"), True)
+
+        # Changes are discarded if an exception is raised inside the block.
+        try:
+            with config.transaction():
+                config.set("anInt1", 1)
+                config.add("aString2", "Hello again!")
+                raise RuntimeError("Rollback")
+
+        except RuntimeError:
+            pass
+
+        self.assertEqual(len(writes), 1)
+        self.assertEqual(config.get("anInt1"), 31854)
+        self.assertEqual(config.get("aString2"), None)
+
+        self.assertEqual(config.set_many({"anInt1": 684, "aFloat1": 184.84}), 0)
+        self.assertEqual(config.add_many({"aString2": "Hello again!", "anInt2": 6844534686}), 0)
+        self.assertEqual(len(writes), 3)
+
+        # `aBool1` already exists, so nothing must be added.
+        self.assertEqual(config.add_many({"aBool2": False, "aBool1": False}), 15)
+        self.assertEqual(len(writes), 3)
+        self.assertEqual(config.get("aBool2"), None)
+
+        self.assertEqual(config.get("anInt1"), 684)
+        self.assertEqual(config.get("aFloat1"), 184.84)
+        self.assertEqual(config.get("aString2"), "Hello again!")
+        self.assertEqual(config.get("anInt2"), 6844534686)
+
+    def test3_durability(self):
+        for durability in config_handler.AtomicWriter.durabilities:
+            config = config_handler.Version1("test/v1-testconfig-index.dat", False, durability=durability)
+            if config.set("aString1", "Durability: " + durability) != 0: raise Exception("Failed to set variable")
+            self.assertEqual(config.get("aString1"), "Durability: " + durability)
+
+        try:
+            config_handler.Version1("test/v1-testconfig-index.dat", False, durability="everything")
+
+        except(ValueError):
+            pass
+
+        else:
+            raise AssertionError("Invalid durability level accepted")
+
+        # A failed write must leave the original file and no temporary files behind.
+        try:
+            with config_handler.AtomicWriter("file").open("test/v1-testconfig-index.dat") as f:
+                f.write("aString1=Half-written")
+                raise RuntimeError("Crash")
+
+        except(RuntimeError):
+            pass
+
+        self.assertEqual(config_handler.Version1("test/v1-testconfig-index.dat", False).get("aString1"), "Durability: directory")
+        self.assertEqual([_ for _ in os.listdir("test") if _.endswith(".tmp")], [])
+
+    @unittest.skipIf(config_handler.fcntl is None, "fcntl is not available")
+    def test3_file_locking(self):
+        path = "test/v1-testconfig-lock.dat"
+        config = config_handler.Version1(path, False, lock=True)
+        config.new()
+        config.add("counter", 0)
+
+        # Read-modify-write cycles of several processes are not lost.
+        self.assertEqual(run_processes(increment_version1, path, 25), [0, 0, 0, 0])
+        self.assertEqual(config.get("counter"), 100)
+
+        # Other lock objects (like other processes) have to wait.
+        holder = config_handler.FileLock(path)
+        holder.acquire(exclusive=False)
+        other = config_handler.FileLock(path)
+        self.assertTrue(other.try_acquire(exclusive=False))
+        other.release()
+        self.assertFalse(other.try_acquire())
+        self.assertRaises(config_handler.LockTimeoutError, other.acquire, True, 0.05)
+        self.assertRaises(ValueError, holder.acquire, True)
+
+        waiting = config_handler.Version1(path, False, lock=True, lock_timeout=0.05)
+        self.assertEqual(waiting.get("counter"), 100)
+        self.assertRaises(config_handler.LockTimeoutError, waiting.set, "counter", 0)
+        holder.release()
+        self.assertEqual(waiting.set("counter", 0), 0)
+        self.assertEqual(config.get("counter"), 0)
+        os.remove(path)
+        os.remove(path + ".lock")
+
 
 class TestVersion2(unittest.TestCase):
     testfile1 = "test/v2-testfile1.dat"
@@ -549,6 +812,1064 @@ class TestVersion2(unittest.TestCase):
                 else:
                     raise AssertionError("Failed to remove <var> from the configuration file")
 
+    def test_v3_container(self):
+        with open(self.testphoto1, 'rb') as f:
+            testphoto = f.read()
+
+        path = "test/v2-testfile-v3.dat"
+        for compression in ("None", "zlib"):
+            for encryption in ("None", "aes256", "aes256-gcm"):
+                sizes = {}
+                for container in ("v2", "v3"):
+                    config = config_handler.Version2(path, "testP@ssword123")
+                    config.new("Test Configuration File (v3)", "Chris1320", compression, encryption, container)
+                    config.load()
+                    config.add("testVariable_str", "str", "Hello, world!")
+                    config.add("testVariable_arr4", "arr", (True, False, False, True), "bool")
+                    config.add("testVariable_bin", "bin", testphoto)
+                    config.save()
+                    sizes[container] = os.path.getsize(path)
+
+                    config = config_handler.Version2(path, "testP@ssword123")
+                    config.load()
+                    self.assertEqual(config.container, container)
+                    self.assertEqual(config.get("testVariable_str"), "Hello, world!")
+                    self.assertEqual(config.get("testVariable_arr4"), [True, False, False, True])
+                    self.assertEqual(config.get("testVariable_bin"), testphoto)
+                    self.assertEqual(config.info()["container"], container)
+                    self.assertEqual(config.info()["compression"], compression)
+                    self.assertEqual(config.info()["encryption"], encryption)
+                    os.remove(path)
+
+                self.assertLess(sizes["v3"], sizes["v2"])
+
+        # Convert a `v2` configuration file to `v3`.
+        config = config_handler.Version2(self.testfile3)
+        config.load()
+        config.container = "v3"
+        config.save()
+
+        config = config_handler.Version2(self.testfile3)
+        config.load()
+        self.assertEqual(config.container, "v3")
+        self.assertEqual(config.info()["name"], "Test Configuration File #3")
+
+    def test_get_cache(self):
+        with open(self.testphoto1, 'rb') as f:
+            testphoto = f.read()
+
+        config = config_handler.Version2(self.testfile5, epass=self.testfileinfos[self.testfile5]["password"])
+        config.load()
+        config.add("cacheVariable_arr", "arr", (b'Test String', testphoto), "bin")
+        config.add("cacheVariable_bin", "bin", testphoto)
+
+        # Views are served from the cache without copying.
+        view = config.get("cacheVariable_arr", view=True)
+        self.assertEqual(type(view), tuple)
+        self.assertIs(config.get("cacheVariable_arr", view=True), view)
+        self.assertEqual(type(config.get("cacheVariable_bin", view=True)), memoryview)
+        self.assertTrue(config.get("cacheVariable_bin", view=True).readonly)
+        self.assertEqual(config.get("cacheVariable_bin", view=True), testphoto)
+
+        # Lists are copies; Modifying them must not change the cached value.
+        value = config.get("cacheVariable_arr")
+        self.assertEqual(type(value), list)
+        value.append(b"Another string")
+        self.assertEqual(config.get("cacheVariable_arr"), [b'Test String', testphoto])
+
+        config.update("cacheVariable_arr", (b"updated test",))
+        self.assertEqual(config.get("cacheVariable_arr"), [b"updated test"])
+        config.update("cacheVariable_bin", b"updated bin datatype test")
+        self.assertEqual(config.get("cacheVariable_bin"), b"updated bin datatype test")
+
+        config.remove("cacheVariable_bin")
+        try:
+            config.get("cacheVariable_bin")
+
+        except(KeyError):
+            pass
+
+        else:
+            raise AssertionError("Got a removed variable from the cache")
+
+        config.import_dict({"cacheVariable_arr": ["arr", "str", ["Test1", "Test2"]]})
+        self.assertEqual(config.get("cacheVariable_arr"), ["Test1", "Test2"])
+
+    def test_bulk_operations(self):
+        with open(self.testphoto1, 'rb') as f:
+            testphoto = f.read()
+
+        config = config_handler.Version2(self.testfile3)
+        config.load()
+        config.add_many({
+            "bulkVariable_str": ("str", "Hello, world!"),
+            "bulkVariable_int": ("int", 1234),
+            "bulkVariable_bool": ("bool", False),
+            "bulkVariable_arr": ("arr", (453, 784, 5468), "int"),
+            "bulkVariable_bin": ("bin", testphoto)
+        })
+        config.save()
+
+        config = config_handler.Version2(self.testfile3)
+        config.load()
+        self.assertEqual(
+            config.get_many(("bulkVariable_str", "bulkVariable_int", "bulkVariable_bool", "bulkVariable_arr", "bulkVariable_bin")),
+            {
+                "bulkVariable_str": "Hello, world!",
+                "bulkVariable_int": 1234,
+                "bulkVariable_bool": False,
+                "bulkVariable_arr": [453, 784, 5468],
+                "bulkVariable_bin": testphoto
+            }
+        )
+
+        config.update_many({"bulkVariable_str": "Updated test", "bulkVariable_arr": [1, 2]})
+        self.assertEqual(config.get("bulkVariable_str"), "Updated test")
+        self.assertEqual(config.get("bulkVariable_arr"), [1, 2])
+
+        # A single invalid variable must leave the dictionary untouched.
+        for method, variables, error in (
+            (config.update_many, {"bulkVariable_int": 85, "bulkVariable_bool": "True"}, TypeError),
+            (config.update_many, {"bulkVariable_int": 85, "bulkVariable_arr": [1, "2"]}, TypeError),
+            (config.update_many, {"bulkVariable_int": 85, "nonexistentVariable": 1}, ValueError),
+            (config.add_many, {"bulkVariable_float": ("float", 3.14), "bulkVariable_str": ("str", "Duplicate")}, ValueError),
+            (config.add_many, {"bulkVariable_float": ("float", 3.14), "bulkVariable_bin2": ("bin", "Not bytes")}, ValueError)
+        ):
+            try:
+                method(variables)
+
+            except(error):
+                pass
+
+            else:
+                raise AssertionError("Invalid variables accepted")
+
+            self.assertEqual(config.get("bulkVariable_int"), 1234)
+            self.assertEqual(config.get("bulkVariable_str"), "Updated test")
+            self.assertRaises(KeyError, config.get, "bulkVariable_float")
+
+    def test_custom_datatypes(self):
+        config_handler.Datatypes.register(
+            "decimal",
+            (decimal.Decimal,),
+            str,
+            decimal.Decimal,
+            config_handler.Datatypes.type_validator(str)
+        )
+        path = "test/v2-testfile-datatypes.dat"
+        try:
+            config = config_handler.Version2(path)
+            self.assertIn("decimal", config.datatypes)
+            self.assertIn("decimal", config.array_datatypes)
+
+            config.new("Test Configuration File (Datatypes)", "Chris1320", "zlib")
+            config.load()
+            config.add("customVariable_decimal", "decimal", decimal.Decimal("3.14159265358979323846"))
+            config.add("customVariable_arr", "arr", (decimal.Decimal("0.1"), decimal.Decimal("0.2")), "decimal")
+            config.save()
+
+            config = config_handler.Version2(path)
+            config.load()
+            self.assertEqual(config.get("customVariable_decimal"), decimal.Decimal("3.14159265358979323846"))
+            self.assertEqual(sum(config.get("customVariable_arr")), decimal.Decimal("0.3"))
+            self.assertRaises(TypeError, config.update, "customVariable_decimal", 3.14)
+            config.update("customVariable_decimal", decimal.Decimal("2.71828"))
+            self.assertEqual(config.get("customVariable_decimal"), decimal.Decimal("2.71828"))
+
+            exported = config.export_config()["dictionary"]
+            exported["customVariable_decimal"] = ["decimal", 2.71828]
+            self.assertRaises(ValueError, config.import_dict, exported)
+            os.remove(path)
+
+            # Stored dictionaries are only blob references in `bin` values.
+            config_handler.Datatypes.register("dict", (dict,), dict, dict, config_handler.Datatypes.type_validator(dict), array=False)
+            config = config_handler.Version2(path, blob_threshold=16)
+            config.new("Test Configuration File (Datatypes)", "Chris1320", "zlib")
+            config.load()
+            config.add("customVariable_dict", "dict", {"blob": "value", "other": 1})
+            config.save()
+            config.load()
+            self.assertEqual(config.get("customVariable_dict"), {"blob": "value", "other": 1})
+            os.remove(path)
+
+        finally:
+            config_handler.Datatypes.codecs.pop("decimal")
+            config_handler.Datatypes.codecs.pop("dict", None)
+
+    def test_compressions(self):
+        with open(self.testphoto1, 'rb') as f:
+            testphoto = f.read()
+
+        path = "test/v2-testfile-compression.dat"
+        config = config_handler.Version2(path)
+        for compression in config.compressions:
+            minimum, default, maximum = config_handler.Compression.algorithms[compression][3]
+            for container in ("v2", "v3"):
+                config = config_handler.Version2(path, "testP@ssword123")
+                config.new("Test Configuration File (Compression)", "Chris1320", compression, "aes256-gcm", container, compression_level=maximum)
+                config.load()
+                config.add("testVariable_str", "str", "Hello, world! " * 100)
+                config.add("testVariable_bin", "bin", testphoto)
+                config.save()
+
+                config = config_handler.Version2(path, "testP@ssword123")
+                config.load()
+                self.assertEqual(config.get("testVariable_str"), "Hello, world! " * 100)
+                self.assertEqual(config.get("testVariable_bin"), testphoto)
+                self.assertEqual(config.info()["compression"], compression)
+                self.assertEqual(config.info()["compression_level"], maximum)
+                os.remove(path)
+
+        try:
+            config_handler.Version2(path).new("Test Configuration File (Compression)", compression="zlib", compression_level=10)
+
+        except(ValueError):
+            self.assertFalse(os.path.exists(path))
+
+        else:
+            raise AssertionError("Invalid compression level accepted")
+
+        config = config_handler.Version2(self.testfile2)
+        config.load()
+        recommendation = config.recommend_compression("size", 1)
+        self.assertIn(recommendation["compression"], config.compressions)
+        config.set_compression(recommendation["compression"], recommendation["level"])
+        config.save()
+
+        config = config_handler.Version2(self.testfile2)
+        config.load()
+        self.assertEqual(config.info()["compression"], recommendation["compression"])
+        self.assertEqual(config.get("testVariable_str"), "Hello, world!")
+
+    def test_authenticated_encryption(self):
+        with open(self.testphoto1, 'rb') as f:
+            testphoto = f.read()
+
+        path = "test/v2-testfile-gcm.dat"
+        for container in ("v2", "v3"):
+            config = config_handler.Version2(path, "gcmP@ssword123")
+            config.new("Test Configuration File (GCM)", "Chris1320", "None", "aes256-gcm", container)
+            config.load()
+            config.add("testVariable_bin", "bin", testphoto * 100)
+            config.save()
+
+            config = config_handler.Version2(path, "gcmP@ssword123")
+            config.load()
+            self.assertEqual(config.get("testVariable_bin"), testphoto * 100)
+
+            # A wrong password must be detected before the dictionary is parsed.
+            try:
+                config_handler.Version2(path, "wrong password").load()
+
+            except(ValueError) as error:
+                self.assertEqual(str(error), "The ciphertext is corrupt or the key is wrong")
+
+            else:
+                raise AssertionError("Loaded a configuration file with the wrong password")
+
+            if container == "v3":
+                # Modify a byte of the ciphertext.
+                with open(path, "rb") as f:
+                    data = bytearray(f.read())
+
+                data[-100] ^= 1
+                with open(path, "wb") as f:
+                    f.write(data)
+
+                try:
+                    config_handler.Version2(path, "gcmP@ssword123").load()
+
+                except(ValueError) as error:
+                    self.assertEqual(str(error), "The ciphertext is corrupt or the key is wrong")
+
+                else:
+                    raise AssertionError("Loaded a corrupted configuration file")
+
+            os.remove(path)
+
+    def test_key_derivation(self):
+        path = "test/v2-testfile-kdf.dat"
+        password = "kdfP@ssword123"
+        derivations = []
+        pbkdf2_hmac = config_handler.hashlib.pbkdf2_hmac
+
+        def counting_pbkdf2_hmac(*args, **kwargs):
+            derivations.append(args)
+            return pbkdf2_hmac(*args, **kwargs)
+
+        config_handler.hashlib.pbkdf2_hmac = counting_pbkdf2_hmac
+        try:
+            for container in ("v2", "v3"):
+                config = config_handler.Version2(path, password)
+                config.new("Test Configuration File (KDF)", "Chris1320", "zlib", "aes256", container, "pbkdf2", {"iterations": 1000})
+                config.load()
+                config.add("testVariable_str", "str", "Hello, world!")
+                config.save()
+                config.update("testVariable_str", "Updated test")
+                config.save()
+
+                for _ in range(3):
+                    config = config_handler.Version2(path, password)
+                    config.load()
+                    self.assertEqual(config.get("testVariable_str"), "Updated test")
+
+                os.remove(path)
+
+        finally:
+            config_handler.hashlib.pbkdf2_hmac = pbkdf2_hmac
+
+        # Each file has its own salt, so the key is derived once per file.
+        self.assertEqual(len(derivations), 2)
+
+        config = config_handler.Version2(path, "wrong password")
+        config.new("Test Configuration File (KDF)", "Chris1320", "None", "aes256", "v3", "pbkdf2", {"iterations": 1000})
+        config = config_handler.Version2(path, password)
+        try:
+            config.load()
+
+        except(ValueError):
+            pass
+
+        else:
+            raise AssertionError("Loaded a configuration file with the wrong password")
+
+    def test_instrumentation(self):
+        path = "test/v2-testfile-instrumentation.dat"
+        password = "instrumentationP@ssword123"
+        for container in ("v2", "v3"):
+            instrumentation = config_handler.Instrumentation()
+            config = config_handler.Version2(path, password, observer=instrumentation)
+            config.new("Test Configuration File (Instrumentation)", "Chris1320", "zlib", "aes256-gcm", container)
+            config.load()
+            config.add("testVariable_str", "str", "Hello, world!")
+            config.save()
+            config.load()
+
+            stats = instrumentation.stats()
+            for stage in ("readconfig.read", "readdict.decrypt", "readdict.decompress", "readdict.deserialize",
+                          "writedict.serialize", "writedict.compress", "writedict.encrypt", "writeconfig.write"):
+                self.assertGreater(stats["config_handler.{0}.calls".format(stage)], 0)
+                self.assertGreaterEqual(stats["config_handler.{0}.seconds".format(stage)], 0)
+
+            # Every written file (by new() and save()) was read back once.
+            self.assertEqual(stats["config_handler.writeconfig.write.calls"], 2)
+            self.assertEqual(stats["config_handler.readconfig.read.bytes_out"], stats["config_handler.writeconfig.write.bytes_in"])
+
+            instrumentation.reset()
+            self.assertEqual(instrumentation.stats(), {})
+            os.remove(path)
+
+        stages = []
+        config = config_handler.Version1("test/v1-testconfig-instrumentation.dat", True, observer=lambda *stage: stages.append(stage))
+        config.new()
+        config.add("testVariable", "Hello, world!")
+        self.assertEqual(config.get("testVariable"), "Hello, world!")
+        self.assertEqual(
+            {stage[0] for stage in stages},
+            {"open_config_file.read", "open_config_file.decode", "save_config_file.encode", "save_config_file.write"}
+        )
+
+    def test_load_peak_memory(self):
+        path = "test/v2-testfile-memory.dat"
+        password = "memoryP@ssword123"
+        payload = os.urandom(4 * 1024 * 1024)
+        for container in ("v2", "v3"):
+            for encryption in ("None", "aes256", "aes256-gcm"):
+                config = config_handler.Version2(path, password)
+                config.new("Test Configuration File (Memory)", "Chris1320", "None", encryption, container)
+                config.load()
+                config.add("testVariable_bin", "bin", payload)
+                config.save()
+                del config
+
+                # The file is mapped instead of read, and each decoding stage frees the previous one,
+                # so the peak stays close to the size of the file plus the parsed dictionary.
+                config = config_handler.Version2(path, password)
+                tracemalloc.start()
+                try:
+                    config.load()
+                    peak = tracemalloc.get_traced_memory()[1]
+
+                finally:
+                    tracemalloc.stop()
+
+                self.assertLess(peak, 2.5 * os.path.getsize(path), "{0} {1}".format(container, encryption))
+                self.assertEqual(config.get("testVariable_bin"), payload)
+                os.remove(path)
+
+    def test_indexed_container(self):
+        path = "test/v2-testfile-indexed.dat"
+        password = "indexedP@ssword123"
+        variables = {
+            "testVariable_str": ("str", "Hello, world!"),
+            "testVariable_int": ("int", 1234),
+            "testVariable_arr": ("arr", [1.5, 2.5], "float"),
+            "testVariable_bin": ("bin", os.urandom(65536))
+        }
+        for encryption in ("None", "aes256", "aes256-gcm"):
+            config = config_handler.Version2(path, password)
+            config.new("Test Configuration File (Indexed)", "Chris1320", "zlib", encryption, "v3-indexed")
+            config.load()
+            config.add_many(variables)
+            config.save()
+
+            # Only the key table and the requested values are decoded.
+            instrumentation = config_handler.Instrumentation()
+            config = config_handler.Version2(path, password, observer=instrumentation)
+            config.load(load_dict=False)
+            self.assertEqual(config.container, "v3-indexed")
+            self.assertEqual(config.get("testVariable_str"), "Hello, world!")
+            self.assertEqual(config.get("testVariable_str"), "Hello, world!")
+            self.assertEqual(
+                config.get_many(["testVariable_int", "testVariable_arr"]),
+                {"testVariable_int": 1234, "testVariable_arr": [1.5, 2.5]}
+            )
+            self.assertEqual(instrumentation.stats()["config_handler.readdict.decompress.calls"], 4)
+            self.assertRaises(KeyError, config.get, "testVariable_missing")
+            self.assertRaises(ValueError, config.update, "testVariable_int", 4321)
+
+            # A full load() works like the other containers.
+            writer = config_handler.Version2(path, password)
+            writer.load()
+            self.assertEqual(writer.get("testVariable_bin"), variables["testVariable_bin"][1])
+            writer.update("testVariable_int", 4321)
+            writer.save()
+
+            # The offsets of the key table are not valid for the new file.
+            self.assertRaises(IOError, config.get, "testVariable_bin")
+            config.load(load_dict=False)
+            self.assertEqual(config.get("testVariable_int"), 4321)
+            self.assertEqual(config.get("testVariable_bin"), variables["testVariable_bin"][1])
+
+            os.remove(path)
+
+        # Value blocks must be after the key table.
+        config = config_handler.Version2(path)
+        config.new("Test Configuration File (Indexed)", "Chris1320", "None", "None", "v3-indexed")
+        config.load()
+        config.add_many({"testVariable_str": ("str", "Hello, world!"), "testVariable_int": ("int", 1)})
+        config.save()
+        with open(path, "rb") as f:
+            data = f.read()
+
+        table = b'"testVariable_int":[' + str(len('["str","Hello, world!"]')).encode()
+        self.assertIn(table, data)
+        with open(path, "wb") as f:
+            f.write(data.replace(table, b'"testVariable_int":[-9'))
+
+        self.assertRaises(ValueError, config.load, False)
+        os.remove(path)
+
+    def test_journal(self):
+        path = "test/v2-testfile-journal.dat"
+        password = "journalP@ssword123"
+        payload = os.urandom(262144)
+        for container in ("v3", "v3-indexed"):
+            instrumentation = config_handler.Instrumentation()
+            config = config_handler.Version2(path, password, observer=instrumentation, journal=True)
+            config.new("Test Configuration File (Journal)", "Chris1320", "zlib", "aes256-gcm", container)
+            config.load()
+            config.add_many({"testVariable_int": ("int", 1), "testVariable_bin": ("bin", payload)})
+            config.save()
+            snapshot_size = os.path.getsize(path)
+
+            # Small changes are appended instead of rewriting the file.
+            writes = instrumentation.stats()["config_handler.writeconfig.write.calls"]
+            config.update("testVariable_int", 2)
+            config.save()
+            config.add("testVariable_str", "str", "Hello, world!")
+            config.remove("testVariable_int")
+            config.save()
+            config.save()  # Nothing to write
+            self.assertEqual(instrumentation.stats()["config_handler.writeconfig.write.calls"], writes)
+            self.assertLess(os.path.getsize(path) - snapshot_size, 512)
+
+            # An interrupted save() leaves an incomplete record, which is ignored and then overwritten.
+            with open(path, "ab") as f:
+                f.write(b"\xff\xff")
+
+            for load_dict in ((True, False) if container == "v3-indexed" else (True,)):
+                config = config_handler.Version2(path, password, journal=True)
+                config.load(load_dict)
+                self.assertEqual(config.get("testVariable_str"), "Hello, world!")
+                self.assertEqual(config.get("testVariable_bin"), payload)
+                self.assertRaises(KeyError, config.get, "testVariable_int")
+
+            config.load()
+            config.update("testVariable_str", "Updated")
+            config.save()
+            config = config_handler.Version2(path, password)
+            config.load()
+            self.assertEqual(config.get("testVariable_str"), "Updated")
+            self.assertEqual(sorted(config.export_config()["dictionary"]), ["testVariable_bin", "testVariable_str"])
+
+            # compact() folds the journal into the dictionary.
+            size = os.path.getsize(path)
+            config.compact()
+            self.assertLess(os.path.getsize(path), size)
+            config.load()
+            self.assertEqual(config.get("testVariable_str"), "Updated")
+
+            # Large journals are compacted by save().
+            config = config_handler.Version2(path, password, journal=True)
+            config.journal_compact_size = 0
+            config.load()
+            config.update("testVariable_str", "Compacted")
+            size = os.path.getsize(path)
+            config.save()
+            self.assertLess(os.path.getsize(path), size + 8)
+            config.load()
+            self.assertEqual(config.get("testVariable_str"), "Compacted")
+
+            # Files written without a journal are rewritten, not appended to.
+            config = config_handler.Version2(path, password)
+            config.load()
+            config.compact()
+            config = config_handler.Version2(path, password, journal=True)
+            config.load()
+            config.update("testVariable_str", "Not appended")
+            config.save()
+            config = config_handler.Version2(path, password)
+            config.load()
+            self.assertEqual(config.get("testVariable_str"), "Not appended")
+
+            os.remove(path)
+
+    def test_thread_safety(self):
+        path = "test/v2-testfile-threads.dat"
+        password = "threadsP@ssword123"
+        saving = threading.Event()
+        read_during_save = threading.Event()
+
+        def observer(stage, seconds, bytes_in, bytes_out):
+            if stage == "writeconfig.write" and saving.is_set():
+                # Readers must not wait for a save() in progress.
+                reader = threading.Thread(target=lambda: config.get("testVariable_int") is not None and read_during_save.set())
+                reader.start()
+                reader.join(5)
+
+        config = config_handler.Version2(path, password, observer=observer, threadsafe=True)
+        config.new("Test Configuration File (Threads)", "Chris1320", "zlib", "aes256-gcm", "v3")
+        config.load()
+        config.add_many({"testVariable_int": ("int", 0), "testVariable_str": ("str", "0")})
+        saving.set()
+        config.save()
+        saving.clear()
+        self.assertTrue(read_during_save.is_set())
+
+        # info() and export_config() do not change the configuration.
+        info = config.info()
+        info["name"] = "Changed"
+        config.export_config()["dictionary"].clear()
+        self.assertEqual(config.info()["name"], "Test Configuration File (Threads)")
+        config.save()
+        config.load()
+        self.assertEqual(config.get("testVariable_int"), 0)
+
+        errors = []
+        stop = threading.Event()
+
+        def read():
+            try:
+                while not stop.is_set():
+                    values = config.get_many(["testVariable_int", "testVariable_str"])
+                    self.assertGreaterEqual(values["testVariable_int"], 0)
+                    config.info()
+
+            except Exception as error:
+                errors.append(error)
+
+        def write():
+            try:
+                for value in range(1, 31):
+                    config.update_many({"testVariable_int": value, "testVariable_str": str(value)})
+                    config.save()
+                    if value % 10 == 0:
+                        config.load()
+
+            except Exception as error:
+                errors.append(error)
+
+        readers = [threading.Thread(target=read) for _ in range(4)]
+        writers = [threading.Thread(target=write) for _ in range(2)]
+        for thread in readers + writers:
+            thread.start()
+
+        for thread in writers:
+            thread.join()
+
+        stop.set()
+        for thread in readers:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        config.load()
+        self.assertEqual(config.get("testVariable_int"), 30)
+        self.assertEqual(config.get("testVariable_str"), "30")
+        os.remove(path)
+
+    def test_rwlock(self):
+        lock = config_handler.RWLock()
+        acquired = []
+
+        def reader():
+            lock.acquire_read()
+            acquired.append("read")
+            lock.release_read()
+
+        def writer():
+            lock.acquire_write()
+            acquired.append("write")
+            lock.release_write()
+
+        # Readers share the lock, and it is reentrant.
+        lock.acquire_read()
+        lock.acquire_read()
+        thread = threading.Thread(target=reader)
+        thread.start()
+        thread.join(5)
+        self.assertEqual(acquired, ["read"])
+
+        # Writers wait for the readers.
+        thread = threading.Thread(target=writer)
+        thread.start()
+        thread.join(0.1)
+        self.assertEqual(acquired, ["read"])
+        lock.release_read()
+        lock.release_read()
+        thread.join(5)
+        self.assertEqual(acquired, ["read", "write"])
+
+        # The writer can read, and readers wait for the writer.
+        lock.acquire_write()
+        lock.acquire_read()
+        thread = threading.Thread(target=reader)
+        thread.start()
+        thread.join(0.1)
+        self.assertEqual(acquired, ["read", "write"])
+        lock.release_read()
+        lock.release_write()
+        thread.join(5)
+        self.assertEqual(acquired, ["read", "write", "read"])
+
+        # A read started while writing is not counted after the write lock is released.
+        lock.acquire_write()
+        lock.acquire_read()
+        lock.release_write()
+        lock.release_read()
+        thread = threading.Thread(target=writer)
+        thread.start()
+        thread.join(5)
+        self.assertEqual(acquired, ["read", "write", "read", "write"])
+        self.assertEqual(lock._readers, 0)
+
+    @unittest.skipIf(config_handler.fcntl is None, "fcntl is not available")
+    def test_file_locking(self):
+        path = "test/v2-testfile-lock.dat"
+        password = "lockP@ssword123"
+        config = config_handler.Version2(path, password, lock=True)
+        config.new("Test Configuration File (Lock)", "Chris1320", "zlib", "aes256", "v3")
+        config.load()
+        config.add("counter", "int", 0)
+        config.save()
+
+        self.assertEqual(run_processes(increment_version2, path, password, 10), [0, 0, 0, 0])
+        config.load()
+        self.assertEqual(config.get("counter"), 40)
+
+        # save() does not overwrite the changes of another process.
+        other = config_handler.Version2(path, password, lock=True)
+        other.load()
+        other.update("counter", 41)
+        other.save()
+        config.update("counter", 0)
+        self.assertRaises(config_handler.ConfigModifiedError, config.save)
+        config.save(force=True)
+        other.load()
+        self.assertEqual(other.get("counter"), 0)
+
+        # The check does not need the lock.
+        unlocked = config_handler.Version2(path, password)
+        unlocked.load()
+        other.update("counter", 42)
+        other.save()
+        unlocked.update("counter", 1)
+        self.assertRaises(config_handler.ConfigModifiedError, unlocked.save)
+        self.assertRaises(config_handler.ConfigModifiedError, unlocked.compact)
+        unlocked.load()
+        self.assertEqual(unlocked.get("counter"), 42)
+
+        with other.file_lock.exclusive():
+            waiting = config_handler.Version2(path, password, lock=True, lock_timeout=0.05)
+            self.assertRaises(config_handler.LockTimeoutError, waiting.load)
+
+        # Holding the file lock of a thread-safe object keeps its other threads from writing,
+        # instead of deadlocking with them.
+        shared = config_handler.Version2(path, password, threadsafe=True, lock=True, lock_timeout=2)
+        shared.load()
+        errors = []
+
+        def save():
+            try:
+                shared.update("counter", 50)
+                shared.save()
+
+            except Exception as error:
+                errors.append(error)
+
+        with shared.file_lock.exclusive():
+            thread = threading.Thread(target=save)
+            thread.start()
+            thread.join(0.1)
+            self.assertTrue(thread.is_alive())
+            shared.load()
+            shared.update("counter", 43)
+            shared.save()
+
+        thread.join(5)
+        self.assertEqual(errors, [])
+        shared.load()
+        self.assertEqual(shared.get("counter"), 50)
+
+        os.remove(path)
+        os.remove(path + ".lock")
+
+    def test_async(self):
+        path = "test/v2-testfile-async.dat"
+        password = "asyncP@ssword123"
+        config = config_handler.Version2(path, password)
+        config.new("Test Configuration File (Async)", "Chris1320", "zlib", "aes256", "v2")
+        config.load()
+        config.add_many({"testVariable_int": ("int", 1), "testVariable_str": ("str", "Hello")})
+        config.save()
+
+        instrumentation = config_handler.Instrumentation()
+        with concurrent.futures.ThreadPoolExecutor(2) as executor:
+            for threadsafe in (False, True):
+                loader = config_handler.Version2(path, password, observer=instrumentation, threadsafe=threadsafe, executor=executor)
+
+                async def load_and_save():
+                    # Concurrent aload() calls share a single load.
+                    await asyncio.gather(*(loader.aload() for _ in range(5)))
+                    self.assertEqual(instrumentation.counters["readconfig.read"][0], 1)
+                    self.assertEqual(loader.get("testVariable_int"), 1)
+
+                    loader.update("testVariable_str", "World")
+                    await loader.asave()
+                    await loader.aload()
+                    self.assertEqual(instrumentation.counters["readconfig.read"][0], 2)
+                    loader.update("testVariable_str", "Hello")
+                    await loader.asave()
+
+                instrumentation.reset()
+                asyncio.run(load_and_save())
+                config.load()
+                self.assertEqual(config.get("testVariable_str"), "Hello")
+
+        os.remove(path)
+
+    def test_chunked_container(self):
+        path = "test/v2-testfile-chunked.dat"
+        password = "chunkedP@ssword123"
+        variables = {"testVariable_{0}".format(index): ("str", str(index) * 100) for index in range(1000)}
+        for encryption in ("None", "aes256", "aes256-gcm"):
+            for workers in (None, 1):
+                instrumentation = config_handler.Instrumentation()
+                config = config_handler.Version2(path, password, observer=instrumentation)
+                config.new("Test Configuration File (Chunked)", "Chris1320", "zlib", encryption, "v3-chunked")
+                config.chunk_size = 4096
+                config.chunk_workers = workers
+                config.load()
+                config.add_many(variables)
+                config.save()
+                self.assertGreater(instrumentation.counters["writedict.compress"][0], 10)
+
+                loader = config_handler.Version2(path, password)
+                loader.chunk_workers = workers
+                loader.load()
+                self.assertEqual(loader.container, "v3-chunked")
+                self.assertEqual(loader.get_many(list(variables)), {key: variables[key][1] for key in variables})
+
+                # The journal works the same way as in `v3` files.
+                loader.journal = True
+                loader.update("testVariable_1", "Updated")
+                loader.save()
+                config.load()
+                self.assertEqual(config.get("testVariable_1"), "Updated")
+                self.assertEqual(config.get("testVariable_2"), variables["testVariable_2"][1])
+                os.remove(path)
+
+        config.new("Test Configuration File (Chunked)", "Chris1320", "zlib", "aes256", "v3-chunked")
+        config.load()
+        config.add_many(variables)
+        config.save()
+
+        # A corrupted chunk table is detected.
+        with open(path, "r+b") as f:
+            f.truncate(os.path.getsize(path) - 100)
+
+        self.assertRaises(ValueError, config_handler.Version2(path, password).load)
+        os.remove(path)
+
+    def test_blobs(self):
+        path = "test/v2-testfile-blobs.dat"
+        password = "blobsP@ssword123"
+        small = os.urandom(100)
+        large = [os.urandom(65536) for _ in range(3)]
+        for encryption in ("None", "aes256", "aes256-gcm"):
+            instrumentation = config_handler.Instrumentation()
+            config = config_handler.Version2(path, password, observer=instrumentation, blob_threshold=1024)
+            config.new("Test Configuration File (Blobs)", "Chris1320", "zlib", encryption, "v3")
+            config.load()
+            config.add_many({
+                "testVariable_small": ("bin", small),
+                "testVariable_large": ("bin", large[0]),
+                "testVariable_arr": ("arr", [small, large[1]], "bin"),
+                "testVariable_int": ("int", 1)
+            })
+            config.save()
+
+            # The large values are stored once each, outside of the configuration file.
+            self.assertEqual(len(os.listdir(config.blobpath)), 2)
+            self.assertLess(os.path.getsize(path), 65536)
+            self.assertEqual(config.get("testVariable_large"), large[0])
+            instrumentation.reset()
+
+            # Blobs are only read when they are needed.
+            reader = config_handler.Version2(path, password, observer=instrumentation)
+            reader.load()
+            self.assertNotIn("readblob.read", instrumentation.counters)
+            self.assertEqual(reader.get("testVariable_small"), small)
+            self.assertNotIn("readblob.read", instrumentation.counters)
+            self.assertEqual(reader.get("testVariable_large"), large[0])
+            self.assertEqual(reader.get("testVariable_arr"), [small, large[1]])
+            self.assertEqual(reader.get("testVariable_large"), large[0])
+            self.assertEqual(instrumentation.counters["readblob.read"][0], 2)
+
+            # Stored blobs are not written again.
+            config.update("testVariable_large", large[0])
+            self.assertFalse(config.dirty)
+            config.update("testVariable_int", 2)
+            config.save()
+            self.assertNotIn("writeblob.write", instrumentation.counters)
+
+            # Failed calls leave no blobs behind.
+            self.assertRaises(
+                (TypeError, ValueError), config.add_many,
+                {"testVariable_new": ("bin", os.urandom(4096)), "testVariable_bad": ("int", "notint")}
+            )
+            self.assertRaises(TypeError, config.update_many, {"testVariable_large": os.urandom(4096), "testVariable_int": "notint"})
+            self.assertFalse(config.dirty)
+
+            # Exported dictionaries do not refer to the blobs.
+            exported = config.export_config()["dictionary"]
+            self.assertEqual(exported["testVariable_large"][1], base64.b64encode(large[0]).decode("ascii"))
+            other = config_handler.Version2(path, password, blob_threshold=1024)
+            other.load()
+            other.import_dict(exported)
+            self.assertEqual(other.export_config()["dictionary"], exported)
+            self.assertEqual(other.get("testVariable_arr"), [small, large[1]])
+
+            # Blobs that the file still uses are not deleted.
+            config.update("testVariable_large", large[2])
+            self.assertRaises(ValueError, config.remove_unused_blobs)
+            reader.load()
+            self.assertEqual(reader.get("testVariable_large"), large[0])
+
+            config.save()
+            self.assertEqual(len(os.listdir(config.blobpath)), 3)
+            self.assertEqual(config.remove_unused_blobs(), 1)
+            reader.load()
+            self.assertEqual(reader.get("testVariable_large"), large[2])
+
+            # Modified and missing blobs are detected.
+            blobs = [os.path.join(config.blobpath, name) for name in os.listdir(config.blobpath)]
+            for blob in blobs:
+                with open(blob, "r+b") as f:
+                    f.seek(-1, os.SEEK_END)
+                    last = f.read(1)
+                    f.seek(-1, os.SEEK_END)
+                    f.write(bytes((last[0] ^ 1,)))
+
+            reader.load()
+            self.assertRaises(ValueError, reader.get, "testVariable_large")
+            for blob in blobs:
+                os.remove(blob)
+
+            reader.load()
+            self.assertRaises(IOError, reader.get, "testVariable_arr")
+            self.assertEqual(reader.get("testVariable_small"), small)
+
+            os.rmdir(config.blobpath)
+            os.remove(path)
+
+    def test_dirty_tracking(self):
+        path = "test/v2-testfile-dirty.dat"
+        instrumentation = config_handler.Instrumentation()
+        config = config_handler.Version2(path, observer=instrumentation)
+        config.new("Test Configuration File (Dirty)", "Chris1320", "zlib", "None", "v3")
+        config.load()
+        config.add_many({"testVariable_int": ("int", 1), "testVariable_arr": ("arr", [1, 2], "int")})
+        config.save()
+
+        def writes():
+            return instrumentation.counters["writeconfig.write"][0]
+
+        # Nothing is written if nothing has changed.
+        saved = writes()
+        config.load()
+        self.assertFalse(config.dirty)
+        config.save()
+        config.update("testVariable_int", 1)
+        config.update_many({"testVariable_arr": [1, 2]})
+        config.import_dict(config.export_config()["dictionary"])
+        self.assertFalse(config.dirty)
+        config.save()
+        self.assertEqual(writes(), saved)
+
+        config.update("testVariable_int", 2)
+        self.assertTrue(config.dirty)
+        config.save()
+        self.assertFalse(config.dirty)
+        self.assertEqual(writes(), saved + 1)
+
+        # Changing how the file is encoded is a change too.
+        config.set_compression("lzma")
+        self.assertTrue(config.dirty)
+        config.save()
+        config.container = "v3-indexed"
+        config.save()
+        self.assertEqual(writes(), saved + 3)
+
+        # Files modified by someone else are not overwritten with the same, stale values.
+        other = config_handler.Version2(path)
+        other.load()
+        other.update("testVariable_int", 3)
+        other.save()
+        config.save()
+        self.assertEqual(writes(), saved + 3)
+
+        # The file is written again if it was deleted.
+        os.remove(path)
+        config.save()
+        self.assertEqual(writes(), saved + 4)
+        other = config_handler.Version2(path)
+        other.load()
+        self.assertEqual(other.get("testVariable_int"), 2)
+        self.assertEqual(other.get("testVariable_arr"), [1, 2])
+
+        os.remove(path)
+
+    def test_watcher(self):
+        path = "test/v2-testfile-watcher.dat"
+        writer = config_handler.Version2(path)
+        writer.new("Test Configuration File (Watcher)", "Chris1320", "zlib", "None", "v3")
+        writer.load()
+        writer.add_many({"testVariable_int": ("int", 1), "testVariable_str": ("str", "Hello")})
+        writer.save()
+
+        instrumentation = config_handler.Instrumentation()
+        config = config_handler.Version2(path, observer=instrumentation, threadsafe=True)
+        config.load()
+        self.assertEqual(config.reload(), {})
+        self.assertEqual(instrumentation.counters["readconfig.read"][0], 1)
+
+        changes = []
+        watcher = config_handler.Watcher(config, interval=0.05)
+        watcher.watch(lambda *change: changes.append(change), "testVariable_int")
+        writer.update("testVariable_int", 2)
+        writer.remove("testVariable_str")
+        writer.add("testVariable_arr", "arr", [1, 2], "int")
+        writer.save()
+        self.assertEqual(watcher.check(), {
+            "testVariable_int": (1, 2),
+            "testVariable_str": ("Hello", None),
+            "testVariable_arr": (None, [1, 2])
+        })
+        self.assertEqual(changes, [("testVariable_int", 1, 2)])
+        self.assertEqual(config.get("testVariable_int"), 2)
+
+        # The file is not decoded again if it was rewritten with the same contents.
+        reads = instrumentation.counters["readdict.deserialize"][0]
+        writer.compact()
+        self.assertEqual(watcher.check(), {})
+        self.assertEqual(instrumentation.counters["readdict.deserialize"][0], reads)
+
+        # A failing callback does not keep the others from being called.
+        errors = []
+        watcher = config_handler.Watcher(config, on_error=errors.append)
+        watcher.watch(lambda key, old, new: 1 / 0, "testVariable_int")
+        watcher.watch(lambda *change: changes.append(change), "testVariable_arr")
+        writer.update("testVariable_int", 3)
+        writer.update("testVariable_arr", [3])
+        writer.save()
+        watcher.check()
+        self.assertEqual(changes[-1], ("testVariable_arr", [1, 2], [3]))
+        self.assertEqual([type(error) for error in errors], [ZeroDivisionError])
+
+        # Unsaved changes are not dropped.
+        config.update("testVariable_int", 4)
+        writer.update("testVariable_int", 5)
+        writer.save()
+        self.assertRaises(ValueError, config.reload)
+        self.assertEqual(config.get("testVariable_int"), 4)
+        config.load()
+
+        # Watchers need a thread-safe object.
+        self.assertRaises(ValueError, config_handler.Watcher(config_handler.Version2(path)).start)
+
+        # Files changed while the watcher is running are reloaded by it.
+        for inotify in (True, False):
+            changed = threading.Event()
+            errors = []
+            watcher = config_handler.Watcher(config, interval=0.05, inotify=inotify, on_error=errors.append)
+            watcher.watch(lambda key, old, new: new == inotify and changed.set(), "testVariable_bool")
+            watcher.start()
+            self.assertTrue(watcher.running)
+            writer.add("testVariable_bool", "bool", inotify) if inotify else writer.update("testVariable_bool", inotify)
+            writer.save()
+            self.assertTrue(changed.wait(5))
+            watcher.stop()
+            self.assertFalse(watcher.running)
+            self.assertEqual(errors, [])
+
+        # Lazily loaded files stay lazy, and only the values that were read are compared.
+        writer.container = "v3-indexed"
+        writer.save()
+        lazy = config_handler.Version2(path, observer=instrumentation)
+        lazy.load(load_dict=False)
+        self.assertEqual(lazy.get("testVariable_int"), 5)
+        reads = instrumentation.counters["readdict.deserialize"][0]
+        writer.update("testVariable_int", 6)
+        writer.update("testVariable_arr", [6])
+        writer.add("testVariable_str", "str", "Added")
+        writer.save()
+        self.assertEqual(lazy.reload(), {"testVariable_int": (5, 6), "testVariable_str": (None, "Added")})
+        self.assertEqual(instrumentation.counters["readdict.deserialize"][0], reads)
+        writer.update("testVariable_int", 7)
+        writer.save()
+        self.assertEqual(lazy.reload(), {"testVariable_int": (6, 7)})
+
+        # Readers do not wait for a reload() in progress, and see the old values until it is done.
+        reloading = threading.Event()
+        read_during_reload = []
+
+        def observer(stage, seconds, bytes_in, bytes_out):
+            if stage == "readconfig.read" and reloading.is_set():
+                reader = threading.Thread(target=lambda: read_during_reload.append(shared.get("testVariable_int")))
+                reader.start()
+                reader.join(5)
+
+        shared = config_handler.Version2(path, observer=observer, threadsafe=True)
+        shared.load()
+        writer.update("testVariable_int", 8)
+        writer.save()
+        reloading.set()
+        self.assertEqual(shared.reload(), {"testVariable_int": (7, 8)})
+        self.assertEqual(read_during_reload, [7])
+
+        os.remove(path)
+
 def run():
     print("[i] Starting test suite...")
     print("Current Working Directory: `{0}`".format(os.getcwd()))
@@ -564,6 +1885,14 @@ def run():
     suite.addTest(TestVersion1("test2_get_config_value"))
     suite.addTest(TestVersion1("test2_set_config_value"))
 
+    suite.addTest(TestVersion1("test3_index_invalidation"))
+    suite.addTest(TestVersion1("test3_to_dict"))
+    suite.addTest(TestVersion1("test3_streaming_rewrite"))
+    suite.addTest(TestVersion1("test3_streaming_base64"))
+    suite.addTest(TestVersion1("test3_transactions"))
+    suite.addTest(TestVersion1("test3_durability"))
+    suite.addTest(TestVersion1("test3_file_locking"))
+
     # Version 2 test cases
     suite.addTest(TestVersion2("test_create_config"))
     suite.addTest(TestVersion2("test_info_config"))
@@ -573,6 +1902,25 @@ def run():
     suite.addTest(TestVersion2("test_update_config"))
     suite.addTest(TestVersion2("test_import_and_export_config"))
     suite.addTest(TestVersion2("test_remove_variables"))
+    suite.addTest(TestVersion2("test_v3_container"))
+    suite.addTest(TestVersion2("test_get_cache"))
+    suite.addTest(TestVersion2("test_bulk_operations"))
+    suite.addTest(TestVersion2("test_custom_datatypes"))
+    suite.addTest(TestVersion2("test_compressions"))
+    suite.addTest(TestVersion2("test_authenticated_encryption"))
+    suite.addTest(TestVersion2("test_key_derivation"))
+    suite.addTest(TestVersion2("test_instrumentation"))
+    suite.addTest(TestVersion2("test_load_peak_memory"))
+    suite.addTest(TestVersion2("test_indexed_container"))
+    suite.addTest(TestVersion2("test_journal"))
+    suite.addTest(TestVersion2("test_thread_safety"))
+    suite.addTest(TestVersion2("test_rwlock"))
+    suite.addTest(TestVersion2("test_file_locking"))
+    suite.addTest(TestVersion2("test_async"))
+    suite.addTest(TestVersion2("test_chunked_container"))
+    suite.addTest(TestVersion2("test_watcher"))
+    suite.addTest(TestVersion2("test_blobs"))
+    suite.addTest(TestVersion2("test_dirty_tracking"))
 
     runner = unittest.TextTestRunner(verbosity=2, failfast=True)
     runner.run(suite)
@@ -581,13 +1929,37 @@ def run():
     files2remove = [
         "v1-testconfig.dat",
         "v1-testconfig-base64.conf",
+        "v1-testconfig-index.dat",
+        "v1-testconfig-dict.dat",
+        "v1-testconfig-encoding.dat",
+        "v1-testconfig-stream.dat",
+        "v1-testconfig-stream64.conf",
+        "v1-testconfig-instrumentation.dat",
+        "v1-testconfig-lock.dat",
+        "v1-testconfig-lock.dat.lock",
         "v2-testfile1.dat",
         "v2-testfile2.dat",
         "v2-testfile3.dat",
         "v2-testfile4.dat",
         "v2-testfile5.dat",
         "v2-testfile6.dat",
-        "v2-testfile7.dat"
+        "v2-testfile7.dat",
+        "v2-testfile-v3.dat",
+        "v2-testfile-datatypes.dat",
+        "v2-testfile-compression.dat",
+        "v2-testfile-gcm.dat",
+        "v2-testfile-kdf.dat",
+        "v2-testfile-instrumentation.dat",
+        "v2-testfile-memory.dat",
+        "v2-testfile-indexed.dat",
+        "v2-testfile-journal.dat",
+        "v2-testfile-threads.dat",
+        "v2-testfile-lock.dat",
+        "v2-testfile-lock.dat.lock",
+        "v2-testfile-async.dat",
+        "v2-testfile-chunked.dat",
+        "v2-testfile-watcher.dat",
+        "v2-testfile-dirty.dat"
     ]
     for file in files2remove:
         print("[+] Deleting `test/{0}`...".format(file))